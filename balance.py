@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""Headless bot-vs-bot matches for balancing the ``WEAPONS`` table.
+
+Every match pits one weapon against another (each worm only fires its own
+weapon) with the same aiming bot on both sides, simulated by ``engine`` (the
+Python port of ``updateProjectile``, ``explosion``, ``newTurn``, ...). All
+nine ordered pairings are played per seed, so each matchup is seen from both
+seats and the first-move advantage cancels out of the per-weapon numbers.
+
+Seeds are sharded into chunks over a ``ProcessPoolExecutor``. Workers return
+aggregated counters only (a few hundred bytes per chunk), which are appended
+to ``--out`` as one JSON line per chunk while the run progresses; the last
+line holds the summary.
+
+``--bot`` swaps the bracketing ``AimBot`` for the CPU opponent
+(``engine.ai.solve`` at the given difficulty), which sees terrain and wind.
+
+Usage:
+    python balance.py --matches 90000 --workers 8 --out balance.jsonl
+    python balance.py --matches 9000 --set banana.radius=40 --set grenade.fuse=2.2
+    python balance.py --matches 9000 --bot hard
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from engine import Game
+from engine.ai import DIFFICULTY, solve
+from engine.weapons import (
+    ANGLE_MAX,
+    ANGLE_MIN,
+    GRAVITY,
+    POWER_MAX,
+    POWER_MIN,
+    WEAPONS,
+    weapon_by_slot,
+)
+
+SLOTS = (1, 2, 3)
+PAIRS = [(a, b) for a in SLOTS for b in SLOTS]
+DMG_BUCKET = 5            # damage histogram bucket width
+DMG_BINS = 21             # 0..4, 5..9, ..., >= 100
+# fields the engine only reads for the grenade (fuse timer, bounces)
+GRENADE_FIELDS = ("fuse", "bounce")
+
+
+class AimBot:
+    """Flat-ground ballistic aim with noise and a learned power correction.
+
+    The first shot solves the drag-free trajectory for the target's offset
+    (ignoring terrain and wind); afterwards ``gain`` scales the launch speed
+    by how far the last shot landed from the target, roughly like a player
+    bracketing in. ``sigma`` is the aim noise in degrees / power points.
+    """
+
+    def __init__(self, rng: random.Random, sigma: float = 3.0):
+        self.rng = rng
+        self.sigma = sigma
+        self.gain = 1.0
+
+    def aim(self, game: Game):
+        shooter = game.shooter
+        target = game.players[1 - game.active]
+        dx = abs(target.x - shooter.x) * game.width
+        dy = target.y - shooter.y  # screen y points down
+
+        angle = min(ANGLE_MAX, max(ANGLE_MIN, 45 + self.rng.gauss(0, self.sigma)))
+        theta = math.radians(angle)
+        denom = 2 * math.cos(theta) ** 2 * (dx * math.tan(theta) + dy)
+        speed = math.sqrt(GRAVITY * dx * dx / denom) if denom > 0 else 640.0
+        power = (speed * self.gain - 120) / 520 * 100 + self.rng.gauss(0, self.sigma)
+        return angle, min(POWER_MAX, max(POWER_MIN, power))
+
+    def learn(self, game: Game, shooter_x: float, target_x: float, impact_x: float):
+        want = abs(target_x - shooter_x)
+        got = (impact_x - shooter_x) * (1 if target_x > shooter_x else -1)
+        if want > 1 and got > 1:
+            # range grows ~ speed^2
+            self.gain *= min(1.3, max(0.75, math.sqrt(want / got)))
+            self.gain = min(2.0, max(0.5, self.gain))
+
+
+def play_match(seed: int, slots, weapons, max_turns: int, sigma: float, bot: str = "aim"):
+    """One match; returns (winner seat or -1 draw / -2 timeout, turns, shots).
+
+    ``shots`` lists (slot, damage to the opponent, self damage) per shot.
+    """
+    game = Game(seed=seed, weapons=weapons)
+    rng = random.Random(seed * 7 + slots[0] * 3 + slots[1])
+    bots = (AimBot(rng, sigma), AimBot(rng, sigma))
+    shots = []
+
+    while game.phase != "gameover" and game.turn < max_turns:
+        seat = game.active
+        shooter, target = game.players[seat], game.players[1 - seat]
+        sx, tx = shooter.x * game.width, target.x * game.width
+        if bot == "aim":
+            angle, power = bots[seat].aim(game)
+        else:
+            sol = solve(game, slots[seat], bot)
+            angle, power = sol.angle, sol.power
+
+        game.events.clear()
+        path = game.play_shot(angle, power, slots[seat])
+
+        dealt = self_dmg = 0
+        impact_x = path[-1][0] if path else sx
+        for ev in game.events:
+            if ev[0] == "explosion":
+                impact_x = ev[1]
+                for pid, dmg in ev[3]:
+                    if pid == target.id:
+                        dealt += dmg
+                    else:
+                        self_dmg += dmg
+        shots.append((slots[seat], dealt, self_dmg))
+        bots[seat].learn(game, sx, tx, impact_x)
+
+    if game.phase != "gameover":
+        return -2, game.turn, shots
+    if game.winner == 0:
+        return -1, game.turn + 1, shots
+    return game.winner - 1, game.turn + 1, shots
+
+
+def _empty_counts():
+    return {
+        "matches": 0,
+        # "a-b" (seat 0 weapon - seat 1 weapon) -> [seat0 wins, seat1 wins, draws, timeouts, turns]
+        "pairs": {f"{a}-{b}": [0, 0, 0, 0, 0] for a, b in PAIRS},
+        # slot -> shots, hits, damage dealt, self damage, damage histogram
+        "weapons": {str(s): {"shots": 0, "hits": 0, "dmg": 0, "self": 0, "hist": [0] * DMG_BINS} for s in SLOTS},
+    }
+
+
+def run_chunk(seeds, weapons, max_turns, sigma, bot="aim"):
+    """Worker entry point: play all pairings for ``seeds`` and aggregate."""
+    counts = _empty_counts()
+    for seed in seeds:
+        for a, b in PAIRS:
+            winner, turns, shots = play_match(seed, (a, b), weapons, max_turns, sigma, bot)
+            row = counts["pairs"][f"{a}-{b}"]
+            row[{0: 0, 1: 1, -1: 2, -2: 3}[winner]] += 1
+            row[4] += turns
+            counts["matches"] += 1
+            for slot, dealt, self_dmg in shots:
+                w = counts["weapons"][str(slot)]
+                w["shots"] += 1
+                w["hits"] += dealt > 0
+                w["dmg"] += dealt
+                w["self"] += self_dmg
+                w["hist"][min(DMG_BINS - 1, int(dealt) // DMG_BUCKET)] += 1
+    return counts
+
+
+def merge(total, part):
+    total["matches"] += part["matches"]
+    for key, row in part["pairs"].items():
+        acc = total["pairs"][key]
+        for i, v in enumerate(row):
+            acc[i] += v
+    for slot, w in part["weapons"].items():
+        acc = total["weapons"][slot]
+        for k in ("shots", "hits", "dmg", "self"):
+            acc[k] += w[k]
+        for i, v in enumerate(w["hist"]):
+            acc["hist"][i] += v
+    return total
+
+
+def summarize(counts, weapons):
+    """Win rates per weapon (both seats, mirrors excluded) and per matchup."""
+    name = {s: weapon_by_slot(s, weapons).key for s in SLOTS}
+    pairs = counts["pairs"]
+    per_weapon, matrix = {}, {}
+    for a in SLOTS:
+        wins = games = 0
+        for b in SLOTS:
+            ab, ba = pairs[f"{a}-{b}"], pairs[f"{b}-{a}"]
+            n = sum(ab[:4]) + sum(ba[:4])
+            won = ab[0] + ba[1]
+            matrix[f"{name[a]}>{name[b]}"] = round(won / n, 4) if n else None
+            if a != b:
+                wins += won
+                games += n
+        w = counts["weapons"][str(a)]
+        hist = w["hist"]
+        per_weapon[name[a]] = {
+            "win_rate": round(wins / games, 4) if games else None,
+            "shots": w["shots"],
+            "hit_rate": round(w["hits"] / w["shots"], 4) if w["shots"] else None,
+            "avg_dmg": round(w["dmg"] / w["shots"], 2) if w["shots"] else None,
+            "avg_self_dmg": round(w["self"] / w["shots"], 2) if w["shots"] else None,
+            "dmg_hist": {f"{i * DMG_BUCKET}+": c for i, c in enumerate(hist) if c},
+        }
+    mirrors = [pairs[f"{s}-{s}"] for s in SLOTS]
+    mirror_games = sum(sum(r[:4]) for r in mirrors)
+    total_games = sum(sum(r[:4]) for r in pairs.values())
+    return {
+        "matches": counts["matches"],
+        "avg_turns": round(sum(r[4] for r in pairs.values()) / total_games, 2) if total_games else None,
+        "timeouts": sum(r[3] for r in pairs.values()),
+        "draws": sum(r[2] for r in pairs.values()),
+        "first_seat_win_rate": round(sum(r[0] for r in mirrors) / mirror_games, 4) if mirror_games else None,
+        "weapons": per_weapon,
+        "matchups": matrix,
+    }
+
+
+def parse_overrides(items):
+    """``["banana.radius=40", ...]`` -> weapon table with those fields replaced.
+
+    ``fuse`` and ``bounce`` only apply to the grenade; setting them on
+    another weapon would change nothing, so it is rejected.
+    """
+    table = dict(WEAPONS)
+    for item in items:
+        try:
+            target, value = item.split("=", 1)
+            key, fieldname = target.split(".", 1)
+            weapon = table[key]
+            if fieldname in ("key", "name"):
+                raise KeyError(fieldname)
+            table[key] = weapon._replace(**{fieldname: type(getattr(weapon, fieldname))(value)})
+        except (ValueError, KeyError, AttributeError):
+            raise SystemExit(f"bad --set {item!r}; expected <weapon>.<field>=<value>, "
+                             f"weapons {sorted(WEAPONS)}, fields {list(weapon_by_slot(1)._fields[2:])}")
+        if fieldname in GRENADE_FIELDS and key != "grenade":
+            raise SystemExit(f"bad --set {item!r}; {', '.join(GRENADE_FIELDS)} only apply to the grenade")
+    return table
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bot-vs-bot matches for weapon balancing")
+    parser.add_argument("--matches", type=int, default=9000, help="total matches (9 pairings per seed)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk", type=int, default=20, help="seeds per work unit")
+    parser.add_argument("--seed", type=int, default=1, help="first seed")
+    parser.add_argument("--max-turns", type=int, default=40)
+    parser.add_argument("--sigma", type=float, default=3.0, help="bot aim noise (deg / power points)")
+    parser.add_argument("--bot", choices=["aim", *DIFFICULTY], default="aim",
+                        help="'aim' (bracketing bot, --sigma) or a CPU difficulty")
+    parser.add_argument("--set", action="append", default=[], metavar="WEAPON.FIELD=VALUE")
+    parser.add_argument("--out", default="balance.jsonl", help="JSON lines, appended per chunk")
+    args = parser.parse_args(argv)
+
+    weapons = parse_overrides(args.set)
+    n_seeds = max(1, math.ceil(args.matches / len(PAIRS)))
+    chunks = [
+        range(lo, min(lo + args.chunk, args.seed + n_seeds))
+        for lo in range(args.seed, args.seed + n_seeds, args.chunk)
+    ]
+    total = _empty_counts()
+
+    t0 = time.perf_counter()
+    with open(args.out, "a", encoding="utf-8") as out, ProcessPoolExecutor(args.workers) as pool:
+        out.write(json.dumps({
+            "run": {"matches": n_seeds * len(PAIRS), "seed": args.seed, "workers": args.workers,
+                    "max_turns": args.max_turns, "sigma": args.sigma, "bot": args.bot,
+                    "weapons": {k: w._asdict() for k, w in weapons.items()}},
+        }) + "\n")
+        pending, todo, done = {}, iter(chunks), 0
+        while True:
+            # keep a bounded number of chunks in flight
+            while len(pending) < 2 * args.workers:
+                seeds = next(todo, None)
+                if seeds is None:
+                    break
+                fut = pool.submit(run_chunk, seeds, weapons, args.max_turns, args.sigma, args.bot)
+                pending[fut] = seeds
+            if not pending:
+                break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                seeds = pending.pop(fut)
+                part = fut.result()
+                merge(total, part)
+                out.write(json.dumps({"chunk": [seeds.start, seeds.stop], **part}) + "\n")
+                out.flush()
+                done += part["matches"]
+            elapsed = time.perf_counter() - t0
+            print(f"\r{done}/{n_seeds * len(PAIRS)} matches, {done / elapsed:.0f}/s", end="", file=sys.stderr)
+        elapsed = time.perf_counter() - t0
+        summary = summarize(total, weapons)
+        summary["seconds"] = round(elapsed, 2)
+        summary["matches_per_s"] = round(total["matches"] / elapsed, 1)
+        out.write(json.dumps({"summary": summary}) + "\n")
+    print(file=sys.stderr)
+
+    print(f"{summary['matches']} matches in {elapsed:.1f}s ({summary['matches_per_s']}/s, "
+          f"{args.workers} workers), avg {summary['avg_turns']} turns, "
+          f"first seat wins {summary['first_seat_win_rate']:.1%} of mirror matches")
+    print(f"{'weapon':10s} {'win':>6s} {'hit':>6s} {'dmg/shot':>9s} {'self':>6s}")
+    for key, w in summary["weapons"].items():
+        print(f"{key:10s} {w['win_rate']:6.1%} {w['hit_rate']:6.1%} {w['avg_dmg']:9.1f} {w['avg_self_dmg']:6.1f}")
+    for key, rate in summary["matchups"].items():
+        print(f"  {key:18s} {rate:6.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,35 @@
+"""Headless Python engine for Mini Worms.
+
+Same rules and constants as the browser game in ``main.HTML`` (gravity 420,
+4 projectile substeps, the ``WEAPONS`` table), with a seeded Mulberry32 RNG
+in place of ``Math.random`` so matches are reproducible.
+
+``engine.batch`` (NumPy batch trajectories) is not imported here because
+numpy is optional.
+"""
+
+from .broadphase import ColumnGrid
+from .game import Game, Player, Projectile
+from .heightfield import Heightfield
+from .rng import Rng
+from .runs import ColumnRuns
+from .terrain import Terrain, make_terrain
+from .weapons import GRAVITY, SUBSTEPS, WEAPONS, Weapon, launch_speed, weapon_by_slot
+
+__all__ = [
+    "ColumnGrid",
+    "ColumnRuns",
+    "GRAVITY",
+    "SUBSTEPS",
+    "WEAPONS",
+    "Game",
+    "Heightfield",
+    "Player",
+    "Projectile",
+    "Rng",
+    "Terrain",
+    "Weapon",
+    "launch_speed",
+    "make_terrain",
+    "weapon_by_slot",
+]
@@ -0,0 +1,476 @@
+"""CPU opponent: solve angle/power for the current wind and weapon.
+
+Two stages, mirrored by ``aiSolve`` in the browser script:
+
+1. ``BallisticTable``: range on flat ground (back at launch height) over a
+   grid of angle x power x wind-along-the-shot. With constant gravity and
+   wind, the engine's per-step integration ``v += a*h; x += v*h`` has the
+   closed form ``x_n = x_0 + n*h*v_0 + a*h^2*n*(n+1)/2``, so the table is
+   exact for the fixed 240 Hz step and cheap to build. Inverting it along
+   the power axis gives a first guess and a slope for Newton steps.
+2. Rollouts: a few exact flights (``rollout``, the per-step rules of
+   ``Game.update_projectile`` without side effects) over the real terrain
+   refine the power per candidate angle by secant steps. The candidate with
+   the best expected damage (target damage minus self damage) wins.
+
+Difficulty adds Gaussian noise to the final angle/power, drawn from a
+separate Mulberry32 stream so the game's wind sequence is untouched.
+
+``Position`` describes a solver input outside of a running ``Game`` (terrain
+samples or seed + craters, worm positions, wind, weapon), snapped to a grid
+so that nearby requests share one ``key()`` and one cached solution.
+"""
+
+import hashlib
+import math
+import struct
+from dataclasses import dataclass
+from typing import NamedTuple, Optional, Tuple
+
+from .game import Game, Player, sweep_circle
+from .rng import Rng
+from .terrain import Terrain, clamp
+from .weapons import (
+    ANGLE_MAX,
+    ANGLE_MIN,
+    GRAVITY,
+    PHYSICS_DT,
+    POWER_MAX,
+    POWER_MIN,
+    TERRAIN_N,
+    WIND_MAX,
+    launch_speed,
+    weapon_by_slot,
+)
+
+TABLE_ANGLE_STEP = 2.5
+TABLE_POWER_STEP = 2.5
+TABLE_WIND_STEP = 5.0
+
+CANDIDATE_ANGLES = (45.0, 60.0, 30.0, 72.0, 20.0)
+ROLLOUTS_PER_ANGLE = 3
+MAX_ROLLOUT_STEPS = 240 * 8     # 8 s of flight
+SELF_WEIGHT = 1.5               # self damage counts more than damage dealt
+
+# (angle sigma in degrees, power sigma in points)
+DIFFICULTY = {
+    "easy": (6.0, 8.0),
+    "medium": (3.0, 4.0),
+    "hard": (1.2, 1.5),
+    "perfect": (0.0, 0.0),
+}
+
+
+class BallisticTable:
+    """Flat-ground range over (angle, power, wind along the shot direction)."""
+
+    def __init__(self, gravity: float = GRAVITY, dt: float = PHYSICS_DT):
+        self.angles = _grid(ANGLE_MIN, ANGLE_MAX, TABLE_ANGLE_STEP)
+        self.powers = _grid(POWER_MIN, POWER_MAX, TABLE_POWER_STEP)
+        self.winds = _grid(-WIND_MAX, WIND_MAX, TABLE_WIND_STEP)
+        n_p, n_w = len(self.powers), len(self.winds)
+        self.ranges = [0.0] * (len(self.angles) * n_p * n_w)
+        for i, angle in enumerate(self.angles):
+            theta = angle * math.pi / 180
+            for j, power in enumerate(self.powers):
+                speed = launch_speed(power)
+                vx0, vy0 = math.cos(theta) * speed, -math.sin(theta) * speed
+                # steps until y is back at launch height: n*h*vy0 + g*h^2*n(n+1)/2 = 0
+                n = -2 * vy0 / (gravity * dt) - 1
+                for k, wind in enumerate(self.winds):
+                    self.ranges[(i * n_p + j) * n_w + k] = n * dt * vx0 + wind * dt * dt * n * (n + 1) / 2
+
+    def _ranges_over_power(self, angle: float, wind: float):
+        """Range per power grid point, bilinear in angle and wind."""
+        fi, ia = _cell(self.angles, angle)
+        fk, ik = _cell(self.winds, wind)
+        n_p, n_w = len(self.powers), len(self.winds)
+        rs = self.ranges
+        out = []
+        for j in range(n_p):
+            b0 = (ia * n_p + j) * n_w + ik
+            b1 = ((ia + 1) * n_p + j) * n_w + ik
+            r0 = rs[b0] + (rs[b0 + 1] - rs[b0]) * fk
+            r1 = rs[b1] + (rs[b1 + 1] - rs[b1]) * fk
+            out.append(r0 + (r1 - r0) * fi)
+        return out
+
+    def power_for(self, angle: float, wind: float, distance: float):
+        """Power whose flat-ground range is ``distance``; returns (power, dRange/dPower)."""
+        rs = self._ranges_over_power(angle, wind)
+        ps = self.powers
+        for j in range(len(ps) - 1):
+            r0, r1 = rs[j], rs[j + 1]
+            if (r0 - distance) * (r1 - distance) <= 0 and r1 != r0:
+                slope = (r1 - r0) / (ps[j + 1] - ps[j])
+                return ps[j] + (distance - r0) / slope, slope
+        # out of reach: the end closer to the wanted range
+        if abs(rs[-1] - distance) < abs(rs[0] - distance):
+            return ps[-1], (rs[-1] - rs[-2]) / (ps[-1] - ps[-2])
+        return ps[0], (rs[1] - rs[0]) / (ps[1] - ps[0])
+
+
+def _grid(lo, hi, step):
+    n = int(round((hi - lo) / step))
+    return [lo + i * step for i in range(n + 1)]
+
+
+def _cell(axis, v):
+    """(fraction, lower index) of ``v`` on an evenly spaced ``axis``, clamped."""
+    step = axis[1] - axis[0]
+    t = clamp((v - axis[0]) / step, 0, len(axis) - 1.000001)
+    i = int(t)
+    return t - i, i
+
+
+_TABLE = None
+
+
+def table() -> BallisticTable:
+    global _TABLE
+    if _TABLE is None:
+        _TABLE = BallisticTable()
+    return _TABLE
+
+
+class Impact(NamedTuple):
+    x: float
+    y: float
+    exploded: bool
+    worm: int       # index into game.players, -1 for terrain/fuse/miss
+    steps: int
+
+
+def rollout(game, angle_deg: float, power: float, slot: int, max_steps: int = MAX_ROLLOUT_STEPS) -> Impact:
+    """Fly one shot of the active player like ``fire`` + ``update_projectile``.
+
+    Uses the fixed ``PHYSICS_DT`` step and leaves ``game`` untouched (no
+    crater, no damage, no turn switch).
+    """
+    wpn = weapon_by_slot(slot, game.weapons)
+    shooter = game.shooter
+    direction = 1 if shooter.team == 0 else -1
+    angle_deg = clamp(angle_deg, ANGLE_MIN, ANGLE_MAX)
+    power = clamp(power, POWER_MIN, POWER_MAX)
+    if direction == -1:
+        angle_deg = 180 - angle_deg
+    angle = angle_deg * math.pi / 180
+    speed = launch_speed(power)
+
+    sy = shooter.y - shooter.r * 0.15
+    x = shooter.x * game.width + direction * (shooter.r + 2)
+    y = sy - shooter.r * 0.1
+    vx, vy = math.cos(angle) * speed, -math.sin(angle) * speed
+    r = wpn.proj_r
+    grenade = wpn.key == "grenade"
+    fuse, age, bounces = wpn.fuse, 0.0, 0
+
+    w, h = game.width, game.height
+    wind, gravity = game.wind, game.gravity
+    runs = game.terrain.runs
+    worms = [(pl.x * w, pl.y, pl.r + r) if pl.hp > 0 else None for pl in game.players]
+    grid = game.grid
+    inside = {i for i, pl in enumerate(game.players) if pl.team == shooter.team}
+    sub = PHYSICS_DT
+
+    for step in range(max_steps):
+        age += sub
+        if grenade and fuse > 0 and age >= fuse:
+            return Impact(x, y, True, -1, step)
+
+        x0, y0 = x, y
+        vx += wind * sub
+        vy += gravity * sub
+        x += vx * sub
+        y += vy * sub
+        mx, my = x - x0, y - y0
+
+        t_worm, worm = None, -1
+        x_lo, x_hi = (x0, x) if mx >= 0 else (x, x0)
+        for i in grid.query(x_lo - r, x_hi + r):
+            if worms[i] is None:
+                continue
+            wx, wy, reach = worms[i]
+            if i in inside:
+                ox, oy = x0 - wx, y0 - wy
+                if ox * ox + oy * oy <= reach * reach:
+                    continue
+                inside.discard(i)
+            t = sweep_circle(x0, y0, mx, my, wx, wy, reach)
+            if t is not None and (t_worm is None or t < t_worm):
+                t_worm, worm = t, i
+        t_ground = runs.sweep(x0, y0, x, y, r)
+        if worm >= 0 and (t_ground is None or t_worm <= t_ground):
+            return Impact(x0 + mx * t_worm, y0 + my * t_worm, True, worm, step)
+        if t_ground is not None:
+            x, y = x0 + mx * t_ground, y0 + my * t_ground
+
+        if x < -80 or x > w + 80 or y > h + 120 or y < -160:
+            return Impact(x, y, False, -1, step)
+
+        if t_ground is not None:
+            if grenade and bounces < wpn.bounce:
+                nx, ny = runs.normal(x, y, r)
+                dot = vx * nx + vy * ny
+                vx = (vx - 2 * dot * nx) * 0.62
+                vy = (vy - 2 * dot * ny) * 0.55
+                x, y = runs.push_out(x, y, r, nx, ny)
+                bounces += 1
+            else:
+                return Impact(x, y, True, -1, step)
+    return Impact(x, y, False, -1, max_steps)
+
+
+def damage_at(game, impact: Impact, slot: int):
+    """Damage per player index an explosion at ``impact`` would deal."""
+    out = [0] * len(game.players)
+    if not impact.exploded:
+        return out
+    wpn = weapon_by_slot(slot, game.weapons)
+    for i in game.grid.query(impact.x - wpn.radius, impact.x + wpn.radius):
+        pl = game.players[i]
+        if not pl.alive:
+            continue
+        d = math.hypot(impact.x - pl.x * game.width, impact.y - pl.y)
+        if d <= wpn.radius + pl.r:
+            t = clamp(d / wpn.radius, 0, 1)
+            out[i] = clamp(math.floor(wpn.max_dmg * (1 - t) + 0.5), 0, wpn.max_dmg)
+    return out
+
+
+class Solution(NamedTuple):
+    slot: int
+    angle: float
+    power: float
+    score: float        # expected enemy damage - SELF_WEIGHT * own-team damage (before noise)
+    damage: int         # summed over the enemy team
+    self_damage: int    # summed over the shooter's team
+    miss: float         # signed horizontal overshoot past the target in px
+    rollouts: int
+
+
+def _nearest_enemy(game) -> int:
+    """Index of the closest living worm of the other team (lowest index on ties)."""
+    shooter = game.shooter
+    best, best_d = -1, None
+    for i, pl in enumerate(game.players):
+        if pl.team != shooter.team and pl.hp > 0:
+            d = abs(pl.x - shooter.x)
+            if best_d is None or d < best_d:
+                best, best_d = i, d
+    return best
+
+
+def _solve_slot(game, slot: int, tab: BallisticTable):
+    shooter = game.shooter
+    target_i = _nearest_enemy(game)
+    target = game.players[target_i]
+    direction = 1 if shooter.team == 0 else -1
+    x0 = shooter.x * game.width + direction * (shooter.r + 2)
+    tx = target.x * game.width
+    distance = direction * (tx - x0)
+    wind = direction * game.wind
+
+    best, rollouts = None, 0
+    for angle in CANDIDATE_ANGLES:
+        power, slope = tab.power_for(angle, wind, distance)
+        prev = None
+        for _ in range(ROLLOUTS_PER_ANGLE):
+            power = clamp(power, POWER_MIN, POWER_MAX)
+            impact = rollout(game, angle, power, slot)
+            rollouts += 1
+            dmg = damage_at(game, impact, slot)
+            miss = direction * (impact.x - tx)
+            enemy = own = 0
+            for pl, d in zip(game.players, dmg):
+                if pl.team == shooter.team:
+                    own += d
+                else:
+                    enemy += d
+            score = enemy - SELF_WEIGHT * own
+            cand = Solution(slot, angle, power, score, enemy, own, miss, 0)
+            if best is None or (score, -abs(miss)) > (best.score, -abs(best.miss)):
+                best = cand
+            if impact.worm == target_i:
+                break
+            if prev is not None and miss != prev[1] and power != prev[0]:
+                slope = (miss - prev[1]) / (power - prev[0])
+            prev = (power, miss)
+            if not slope:
+                break
+            step = miss / slope
+            if abs(step) < 0.05:
+                break
+            power -= step
+        if best.damage and not best.self_damage and abs(best.miss) < target.r:
+            break  # clean direct hit; other angles cannot do much better
+    return best._replace(rollouts=rollouts)
+
+
+def solve(game, slot: Optional[int] = None, difficulty: str = "perfect", rng: Optional[Rng] = None) -> Solution:
+    """Best shot for the active player; tries every weapon when ``slot`` is None."""
+    tab = table()
+    slots = (1, 2, 3) if slot is None else (int(clamp(slot, 1, 3)),)
+    best, rollouts = None, 0
+    for s in slots:
+        sol = _solve_slot(game, s, tab)
+        rollouts += sol.rollouts
+        if best is None or (sol.score, -abs(sol.miss)) > (best.score, -abs(best.miss)):
+            best = sol
+    best = best._replace(rollouts=rollouts)
+
+    sigma_a, sigma_p = DIFFICULTY[difficulty]
+    if sigma_a or sigma_p:
+        if rng is None:
+            rng = Rng((game.seed ^ (game.turn * 0x9E3779B9)) & 0xFFFFFFFF)
+        best = best._replace(
+            angle=clamp(best.angle + sigma_a * _gauss(rng), ANGLE_MIN, ANGLE_MAX),
+            power=clamp(best.power + sigma_p * _gauss(rng), POWER_MIN, POWER_MAX),
+        )
+    return best
+
+
+def _gauss(rng: Rng) -> float:
+    """Standard normal sample (Box-Muller), same sequence as the browser."""
+    u1 = 1 - rng.random()
+    u2 = rng.random()
+    return math.sqrt(-2 * math.log(u1)) * math.cos(2 * math.pi * u2)
+
+
+# --- positions outside of a running game -------------------------------------
+
+POS_QUANT = 0.5             # px: worm positions and craters
+WIND_QUANT = 0.25
+TERRAIN_LEVELS = 4096       # terrain samples snap to 1/4096 of the terrain band
+MAX_TERRAIN_N = 4096
+MAX_CRATERS = 512
+MAX_WORLD = 8192
+
+
+class PositionError(ValueError):
+    """Invalid solver input."""
+
+
+def _number(v, lo, hi, what):
+    if isinstance(v, bool) or not isinstance(v, (int, float)) or not (lo <= v <= hi):
+        raise PositionError("bad " + what)
+    return v
+
+
+def _q(v, quant):
+    return int(math.floor(v / quant + 0.5))
+
+
+def _point(data, width, height, what):
+    if not isinstance(data, dict):
+        raise PositionError("bad " + what)
+    x = _number(data.get("x"), 0, width, what + " x")
+    y = _number(data.get("y"), -height, 2 * height, what + " y")
+    return _q(x, POS_QUANT), _q(y, POS_QUANT)
+
+
+@dataclass(frozen=True)
+class Position:
+    """Quantized solver input (all fields in grid units).
+
+    The terrain is either ``terrain`` (samples as 0..TERRAIN_LEVELS) or the
+    generated terrain of ``seed`` with ``craters`` carved in order; the seed
+    also seeds the difficulty noise. The worm left of its opponent shoots to
+    the right, like Player 1.
+    """
+
+    width: int
+    height: int
+    seed: int
+    terrain: Optional[Tuple[int, ...]]
+    craters: Tuple[Tuple[int, int, int], ...]
+    shooter: Tuple[int, int]
+    target: Tuple[int, int]
+    wind: int
+    slot: Optional[int]
+    difficulty: str
+    turn: int
+
+    @classmethod
+    def from_dict(cls, data) -> "Position":
+        if not isinstance(data, dict):
+            raise PositionError("expected an object")
+        width = int(_number(data.get("w", 1024), 320, MAX_WORLD, "world size"))
+        height = int(_number(data.get("h", 480), 320, MAX_WORLD, "world size"))
+        seed = int(_number(data.get("seed", 0), 0, 0xFFFFFFFF, "seed"))
+
+        terrain, craters = None, ()
+        if data.get("terrain") is not None:
+            values = data["terrain"]
+            if not isinstance(values, list) or not 2 <= len(values) <= MAX_TERRAIN_N:
+                raise PositionError("bad terrain")
+            if not all(type(v) in (int, float) and 0 <= v <= 1 for v in values):
+                raise PositionError("bad terrain")
+            terrain = tuple([int(v * TERRAIN_LEVELS + 0.5) for v in values])
+        elif "seed" in data:
+            raw = data.get("craters", [])
+            if not isinstance(raw, list) or len(raw) > MAX_CRATERS:
+                raise PositionError("bad craters")
+            out = []
+            for c in raw:
+                if not isinstance(c, list) or len(c) != 3:
+                    raise PositionError("bad crater")
+                out.append((
+                    _q(_number(c[0], -width, 2 * width, "crater"), POS_QUANT),
+                    _q(_number(c[1], -height, 2 * height, "crater"), POS_QUANT),
+                    _q(_number(c[2], 0, 200, "crater"), POS_QUANT),
+                ))
+            craters = tuple(out)
+        else:
+            raise PositionError("terrain or seed required")
+
+        shooter = _point(data.get("shooter"), width, height, "shooter")
+        target = _point(data.get("target"), width, height, "target")
+        if shooter[0] == target[0]:
+            raise PositionError("shooter and target overlap")
+        wind = _q(_number(data.get("wind", 0), -WIND_MAX, WIND_MAX, "wind"), WIND_QUANT)
+
+        slot = data.get("weapon")
+        if slot is not None:
+            slot = int(_number(slot, 1, 3, "weapon"))
+        difficulty = data.get("difficulty", "perfect")
+        if difficulty not in DIFFICULTY:
+            raise PositionError("bad difficulty")
+        turn = int(_number(data.get("turn", 0), 0, 1 << 20, "turn"))
+        return cls(width, height, seed, terrain, craters, shooter, target, wind, slot, difficulty, turn)
+
+    def key(self) -> str:
+        """Digest of the quantized input; equal keys yield equal solutions."""
+        h = hashlib.blake2b(digest_size=16)
+        h.update(struct.pack(
+            "<HHIiiiiiBBI", self.width, self.height, self.seed, *self.shooter, *self.target,
+            self.wind, self.slot or 0, list(DIFFICULTY).index(self.difficulty), self.turn,
+        ))
+        if self.terrain is not None:
+            h.update(b"T" + struct.pack("<%dH" % len(self.terrain), *self.terrain))
+        else:
+            h.update(b"C" + b"".join(struct.pack("<iii", *c) for c in self.craters))
+        return h.hexdigest()
+
+    def game(self):
+        """A ``Game`` in this position with the shooter to move."""
+        if self.terrain is not None:
+            terrain = Terrain([v / TERRAIN_LEVELS for v in self.terrain], self.width, self.height)
+        else:
+            terrain = Terrain.generate(Rng(self.seed), self.width, self.height, TERRAIN_N)
+            for cx, cy, r in self.craters:
+                terrain.apply_crater(cx * POS_QUANT, cy * POS_QUANT, r * POS_QUANT)
+
+        left, right = sorted((self.shooter, self.target))
+        players = [
+            Player(i + 1, "Player %d" % (i + 1), x * POS_QUANT / self.width, y * POS_QUANT, team=i)
+            for i, (x, y) in enumerate((left, right))
+        ]
+        return Game(
+            seed=self.seed, width=self.width, height=self.height, terrain=terrain,
+            players=players, active=0 if self.shooter == left else 1,
+            wind=self.wind * WIND_QUANT, turn=self.turn,
+        )
+
+    def solve(self) -> Solution:
+        return solve(self.game(), self.slot, self.difficulty)
@@ -0,0 +1,254 @@
+"""NumPy batch trajectory simulator.
+
+Advances N projectiles at once with exactly the per-substep rules of
+``Game.update_projectile`` (fuse, wind, gravity, swept worm and terrain
+contact, bounds, grenade bounce). Finished lanes are masked out, so each substep only
+touches lanes still in flight. Craters are not applied: every lane flies
+over the same, unchanged terrain.
+
+Requires numpy (not needed by the web service itself).
+"""
+
+import math
+
+try:
+    import numpy as np
+except ImportError as exc:  # pragma: no cover - depends on environment
+    raise ImportError("engine.batch requires numpy (pip install numpy)") from exc
+
+from .weapons import GRAVITY, SUBSTEPS, launch_speed, weapon_by_slot
+
+# Lane outcomes
+FLYING = 0     # still in the air after max_frames
+TERRAIN = 1    # hit the ground
+WORM = 2       # hit a worm (see ``BatchResult.worm``)
+OUT = 3        # left the world ("Verfehlt.")
+FUSE = 4       # grenade fuse ran out
+
+
+class BatchResult:
+    """Per-lane outcome, impact point, flight frames and hit worm index (-1)."""
+
+    def __init__(self, outcome, x, y, frames, worm):
+        self.outcome = outcome
+        self.x = x
+        self.y = y
+        self.frames = frames
+        self.worm = worm
+
+    def __len__(self):
+        return len(self.outcome)
+
+    @property
+    def exploded(self):
+        return (self.outcome == TERRAIN) | (self.outcome == WORM) | (self.outcome == FUSE)
+
+
+def shot_grid(angles, powers, winds, slots=(1,)):
+    """Cartesian product of the inputs as flat, equally long arrays."""
+    a, p, w, s = np.meshgrid(
+        np.asarray(angles, float), np.asarray(powers, float),
+        np.asarray(winds, float), np.asarray(slots, int), indexing="ij",
+    )
+    return a.ravel(), p.ravel(), w.ravel(), s.ravel()
+
+
+def sweep_circles(x0, y0, dx, dy, cx, cy, reach):
+    """Vectorized ``game.sweep_circle``; NaN where the circle is not reached."""
+    ox, oy = x0 - cx, y0 - cy
+    c = ox * ox + oy * oy - reach * reach
+    b = ox * dx + oy * dy
+    a = dx * dx + dy * dy
+    disc = b * b - a * c
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = (-b - np.sqrt(disc)) / a
+    t = np.where((b < 0) & (disc >= 0) & (t <= 1), t, np.nan)
+    return np.where(c <= 0, 0.0, t)
+
+
+def launch_lanes(shooter, width, angle_deg, power, direction=None):
+    """Start position and velocity per lane, as ``Game.fire`` computes them."""
+    if direction is None:
+        direction = 1 if shooter.team == 0 else -1
+    angle_deg = np.asarray(angle_deg, float)
+    if direction == -1:
+        angle_deg = 180 - angle_deg
+    angle = angle_deg * math.pi / 180
+    speed = launch_speed(np.asarray(power, float))
+
+    sx = shooter.x * width
+    sy = shooter.y - shooter.r * 0.15
+    n = max(np.size(angle), np.size(speed))
+    x0 = np.full(n, sx + direction * (shooter.r + 2))
+    y0 = np.full(n, sy - shooter.r * 0.1)
+    return x0, y0, np.cos(angle) * speed, -np.sin(angle) * speed
+
+
+def simulate(
+    terrain,
+    x0, y0, vx0, vy0,
+    wind,
+    slots,
+    worms=(),
+    owner=None,
+    gravity=GRAVITY,
+    dt=1 / 60,
+    substeps=SUBSTEPS,
+    max_frames=900,
+    weapons=None,
+):
+    """Fly every lane until it explodes, leaves the world or times out.
+
+    ``worms`` is a sequence of (x, y, r) circles, like the live players in
+    ``Game.projectile_sweep_worms``; ``owner`` is the index (or a sequence of
+    indices) of the shooter's team circles, each ignored per lane until the
+    lane has left it. ``weapons`` overrides the weapon table like
+    ``Game.weapons``.
+    """
+    x = np.array(x0, float)
+    y = np.array(y0, float)
+    n = x.size
+    vx = np.broadcast_to(np.asarray(vx0, float), (n,)).copy()
+    vy = np.broadcast_to(np.asarray(vy0, float), (n,)).copy()
+    wind = np.broadcast_to(np.asarray(wind, float), (n,))
+
+    slots = np.broadcast_to(np.asarray(slots, int), (n,))
+    table = [weapon_by_slot(s, weapons) for s in (1, 2, 3)]
+    pick = np.clip(slots, 1, 3) - 1
+    proj_r = np.array([w.proj_r for w in table])[pick]
+    # like Game.update_projectile: only the grenade has a fuse and bounces
+    fuse = np.array([w.fuse if w.key == "grenade" else 0.0 for w in table])[pick]
+    max_bounce = np.array([w.bounce if w.key == "grenade" else 0 for w in table])[pick]
+
+    runs = terrain.runs
+    sweep_ground = runs.sweep_many
+    width, height = terrain.width, terrain.height
+
+    age = np.zeros(n)
+    bounces = np.zeros(n, int)
+    owners = () if owner is None else (owner,) if isinstance(owner, int) else tuple(owner)
+    armed = {k: np.zeros(n, bool) for k in owners}
+    active = np.ones(n, bool)
+    outcome = np.full(n, FLYING, np.int8)
+    hit_x = np.full(n, np.nan)
+    hit_y = np.full(n, np.nan)
+    frames = np.zeros(n, np.int32)
+    worm_hit = np.full(n, -1, np.int16)
+
+    def finish(lanes, code, fx, fy):
+        active[lanes] = False
+        outcome[lanes] = code
+        hit_x[lanes] = fx
+        hit_y[lanes] = fy
+
+    sub = dt / substeps
+    for _ in range(max_frames):
+        live = np.flatnonzero(active)
+        if live.size == 0:
+            break
+        frames[live] += 1
+
+        for _ in range(substeps):
+            i = np.flatnonzero(active)
+            if i.size == 0:
+                break
+            age[i] += sub
+
+            fz = (fuse[i] > 0) & (age[i] >= fuse[i])
+            if fz.any():
+                j = i[fz]
+                finish(j, FUSE, x[j], y[j])
+                i = i[~fz]
+
+            x0, y0 = x[i], y[i]
+            vx[i] += wind[i] * sub
+            vy[i] += gravity * sub
+            x[i] += vx[i] * sub
+            y[i] += vy[i] * sub
+            mx, my = x[i] - x0, y[i] - y0
+
+            # earliest contact along the substep: worm first on a tie
+            t_worm = np.full(i.size, np.nan)
+            k_worm = np.full(i.size, -1, np.int16)
+            for k, (wx, wy, wr) in enumerate(worms):
+                reach = wr + proj_r[i]
+                t = sweep_circles(x0, y0, mx, my, wx, wy, reach)
+                if k in armed:
+                    ox, oy = x0 - wx, y0 - wy
+                    skip = ~armed[k][i] & (ox * ox + oy * oy <= reach * reach)
+                    armed[k][i[~skip]] = True
+                    t[skip] = np.nan
+                better = t < t_worm
+                better |= np.isnan(t_worm) & ~np.isnan(t)
+                t_worm[better] = t[better]
+                k_worm[better] = k
+            t_ground = sweep_ground(x0, y0, x[i], y[i], proj_r[i])
+
+            hit = ~np.isnan(t_worm) & ~(t_worm > t_ground)
+            if hit.any():
+                j = i[hit]
+                finish(j, WORM, x0[hit] + mx[hit] * t_worm[hit], y0[hit] + my[hit] * t_worm[hit])
+                worm_hit[j] = k_worm[hit]
+                keep = ~hit
+                i, x0, y0, mx, my, t_ground = i[keep], x0[keep], y0[keep], mx[keep], my[keep], t_ground[keep]
+
+            touch = ~np.isnan(t_ground)
+            if touch.any():
+                j = i[touch]
+                x[j] = x0[touch] + mx[touch] * t_ground[touch]
+                y[j] = y0[touch] + my[touch] * t_ground[touch]
+
+            out = (x[i] < -80) | (x[i] > width + 80) | (y[i] > height + 120) | (y[i] < -160)
+            if out.any():
+                j = i[out]
+                finish(j, OUT, x[j], y[j])
+                i, touch = i[~out], touch[~out]
+
+            if not touch.any():
+                continue
+
+            can_bounce = touch & (bounces[i] < max_bounce[i])
+            boom = touch & ~can_bounce
+            if boom.any():
+                j = i[boom]
+                finish(j, TERRAIN, x[j], y[j])
+
+            if can_bounce.any():
+                j = i[can_bounce]
+                r = proj_r[j]
+                nx, ny = runs.normal_many(x[j], y[j], r)
+                dot = vx[j] * nx + vy[j] * ny
+                vx[j] = (vx[j] - 2 * dot * nx) * 0.62
+                vy[j] = (vy[j] - 2 * dot * ny) * 0.55
+                x[j], y[j] = runs.push_out_many(x[j], y[j], r, nx, ny)
+                bounces[j] += 1
+
+    still = active
+    hit_x[still] = x[still]
+    hit_y[still] = y[still]
+    return BatchResult(outcome, hit_x, hit_y, frames, worm_hit)
+
+
+def simulate_game_shots(game, angle_deg, power, wind=None, slots=None, **kwargs):
+    """Batch-fly shots of ``game``'s active player over its current terrain."""
+    shooter = game.shooter
+    x0, y0, vx0, vy0 = launch_lanes(shooter, game.width, angle_deg, power)
+    live = [pl for pl in game.players if pl.hp > 0]
+    worms = [(pl.x * game.width, pl.y, pl.r) for pl in live]
+    owner = [k for k, pl in enumerate(live) if pl.team == shooter.team]
+    return simulate(
+        game.terrain, x0, y0, vx0, vy0,
+        game.wind if wind is None else wind,
+        game.weapon_slot if slots is None else slots,
+        worms=worms,
+        owner=owner,
+        gravity=game.gravity,
+        weapons=game.weapons,
+        **kwargs,
+    )
+
+
+__all__ = [
+    "FLYING", "TERRAIN", "WORM", "OUT", "FUSE",
+    "BatchResult", "launch_lanes", "shot_grid", "simulate", "simulate_game_shots", "sweep_circles",
+]
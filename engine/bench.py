@@ -0,0 +1,164 @@
+"""Micro-benchmarks for the headless engine.
+
+Usage: ``python -m engine.bench batch [--lanes 20000]``
+       ``python -m engine.bench worms [--shots 24]``
+       ``python -m engine.bench carve [--craters 400]``
+"""
+
+import argparse
+import copy
+import random
+import sys
+import time
+
+from .broadphase import ColumnGrid
+from .game import Game
+from .terrain import Terrain
+from .weapons import PHYSICS_DT
+
+
+def _scalar_shot(game, angle, power, wind, slot, dt):
+    """One shot through ``Game`` on a private copy of terrain and players."""
+    g = Game(
+        seed=game.seed, width=game.width, height=game.height,
+        terrain=Terrain(list(game.terrain.values), game.width, game.height),
+        players=copy.deepcopy(game.players),
+        rng=copy.copy(game.rng),
+    )
+    g.active = game.active
+    g.wind = wind
+    g.set_weapon(slot)
+    g.aim(angle, power)
+    g.fire()
+    g.events.clear()
+    while g.phase == "projectile":
+        g.update_projectile(dt)
+    for ev in g.events:
+        if ev[0] == "explosion":
+            return ev[1], ev[2]
+    return None
+
+
+def bench_batch(lanes: int, scalar_lanes: int, seed: int = 42):
+    import numpy as np
+
+    from . import batch
+
+    game = Game(seed=seed)
+    side = max(2, round((lanes / 3) ** (1 / 3)))
+    angles, powers, winds, slots = batch.shot_grid(
+        np.linspace(10, 80, side), np.linspace(10, 100, side), np.linspace(-55, 55, side), (1, 2, 3),
+    )
+    n = angles.size
+
+    t0 = time.perf_counter()
+    res = batch.simulate_game_shots(game, angles, powers, winds, slots)
+    t_batch = time.perf_counter() - t0
+
+    pick = np.linspace(0, n - 1, min(scalar_lanes, n)).astype(int)
+    worst = 0.0
+    t0 = time.perf_counter()
+    for i in pick:
+        hit = _scalar_shot(game, angles[i], powers[i], winds[i], slots[i], 1 / 60)
+        if hit is not None and res.exploded[i]:
+            worst = max(worst, abs(hit[0] - res.x[i]), abs(hit[1] - res.y[i]))
+    t_scalar = time.perf_counter() - t0
+
+    batch_rate = n / t_batch
+    scalar_rate = len(pick) / t_scalar
+    print(f"batch : {n:8d} shots in {t_batch:.3f}s -> {batch_rate:12.0f} shots/s")
+    print(f"scalar: {len(pick):8d} shots in {t_scalar:.3f}s -> {scalar_rate:12.0f} shots/s")
+    print(f"speedup {batch_rate / scalar_rate:.1f}x, max |batch - scalar| impact = {worst:.3g} px")
+
+
+def _team_match(team_size: int, shots: int, linear: bool, seed: int = 42):
+    """Play ``shots`` fixed shots; returns (seconds in update, frames, awake worm-steps, hp)."""
+    g = Game(seed=seed, team_size=team_size)
+    if linear:
+        # one column spanning the world: every query returns every worm
+        g.grid = ColumnGrid(g.width, g.width)
+        g.grid.build(g.players)
+    spent, frames, moving = 0.0, 0, 0
+    for k in range(shots):
+        if g.phase == "gameover":
+            break
+        g.set_weapon(1 + k % 3)
+        g.aim(30 + (k * 17) % 50, 45 + (k * 29) % 50)
+        g.fire()
+        turn = g.turn
+        t0 = time.perf_counter()
+        while g.phase != "gameover" and g.turn == turn:
+            moving += len(g.awake)
+            g.update(PHYSICS_DT)
+            frames += 1
+        spent += time.perf_counter() - t0
+    return spent, frames, moving, [pl.hp for pl in g.players]
+
+
+def bench_worms(shots: int, sizes=(1, 2, 4, 8, 16)):
+    print(f"{'worms':>5}  {'frames':>7}  {'awake/frame':>11}  {'grid us/frame':>13}  {'linear us/frame':>15}")
+    for n in sizes:
+        t_grid, frames, moving, hp = _team_match(n, shots, False)
+        t_lin, frames_lin, _, hp_lin = _team_match(n, shots, True)
+        assert (frames, hp) == (frames_lin, hp_lin), "broadphase changed the outcome"
+        print(f"{2 * n:5d}  {frames:7d}  {moving / frames:11.2f}  "
+              f"{t_grid / frames * 1e6:13.2f}  {t_lin / frames * 1e6:15.2f}")
+
+
+def bench_carve(craters: int, sizes=(1, 8), seed: int = 42):
+    """Carve random craters (bazooka to banana size, down into the ground)
+    and report carve/query time and the memory of the column runs."""
+    print(f"{'screens':>7}  {'columns':>7}  {'KiB new':>7}  {'KiB carved':>10}  {'spans/col':>9}  "
+          f"{'carve us':>8}  {'sweep us':>8}")
+    for screens in sizes:
+        g = Game(seed=seed, screens=screens)
+        runs = g.terrain.runs
+        fresh = runs.nbytes()
+        rng = random.Random(seed)
+        holes = []
+        for _ in range(craters):
+            x = rng.uniform(0, g.width)
+            holes.append((x, runs.surface(x) + rng.uniform(-20, 160), rng.uniform(22, 70)))
+        t0 = time.perf_counter()
+        for cx, cy, r in holes:
+            runs.carve(cx, cy, r)
+        t_carve = (time.perf_counter() - t0) / craters
+
+        # falling shots through the carved ground, the collision hot path
+        shots = [(rng.uniform(0, g.width), rng.uniform(-80, runs.bedrock)) for _ in range(2000)]
+        t0 = time.perf_counter()
+        for x, y in shots:
+            runs.sweep(x, y, x + 1.5, y + 2.5, 5)
+        t_sweep = (time.perf_counter() - t0) / len(shots)
+
+        spans = sum(len(s) for s in runs.spans) / 2
+        print(f"{screens:7d}  {runs.count:7d}  {fresh / 1024:7.1f}  {runs.nbytes() / 1024:10.1f}  "
+              f"{spans / runs.count:9.2f}  {t_carve * 1e6:8.1f}  {t_sweep * 1e6:8.2f}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Mini Worms engine benchmarks")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("batch", help="NumPy batch simulator vs. scalar Game loop")
+    p.add_argument("--lanes", type=int, default=20000)
+    p.add_argument("--scalar-lanes", type=int, default=300)
+
+    p = sub.add_parser("worms", help="per-frame update cost from 1v1 to 16v16")
+    p.add_argument("--shots", type=int, default=24)
+
+    p = sub.add_parser("carve", help="crater carving time and column-run memory, 1 and 8 screens")
+    p.add_argument("--craters", type=int, default=400)
+
+    args = parser.parse_args(argv)
+    if args.cmd == "batch":
+        bench_batch(args.lanes, args.scalar_lanes)
+    elif args.cmd == "worms":
+        bench_worms(args.shots)
+    elif args.cmd == "carve":
+        bench_carve(args.craters)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""Uniform x-column broadphase for worms.
+
+Worms only ever overlap a few columns of ``COLUMN_W`` px, and their x only
+changes under knockback, so each column keeps the sorted indices of the
+worms whose horizontal extent ``[x - r, x + r]`` touches it. A query for
+an x-interval visits the columns it spans and returns the candidate
+indices in ascending order, so callers see the same order as a linear scan
+over ``players`` and stay bit-identical with it.
+
+Mirror of ``gridBuild``/``gridMove``/``gridQuery`` in the browser script.
+"""
+
+import math
+
+COLUMN_W = 32.0   # px; a bit wider than a worm (r = 12)
+
+
+class ColumnGrid:
+    __slots__ = ("width", "cell", "cols", "spans", "_mark", "_stamp")
+
+    def __init__(self, width: float, cell: float = COLUMN_W):
+        self.width = width
+        self.cell = cell
+        self.cols = [[] for _ in range(max(1, math.ceil(width / cell)))]
+        self.spans = []
+        self._mark = []
+        self._stamp = 0
+
+    def _col(self, x: float) -> int:
+        c = math.floor(x / self.cell)
+        last = len(self.cols) - 1
+        return 0 if c < 0 else last if c > last else c
+
+    def build(self, players):
+        """Index every worm (dead ones too: they are skipped by the callers)."""
+        for col in self.cols:
+            col.clear()
+        self.spans = [None] * len(players)
+        self._mark = [0] * len(players)
+        for i, pl in enumerate(players):
+            self._insert(i, pl)
+
+    def _insert(self, i: int, pl):
+        x = pl.x * self.width
+        c0, c1 = self._col(x - pl.r), self._col(x + pl.r)
+        self.spans[i] = (c0, c1)
+        for c in range(c0, c1 + 1):
+            col = self.cols[c]
+            k = len(col)
+            while k and col[k - 1] > i:
+                k -= 1
+            col.insert(k, i)
+
+    def move(self, i: int, pl):
+        """Re-index worm ``i`` after its x changed."""
+        c0, c1 = self.spans[i]
+        x = pl.x * self.width
+        if (c0, c1) == (self._col(x - pl.r), self._col(x + pl.r)):
+            return
+        for c in range(c0, c1 + 1):
+            self.cols[c].remove(i)
+        self._insert(i, pl)
+
+    def query(self, x_lo: float, x_hi: float):
+        """Indices of worms whose extent may overlap ``[x_lo, x_hi]``, ascending."""
+        c0, c1 = self._col(x_lo), self._col(x_hi)
+        if c0 == c1:
+            return self.cols[c0]
+        self._stamp += 1
+        stamp, mark = self._stamp, self._mark
+        out = []
+        for c in range(c0, c1 + 1):
+            for i in self.cols[c]:
+                if mark[i] != stamp:
+                    mark[i] = stamp
+                    out.append(i)
+        out.sort()
+        return out
@@ -0,0 +1,277 @@
+"""Cross-check the Python engine against the browser JS.
+
+Pulls the physics functions out of ``main.HTML``, runs them under node with
+the same seeded terrain, wind and shot inputs as ``Game``, and compares the
+per-frame projectile positions, impact points, terrain columns, hit points and worm
+positions, and the CPU opponent's solution (``aiSolve`` vs
+``engine.ai.solve``) per turn, in duels and in team matches.
+
+Usage: ``python -m engine.crosscheck [--tol 1e-6] [--node node]``
+"""
+
+import argparse
+import json
+import re
+import shutil
+import subprocess
+import sys
+
+from .ai import solve
+from .game import Game
+from .rng import MULBERRY32_JS
+from .weapons import MAX_SUBSTEP, PHYSICS_DT
+
+# JS functions (and vars) the harness lifts from the page script.
+JS_FUNCTIONS = (
+    "clamp", "lerp", "dist", "makeTerrain", "terrainSample", "terrainSurfaceY", "terrainChunk",
+    "runNormalDirs", "runsChunk", "runsCol", "runsTop", "terrainColumns", "buildHeightfield",
+    "markTerrainDirty", "terrainYAt", "terrainGroundY", "terrainSolid", "terrainTouch",
+    "terrainSweep", "terrainNormal", "terrainPushOut", "applyCrater", "spawnPlayers",
+    "gridBuild", "gridCol", "gridInsert", "gridMove", "gridQuery", "reindexWorms",
+    "explosion", "allPlayersStable", "teamName", "playerName", "checkGameOver", "endShotAndSwitch",
+    "impactExplode", "sweepCircle", "projectileSweepWorms", "updateWormPhysics",
+    "updateProjectile", "projectileSubstep", "updatePost", "update", "newTurn", "fire",
+    "weaponBySlot", "aiGrid", "aiTable", "aiCell", "aiPowerFor", "aiRollout", "aiDamageAt",
+    "aiBetter", "aiNearestEnemy", "aiSolveSlot", "aiGauss", "aiSolve",
+)
+JS_VARS = (
+    "WEAPONS", "TERRAIN_COLUMNS_PER_SAMPLE", "RUN_CHUNK_SHIFT", "RUN_CHUNK", "RUN_CHUNK_MASK",
+    "RUN_MIN_SPAN", "RUN_SWEEP_REFINE", "RUN_PUSH_OUT", "RUN_NORMAL_DIRS", "GRID_COLUMN_W", "KNOCKBACK", "AI_DIFFICULTY", "AI_ANGLES", "AI_ROLLOUTS_PER_ANGLE", "AI_MAX_ROLLOUT_STEPS",
+    "AI_SELF_WEIGHT", "aiTableCache",
+)
+AI_DIFFICULTY = "medium"
+
+# (seed, weapon slot, angle, power) per case; every case plays two turns.
+DEFAULT_CASES = [
+    (seed, slot, angle, power)
+    for seed in (1, 7, 42, 1234)
+    for slot in (1, 2, 3)
+    for angle, power in ((30, 55), (45, 62), (62, 80), (78, 95))
+]
+# (seed, team size) per team case; every case plays TEAM_TURNS fixed shots.
+TEAM_CASES = [(seed, teams) for seed in (3, 42) for teams in (4, 16)]
+TEAM_TURNS = 8
+# (seed, team size, screens) per wide-map case; played like the team cases.
+WIDE_CASES = [(5, 1, 3), (9, 4, 3), (21, 8, 8)]
+
+FRAME_DT = PHYSICS_DT
+MAX_FRAMES = 3600
+
+_HARNESS_JS = """
+var state = null;
+var toasts = [];
+var TERRAIN_EDIT_LOG = 32;
+var Net = { on: false };  // offline: fire() simulates locally
+function nowMs(){ return 0; }
+function showToast(msg){ toasts.push(msg); }
+function updateHud(){}
+function setWeapon(slot){
+  state.weaponSlot = clamp(slot, 1, 3);
+  state.weapon = slot === 1 ? WEAPONS.bazooka : (slot === 2 ? WEAPONS.grenade : WEAPONS.banana);
+}
+function runCase(c){
+  var rng = mulberry32(c.seed);
+  state = {
+    view: { w: c.width, h: c.height }, seed: c.seed, rng: rng, terrainN: (c.n - 1) * c.screens + 1,
+    terrain: makeTerrain((c.n - 1) * c.screens + 1, rng, c.screens),
+    players: spawnPlayers(c.teams, c.screens), teamSize: c.teams, cursor: [0, c.teams - 1],
+    grid: null, awake: null, active: 0, angleDeg: 45, power: 62, weaponSlot: 1, weapon: WEAPONS.bazooka,
+    wind: 0, gravity: 420, projectile: null, phase: "aim", inputLocked: false,
+    fx: { explosion: null }, pendingSwitch: false, postShotHold: 0, winner: 0, turn: 0,
+    heightfield: null
+  };
+  buildHeightfield();
+  for(var i=0;i<state.players.length;i++){
+    var pl = state.players[i];
+    pl.y = terrainYAt(pl.x * state.view.w) - pl.r - 1;
+  }
+  reindexWorms();
+  state.wind = (rng() * 2 - 1) * 55;
+  var terrain0 = terrainColumns();
+  var shots = [];
+  for(var s=0; s<c.shots.length; s++){
+    if(state.phase === "gameover") break;
+    var shot = c.shots[s];
+    setWeapon(shot[0]); state.angleDeg = shot[1]; state.power = shot[2];
+    var turn = state.turn, path = [];
+    var sol = aiSolve(null, c.ai);
+    var ai = [sol.slot, sol.angle, sol.power, sol.damage, sol.rollouts];
+    fire();
+    for(var f=0; f<c.maxFrames; f++){
+      update(c.dt);
+      if(state.projectile) path.push([state.projectile.x, state.projectile.y]);
+      if(state.phase === "gameover" || state.turn !== turn) break;
+    }
+    shots.push({ path: path, hp: state.players.map(function(p){ return p.hp; }),
+                 ys: state.players.map(function(p){ return p.y; }),
+                 xs: state.players.map(function(p){ return p.x; }), wind: state.wind, ai: ai });
+  }
+  return { terrain0: terrain0, terrain: terrainColumns(), shots: shots };
+}
+var input = JSON.parse(require("fs").readFileSync(0, "utf8"));
+process.stdout.write(JSON.stringify(input.map(runCase)));
+"""
+
+
+def extract_js_function(source: str, name: str) -> str:
+    """Return the full ``function name(...){...}`` definition from ``source``."""
+    m = re.search(r"function\s+" + re.escape(name) + r"\s*\(", source)
+    if not m:
+        raise KeyError(f"JS function not found: {name}")
+    return source[m.start():_match_brace(source, source.index("{", m.end()))]
+
+
+def extract_js_var(source: str, name: str) -> str:
+    """Return ``var name = ...;`` from ``source`` (object/array literal or one-liner)."""
+    m = re.search(r"var\s+" + re.escape(name) + r"\s*=\s*", source)
+    if not m:
+        raise KeyError(f"JS var not found: {name}")
+    if source[m.end()] in "{[":
+        return source[m.start():_match_brace(source, m.end())] + ";"
+    return source[m.start():source.index(";", m.end()) + 1]
+
+
+def _match_brace(source: str, start: int) -> int:
+    depth = 0
+    for i in range(start, len(source)):
+        ch = source[i]
+        if ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    raise ValueError("unbalanced braces")
+
+
+def build_harness(source: str) -> str:
+    parts = [MULBERRY32_JS, f"var MAX_SUBSTEP = {MAX_SUBSTEP!r};", f"var PHYSICS_DT = {PHYSICS_DT!r};"]
+    parts += [extract_js_var(source, name) for name in JS_VARS]
+    parts += [extract_js_function(source, name) for name in JS_FUNCTIONS]
+    parts.append(_HARNESS_JS)
+    return "\n".join(parts)
+
+
+def run_python(case):
+    game = Game(
+        seed=case["seed"], width=case["width"], height=case["height"], terrain_n=case["n"],
+        team_size=case["teams"], screens=case["screens"],
+    )
+    terrain0 = game.terrain.runs.columns()
+    shots = []
+    for slot, angle, power in case["shots"]:
+        if game.phase == "gameover":
+            break
+        sol = solve(game, difficulty=case["ai"])
+        ai = [sol.slot, sol.angle, sol.power, sol.damage, sol.rollouts]
+        path = game.play_shot(angle, power, slot, dt=case["dt"], max_frames=case["maxFrames"])
+        shots.append({
+            "path": path,
+            "hp": [pl.hp for pl in game.players],
+            "ys": [pl.y for pl in game.players],
+            "xs": [pl.x for pl in game.players],
+            "wind": game.wind,
+            "ai": ai,
+        })
+    return {"terrain0": terrain0, "terrain": game.terrain.runs.columns(), "shots": shots}
+
+
+def run_js(cases, source: str, node: str = "node"):
+    proc = subprocess.run(
+        [node, "-e", build_harness(source)],
+        input=json.dumps(cases),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(proc.stdout)
+
+
+def _max_diff(a, b):
+    if len(a) != len(b):
+        return float("inf")
+    worst = 0.0
+    for x, y in zip(a, b):
+        if isinstance(x, (list, tuple)):
+            worst = max(worst, _max_diff(x, y))
+        else:
+            worst = max(worst, abs(x - y))
+    return worst
+
+
+def compare(py, js):
+    """Largest absolute deviation per quantity for one case."""
+    report = {
+        "terrain0": _max_diff(py["terrain0"], js["terrain0"]),
+        "terrain": _max_diff(py["terrain"], js["terrain"]),
+        "shots": len(py["shots"]) - len(js["shots"]),
+        "path": 0.0,
+        "hp": 0.0,
+        "ys": 0.0,
+        "xs": 0.0,
+        "wind": 0.0,
+        "ai": 0.0,
+    }
+    for ps, js_s in zip(py["shots"], js["shots"]):
+        for key in ("path", "hp", "ys", "xs", "ai"):
+            report[key] = max(report[key], _max_diff(ps[key], js_s[key]))
+        report["wind"] = max(report["wind"], abs(ps["wind"] - js_s["wind"]))
+    return report
+
+
+def make_cases(width=1024, height=480, n=620):
+    cases = []
+    for seed, slot, angle, power in DEFAULT_CASES:
+        cases.append({
+            "seed": seed, "width": width, "height": height, "n": n, "teams": 1, "screens": 1,
+            "dt": FRAME_DT, "maxFrames": MAX_FRAMES, "ai": AI_DIFFICULTY,
+            # shooter 1 plays the case, shooter 2 answers with a fixed bazooka shot
+            "shots": [(slot, angle, power), (1, 45, 62)],
+        })
+    for seed, teams in TEAM_CASES:
+        cases.append({
+            "seed": seed, "width": width, "height": height, "n": n, "teams": teams, "screens": 1,
+            "dt": FRAME_DT, "maxFrames": MAX_FRAMES, "ai": AI_DIFFICULTY,
+            "shots": [(1 + k % 3, 30 + (k * 17) % 50, 45 + (k * 29) % 50) for k in range(TEAM_TURNS)],
+        })
+    for seed, teams, screens in WIDE_CASES:
+        cases.append({
+            "seed": seed, "width": width * screens, "height": height, "n": n, "teams": teams,
+            "screens": screens, "dt": FRAME_DT, "maxFrames": MAX_FRAMES, "ai": AI_DIFFICULTY,
+            "shots": [(1 + k % 3, 30 + (k * 17) % 50, 45 + (k * 29) % 50) for k in range(TEAM_TURNS)],
+        })
+    return cases
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tol", type=float, default=1e-6, help="max abs deviation (px / hp)")
+    parser.add_argument("--node", default="node")
+    args = parser.parse_args(argv)
+
+    if shutil.which(args.node) is None:
+        print(f"node not found ({args.node}); cannot cross-check", file=sys.stderr)
+        return 2
+
+    from main import HTML  # late import: pulls in Flask
+
+    cases = make_cases()
+    js_results = run_js(cases, HTML, args.node)
+
+    failures = 0
+    worst = {}
+    for case, js in zip(cases, js_results):
+        report = compare(run_python(case), js)
+        for key, val in report.items():
+            worst[key] = max(worst.get(key, 0), abs(val))
+        if any(abs(v) > args.tol for v in report.values()):
+            failures += 1
+            print(f"MISMATCH seed={case['seed']} teams={case['teams']} shots={case['shots']}: {report}")
+
+    print(f"{len(cases)} cases, {failures} mismatches, worst deviation: "
+          + ", ".join(f"{k}={v:.3g}" for k, v in worst.items()))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
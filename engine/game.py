@@ -0,0 +1,471 @@
+"""Headless port of the browser game rules.
+
+``Game`` mirrors the JS ``state`` object together with ``startGame``,
+``newTurn``, ``fire``, ``explosion``, ``updateProjectile``,
+``updateWormPhysics`` and ``update``. Toasts and visual effects are replaced
+by entries in ``Game.events`` so callers can observe what happened.
+
+``team_size`` worms per side (1 = the classic duel) take turns team by team;
+``grid`` indexes them by x-column for projectile and explosion queries.
+"""
+
+import math
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from .broadphase import ColumnGrid
+from .rng import Rng
+from .terrain import Terrain, clamp
+from .weapons import (
+    ANGLE_MAX,
+    ANGLE_MIN,
+    DEFAULT_HEIGHT,
+    DEFAULT_WIDTH,
+    GRAVITY,
+    KNOCKBACK,
+    MAX_MAP_SCREENS,
+    MAX_TEAM_SIZE,
+    PHYSICS_DT,
+    POWER_MAX,
+    POWER_MIN,
+    TERRAIN_N,
+    WIND_MAX,
+    launch_speed,
+    substeps_for,
+    weapon_by_slot,
+)
+
+
+@dataclass
+class Player:
+    id: int
+    name: str
+    x: float              # normalized 0..1
+    y: float = 0.0        # px
+    r: float = 12.0
+    hp: float = 100.0
+    vy: float = 0.0
+    falling: bool = False
+    alive: bool = True
+    team: int = 0
+    vx: float = 0.0       # px/s, only while knocked back
+
+
+@dataclass
+class Projectile:
+    x: float
+    y: float
+    vx: float
+    vy: float
+    r: float
+    owner: int
+    fuse: float
+    age: float = 0.0
+    bounces: int = 0
+    # ids of the shooter's team the projectile has not been outside of yet:
+    # it spawns inside the shooter, and in a crowded team inside neighbours
+    inside: list = field(default_factory=list)
+
+
+def spawn_players(team_size: int, screens: int = 1):
+    """Worms of both teams, team 0 on the left facing right; ids 1..2n.
+
+    On wider maps the front line stays as far apart as on one screen (shots
+    have a limited range); teams spread over up to three screens.
+    """
+    spread = min(screens, 3) if team_size > 1 else 1
+    players = []
+    for team in (0, 1):
+        for k in range(team_size):
+            x = 0.18 if team_size == 1 else 0.06 + 0.36 * k / (team_size - 1)
+            if screens > 1:
+                x = 0.5 + (-0.08 + (x - 0.42) * spread) / screens
+            pid = team * team_size + k + 1
+            name = "Player %d" % (team + 1) if team_size == 1 else "Team %d · Wurm %d" % (team + 1, k + 1)
+            players.append(Player(pid, name, x if team == 0 else 1 - x, team=team))
+    return players
+
+
+def sweep_circle(x0, y0, dx, dy, cx, cy, reach):
+    """First fraction ``t`` of the move (x0, y0) -> +(dx, dy) that comes
+    within ``reach`` of (cx, cy): 0 when it starts inside, None if never."""
+    ox, oy = x0 - cx, y0 - cy
+    c = ox * ox + oy * oy - reach * reach
+    if c <= 0:
+        return 0.0
+    b = ox * dx + oy * dy
+    if b >= 0:
+        return None  # not approaching
+    a = dx * dx + dy * dy
+    disc = b * b - a * c
+    if disc < 0:
+        return None
+    t = (-b - math.sqrt(disc)) / a
+    return t if t <= 1 else None
+
+
+@dataclass
+class Game:
+    seed: int = 0
+    width: Optional[float] = None   # world width; DEFAULT_WIDTH per screen when None
+    height: float = DEFAULT_HEIGHT
+    terrain_n: int = TERRAIN_N      # samples per screen
+    gravity: float = GRAVITY
+    rng: Rng = None
+    terrain: Terrain = None
+    players: List[Player] = field(default_factory=list)
+    active: int = 0
+    angle_deg: float = 45.0
+    power: float = 62.0
+    weapon_slot: int = 1
+    wind: float = 0.0
+    projectile: Optional[Projectile] = None
+    phase: str = "aim"
+    input_locked: bool = False
+    post_shot_hold: float = 0.0
+    winner: int = 0
+    turn: int = 0
+    events: list = field(default_factory=list)
+    weapons: Optional[dict] = None  # weapon table override (balancing); None = WEAPONS
+    team_size: int = 1
+    screens: int = 1                # map width in screens (scrolling maps in the browser)
+    cursor: list = None             # per team: index (within the team) of the last worm to shoot
+    grid: ColumnGrid = None
+    awake: list = None              # indices of worms that may move; the rest rest on unchanged ground
+
+    def __post_init__(self):
+        self.team_size = int(clamp(self.team_size, 1, MAX_TEAM_SIZE))
+        self.screens = int(clamp(self.screens, 1, MAX_MAP_SCREENS))
+        if self.width is None:
+            self.width = DEFAULT_WIDTH * self.screens
+        if self.rng is None:
+            self.rng = Rng(self.seed)
+        if self.terrain is None:
+            self.terrain = Terrain.generate(self.rng, self.width, self.height, self.terrain_n, self.screens)
+        if not self.players:
+            self.players = spawn_players(self.team_size, self.screens)
+            for pl in self.players:
+                pl.y = self.terrain.y_at(pl.x * self.width) - pl.r - 1
+            self.wind = self.roll_wind()
+        if self.cursor is None:
+            self.cursor = [0, self.team_size - 1]
+        self.reindex()
+
+    def reindex(self):
+        """Rebuild ``grid`` and wake every worm; call after moving worms from outside."""
+        self.grid = ColumnGrid(self.width)
+        self.grid.build(self.players)
+        self.awake = list(range(len(self.players)))
+
+    # --- helpers -----------------------------------------------------------
+
+    @property
+    def weapon(self):
+        return weapon_by_slot(self.weapon_slot, self.weapons)
+
+    @property
+    def shooter(self) -> Player:
+        return self.players[self.active]
+
+    def roll_wind(self) -> float:
+        return (self.rng.random() * 2 - 1) * WIND_MAX
+
+    def set_weapon(self, slot: int):
+        self.weapon_slot = int(clamp(slot, 1, 3))
+
+    def aim(self, angle_deg: float, power: float):
+        self.angle_deg = clamp(angle_deg, ANGLE_MIN, ANGLE_MAX)
+        self.power = clamp(power, POWER_MIN, POWER_MAX)
+
+    def all_players_stable(self) -> bool:
+        players = self.players
+        return all(not players[i].falling for i in self.awake if players[i].alive)
+
+    def check_game_over(self) -> bool:
+        teams = {pl.team for pl in self.players if pl.hp > 0}
+        if len(teams) <= 1:
+            self.phase = "gameover"
+            self.input_locked = True
+            # winning team + 1, which is the player id in a duel
+            self.winner = teams.pop() + 1 if teams else 0
+            self.events.append(("gameover", self.winner))
+            return True
+        return False
+
+    # --- turn flow ---------------------------------------------------------
+
+    def new_turn(self):
+        # the other team moves, with its next living worm in order
+        team = 1 - self.shooter.team
+        n = self.team_size
+        for step in range(1, n + 1):
+            k = (self.cursor[team] + step) % n
+            if self.players[team * n + k].hp > 0:
+                break
+        self.cursor[team] = k
+        self.active = team * n + k
+        self.angle_deg = 45.0
+        self.power = 62.0
+        self.input_locked = False
+        self.phase = "aim"
+        self.projectile = None
+        self.post_shot_hold = 0.0
+        self.wind = self.roll_wind()
+        self.turn += 1
+        self.events.append(("turn", self.shooter.id))
+
+    def fire(self) -> bool:
+        if self.input_locked or self.phase != "aim":
+            return False
+        shooter = self.shooter
+        if shooter.hp <= 0:
+            return False
+
+        self.input_locked = True
+        self.phase = "projectile"
+
+        sx = shooter.x * self.width
+        sy = shooter.y - shooter.r * 0.15
+        direction = 1 if shooter.team == 0 else -1
+
+        angle_deg = self.angle_deg if direction == 1 else 180 - self.angle_deg
+        angle = angle_deg * math.pi / 180
+        speed = launch_speed(self.power)
+
+        self.projectile = Projectile(
+            x=sx + direction * (shooter.r + 2),
+            y=sy - shooter.r * 0.1,
+            vx=math.cos(angle) * speed,
+            vy=-math.sin(angle) * speed,
+            r=self.weapon.proj_r,
+            owner=shooter.id,
+            fuse=self.weapon.fuse,
+            inside=[pl.id for pl in self.players if pl.team == shooter.team],
+        )
+        self.events.append(("fire", shooter.id, self.weapon.key, self.angle_deg, self.power))
+        return True
+
+    def end_shot_and_switch(self, reason: Optional[str] = None):
+        self.projectile = None
+        self.phase = "post"
+        self.post_shot_hold = 0.0
+        if reason:
+            self.events.append((reason,))
+
+    # --- physics -----------------------------------------------------------
+
+    def explosion(self, cx, cy, radius, max_dmg, crater=True):
+        dirty = self.terrain.apply_crater(cx, cy, radius) if crater else None
+
+        hits, wake = [], set()
+        for i in self.grid.query(cx - radius, cx + radius):
+            pl = self.players[i]
+            if not pl.alive:
+                continue
+            dx, dy = pl.x * self.width - cx, pl.y - cy
+            d = math.hypot(dx, dy)
+            if d <= radius + pl.r:
+                t = clamp(d / radius, 0, 1)
+                dmg = clamp(_js_round(max_dmg * (1 - t)), 0, max_dmg)
+                if dmg > 0:
+                    pl.hp = clamp(pl.hp - dmg, 0, 100)
+                    hits.append((pl.id, dmg))
+                    # knockback: away from the blast, always with some lift
+                    speed = KNOCKBACK * dmg
+                    ux, uy = (dx / d, dy / d) if d > 0 else (0.0, -1.0)
+                    pl.vx = ux * speed
+                    pl.vy = (uy - 1) * 0.5 * speed
+                    wake.add(i)
+
+        # trigger falling if ground changed under worms (one column of margin)
+        scale = self.terrain.runs.scale
+        if dirty and scale > 0:
+            wake.update(self.grid.query((dirty[0] - 1) / scale, (dirty[1] + 2) / scale))
+        for i in wake:
+            if self.players[i].alive:
+                self.players[i].falling = True
+        if wake:
+            self.awake = sorted(wake.union(self.awake))
+        return hits
+
+    def impact_explode(self, cx, cy):
+        wpn = self.weapon
+        hits = self.explosion(cx, cy, wpn.radius, wpn.max_dmg, True)
+        self.events.append(("explosion", cx, cy, hits))
+        if self.check_game_over():
+            return
+        self.end_shot_and_switch()
+
+    def projectile_sweep_worms(self, x0, y0, dx, dy):
+        """Earliest worm hit by the projectile moving (x0, y0) -> +(dx, dy).
+
+        Returns ``(t, player)`` or ``(None, None)``. The shooter and its
+        teammates are skipped until the projectile has left their hitbox once.
+        """
+        p = self.projectile
+        best_t, best = None, None
+        x_lo, x_hi = (x0, x0 + dx) if dx >= 0 else (x0 + dx, x0)
+        for i in self.grid.query(x_lo - p.r, x_hi + p.r):
+            pl = self.players[i]
+            if pl.hp <= 0:
+                continue
+            cx, cy, reach = pl.x * self.width, pl.y, pl.r + p.r
+            if pl.id in p.inside:
+                ox, oy = x0 - cx, y0 - cy
+                if ox * ox + oy * oy <= reach * reach:
+                    continue
+                p.inside.remove(pl.id)
+            t = sweep_circle(x0, y0, dx, dy, cx, cy, reach)
+            if t is not None and (best_t is None or t < best_t):
+                best_t, best = t, pl
+        return best_t, best
+
+    def update_worm_physics(self, dt):
+        # Only awake worms are stepped: a worm resting on ground that did not
+        # change would be pinned to the same y again. ``explosion`` wakes the
+        # worms it hits or digs under.
+        terrain = self.terrain
+        w = self.width
+        still = []
+        for i in self.awake:
+            pl = self.players[i]
+            if pl.hp <= 0:
+                pl.alive = False
+                continue
+            pl.alive = True
+
+            # ground under the worm's centre: caves have more than one floor
+            px, y0 = pl.x * w, pl.y
+            gy = terrain.ground_y(px, y0) - pl.r - 1
+            if pl.y < gy - 0.5:
+                pl.falling = True
+
+            if pl.falling:
+                pl.vy += self.gravity * dt
+                if pl.vy < 0 and terrain.runs.solid(px, y0 - pl.r):
+                    pl.vy = 0.0  # ceiling
+                pl.y += pl.vy * dt
+                if pl.vx:
+                    x = clamp(pl.x + pl.vx * dt / w, pl.r / w, 1 - pl.r / w)
+                    if terrain.runs.solid(x * w, y0):
+                        pl.vx = 0.0  # wall
+                    else:
+                        pl.x = x
+                        self.grid.move(i, pl)
+                        gy = terrain.ground_y(x * w, y0) - pl.r - 1
+                if pl.y >= gy:
+                    pl.y = gy
+                    pl.vy = 0.0
+                    pl.vx = 0.0
+                    pl.falling = False
+            else:
+                pl.y = gy
+                pl.vy = 0.0
+
+            if pl.y > self.height + 80:
+                pl.hp = 0
+                pl.alive = False
+            elif pl.falling:
+                still.append(i)
+        self.awake = still
+
+    def update_projectile(self, dt):
+        p = self.projectile
+        if p is None:
+            return
+
+        w, h = self.width, self.height
+        wpn = self.weapon
+        terrain = self.terrain
+        # collisions are swept, so substeps only bound the integration step
+        steps = substeps_for(dt)
+        sub = dt / steps
+
+        for _ in range(steps):
+            p.age += sub
+
+            # fuse for grenade
+            if wpn.key == "grenade" and p.fuse > 0 and p.age >= p.fuse:
+                self.impact_explode(p.x, p.y)
+                return
+
+            x0, y0 = p.x, p.y
+            p.vx += self.wind * sub
+            p.vy += self.gravity * sub
+            p.x += p.vx * sub
+            p.y += p.vy * sub
+            mx, my = p.x - x0, p.y - y0
+
+            # earliest contact along the step: worm first on a tie
+            t_worm, worm = self.projectile_sweep_worms(x0, y0, mx, my)
+            t_ground = terrain.runs.sweep(x0, y0, p.x, p.y, p.r)
+            if worm is not None and (t_ground is None or t_worm <= t_ground):
+                p.x, p.y = x0 + mx * t_worm, y0 + my * t_worm
+                self.impact_explode(p.x, p.y)
+                return
+            if t_ground is not None:
+                p.x, p.y = x0 + mx * t_ground, y0 + my * t_ground
+
+            if p.x < -80 or p.x > w + 80 or p.y > h + 120 or p.y < -160:
+                self.end_shot_and_switch("miss")
+                return
+
+            if t_ground is not None:
+                if wpn.key == "grenade" and p.bounces < wpn.bounce:
+                    # reflect off the ground normal (walls and ceilings too)
+                    nx, ny = terrain.runs.normal(p.x, p.y, p.r)
+                    dot = p.vx * nx + p.vy * ny
+                    p.vx = (p.vx - 2 * dot * nx) * 0.62
+                    p.vy = (p.vy - 2 * dot * ny) * 0.55
+                    p.x, p.y = terrain.runs.push_out(p.x, p.y, p.r, nx, ny)
+                    p.bounces += 1
+                else:
+                    self.impact_explode(p.x, p.y)
+                    return
+
+    def update_post(self, dt):
+        # let worms settle a bit before switching
+        self.post_shot_hold += dt
+        self.update_worm_physics(dt)
+        if self.check_game_over():
+            return
+        if (self.post_shot_hold > 0.25 and self.all_players_stable()) or self.post_shot_hold > 2.25:
+            self.new_turn()
+
+    def update(self, dt):
+        if self.phase == "projectile":
+            self.update_projectile(dt)
+            self.update_worm_physics(dt)
+        elif self.phase == "post":
+            self.update_post(dt)
+        else:
+            self.update_worm_physics(dt)
+
+    # --- convenience -------------------------------------------------------
+
+    def play_shot(self, angle_deg, power, slot=None, dt=PHYSICS_DT, max_frames=24000):
+        """Aim, fire and step until the next turn (or game over) starts.
+
+        Steps default to the browser's fixed ``PHYSICS_DT``. Returns the
+        projectile path as a list of (x, y) per step.
+        """
+        if slot is not None:
+            self.set_weapon(slot)
+        self.aim(angle_deg, power)
+        if not self.fire():
+            return []
+
+        path = []
+        turn = self.turn
+        for _ in range(max_frames):
+            self.update(dt)
+            if self.projectile is not None:
+                path.append((self.projectile.x, self.projectile.y))
+            if self.phase == "gameover" or self.turn != turn:
+                break
+        return path
+
+
+def _js_round(v: float) -> int:
+    """``Math.round``: halves round towards +infinity."""
+    return math.floor(v + 0.5)
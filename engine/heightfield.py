@@ -0,0 +1,27 @@
+"""Array-backed heightfield: pixel-space surface Y per terrain sample.
+
+The generated terrain before any crater, as float32 like the browser
+computes it. ``ColumnRuns`` builds the destructible 2-D terrain from it.
+"""
+
+from array import array
+
+
+class Heightfield:
+    __slots__ = ("width", "height", "ys", "scale", "last", "min_y", "max_y")
+
+    def __init__(self, values, width: float, height: float):
+        self.width = width
+        self.height = height
+        n = len(values)
+        self.ys = array("f", bytes(4 * n))
+        self.last = n - 1
+        self.scale = (n - 1) / self.width if self.width > 1 else 0.0
+        self.min_y = self.height * 0.42
+        self.max_y = self.height * 0.84
+        for i in range(n):
+            self.set(i, values[i])
+
+    def set(self, i: int, value: float):
+        max_y = self.max_y
+        self.ys[i] = max_y + (self.min_y - max_y) * value
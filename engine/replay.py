@@ -0,0 +1,173 @@
+"""Deterministic match replays.
+
+A match is fully determined by the terrain seed, the world size and the
+inputs of every turn, so a replay stores only those: per shot the weapon
+slot, angle, power, the number of aim-phase physics steps before the shot
+(worms may still be settling) and the wind of that turn. The wind follows
+from the seed and is kept as a checksum that catches engine drift.
+
+Format (JSON, recorded by the browser as ``state.record``; ``teams`` is the
+number of worms per side and may be left out for a duel, ``screens`` is the
+map width in screens and may be left out for a one-screen map)::
+
+    {"v": 4, "seed": 42, "w": 1024, "h": 480, "teams": 1, "screens": 1,
+     "shots": [[slot, angle, power, aim_ticks, wind], ...]}
+
+Usage: ``python -m engine.replay match.json [--turn N]``
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from .game import Game
+from .weapons import ANGLE_MAX, ANGLE_MIN, MAX_MAP_SCREENS, MAX_TEAM_SIZE, PHYSICS_DT, POWER_MAX, POWER_MIN
+
+# bumped whenever the rules change how recorded inputs play out
+# (2: swept projectile collisions, 3: explosion knockback, 4: 2-D terrain)
+REPLAY_VERSION = 4
+MAX_SHOTS = 512
+MAX_AIM_TICKS = 240 * 600      # 10 minutes of aiming at 240 Hz
+MAX_WORLD = 8192
+WIND_TOLERANCE = 1e-9
+
+Shot = Tuple[int, float, float, int, float]
+
+
+class ReplayError(ValueError):
+    """Invalid replay, or the engine diverged from the recording."""
+
+
+def _number(v, lo, hi, what):
+    if isinstance(v, bool) or not isinstance(v, (int, float)) or not (lo <= v <= hi):
+        raise ReplayError("bad " + what)
+    return v
+
+
+@dataclass
+class Replay:
+    seed: int
+    width: int
+    height: int
+    shots: List[Shot] = field(default_factory=list)
+    teams: int = 1
+    screens: int = 1
+
+    @classmethod
+    def from_dict(cls, data) -> "Replay":
+        if not isinstance(data, dict) or data.get("v") != REPLAY_VERSION:
+            raise ReplayError("unsupported replay version")
+        seed = _number(data.get("seed"), 0, 0xFFFFFFFF, "seed")
+        screens = _number(data.get("screens", 1), 1, MAX_MAP_SCREENS, "map size")
+        width = _number(data.get("w"), 320, MAX_WORLD * screens, "world size")
+        height = _number(data.get("h"), 320, MAX_WORLD, "world size")
+        teams = _number(data.get("teams", 1), 1, MAX_TEAM_SIZE, "team size")
+        shots = data.get("shots")
+        if not isinstance(shots, list) or len(shots) > MAX_SHOTS:
+            raise ReplayError("bad shots")
+        parsed = []
+        for shot in shots:
+            if not isinstance(shot, list) or len(shot) != 5:
+                raise ReplayError("bad shot")
+            slot, angle, power, ticks, wind = shot
+            parsed.append((
+                int(_number(slot, 1, 3, "weapon")),
+                float(_number(angle, ANGLE_MIN, ANGLE_MAX, "angle")),
+                float(_number(power, POWER_MIN, POWER_MAX, "power")),
+                int(_number(ticks, 0, MAX_AIM_TICKS, "aim ticks")),
+                float(_number(wind, -1e3, 1e3, "wind")),
+            ))
+        return cls(int(seed), int(width), int(height), parsed, int(teams), int(screens))
+
+    def to_dict(self) -> dict:
+        return {
+            "v": REPLAY_VERSION,
+            "seed": self.seed,
+            "w": self.width,
+            "h": self.height,
+            "teams": self.teams,
+            "screens": self.screens,
+            "shots": [list(s) for s in self.shots],
+        }
+
+    def encode(self) -> str:
+        return json.dumps(self.to_dict(), separators=(",", ":"))
+
+    def digest(self) -> str:
+        """Content id: equal recordings share one id."""
+        return hashlib.sha256(self.encode().encode("utf-8")).hexdigest()[:16]
+
+
+def settle(game: Game, ticks: int):
+    """Run ``ticks`` aim-phase steps; once every worm rests they are no-ops."""
+    for _ in range(ticks):
+        if game.all_players_stable():
+            return
+        game.update(PHYSICS_DT)
+
+
+def play(replay: Replay, until_turn: Optional[int] = None, on_shot=None) -> Game:
+    """Re-simulate ``replay`` headlessly and return the resulting ``Game``.
+
+    Stops before turn ``until_turn`` when given. ``on_shot(turn, game)`` is
+    called after each shot. Raises ``ReplayError`` when the recorded wind
+    does not match the engine's (different engine version or a tampered
+    file) or shots continue after game over.
+    """
+    game = Game(seed=replay.seed, width=replay.width, height=replay.height,
+                team_size=replay.teams, screens=replay.screens)
+    for turn, (slot, angle, power, ticks, wind) in enumerate(replay.shots):
+        if until_turn is not None and turn >= until_turn:
+            break
+        if game.phase == "gameover":
+            raise ReplayError("shot after game over at turn %d" % turn)
+        if abs(game.wind - wind) > WIND_TOLERANCE:
+            raise ReplayError("desync at turn %d: wind %r != %r" % (turn, game.wind, wind))
+        settle(game, ticks)
+        game.play_shot(angle, power, slot)
+        if on_shot is not None:
+            on_shot(turn, game)
+    return game
+
+
+def summary(game: Game) -> dict:
+    return {
+        "turn": game.turn,
+        "phase": game.phase,
+        "active": game.active,
+        "wind": game.wind,
+        "hp": [pl.hp for pl in game.players],
+        "ys": [pl.y for pl in game.players],
+        "winner": game.winner if game.phase == "gameover" else None,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Re-simulate a Mini Worms replay")
+    parser.add_argument("file", help="replay JSON ('-' for stdin)")
+    parser.add_argument("--turn", type=int, help="stop before this turn")
+    args = parser.parse_args(argv)
+
+    fh = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8")
+    with fh:
+        data = json.load(fh)
+    if isinstance(data, dict) and "replay" in data:  # GET /api/replay/<id> response
+        data = data["replay"]
+    replay = Replay.from_dict(data)
+
+    def report(turn, game):
+        slot, angle, power, ticks, wind = replay.shots[turn]
+        hp = " ".join(f"{pl.hp:g}" for pl in game.players)
+        print(f"turn {turn:3d}  w{slot} {angle:5.1f}° {power:5.1f}%  wind {wind:+6.1f}  "
+              f"aim {ticks:5d} steps  -> hp {hp}")
+
+    game = play(replay, args.turn, report)
+    print(json.dumps(summary(game)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
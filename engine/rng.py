@@ -0,0 +1,50 @@
+"""Deterministic seeded RNG shared by the Python engine and the browser.
+
+Mulberry32 is tiny, fast and uses only 32-bit integer operations, so the
+same seed yields bit-identical sequences in Python and in JavaScript
+(``Math.imul`` / ``>>> 0``). It replaces ``Math.random`` wherever a match
+has to be reproducible.
+"""
+
+_MASK32 = 0xFFFFFFFF
+
+
+def _imul(a: int, b: int) -> int:
+    return (a * b) & _MASK32
+
+
+class Rng:
+    """Mulberry32 generator. ``random()`` returns floats in [0, 1)."""
+
+    __slots__ = ("state",)
+
+    def __init__(self, seed: int = 0):
+        self.state = int(seed) & _MASK32
+
+    def next_u32(self) -> int:
+        self.state = (self.state + 0x6D2B79F5) & _MASK32
+        t = self.state
+        t = _imul(t ^ (t >> 15), t | 1)
+        t = ((t + _imul(t ^ (t >> 7), t | 61)) & _MASK32) ^ t
+        return (t ^ (t >> 14)) & _MASK32
+
+    def random(self) -> float:
+        return self.next_u32() / 4294967296.0
+
+    def uniform(self, a: float, b: float) -> float:
+        return a + (b - a) * self.random()
+
+
+# JavaScript twin of ``Rng`` for inline scripts and the cross-check harness.
+MULBERRY32_JS = """
+function mulberry32(seed){
+  var a = seed >>> 0;
+  return function(){
+    a = (a + 0x6D2B79F5) >>> 0;
+    var t = a;
+    t = Math.imul(t ^ (t >>> 15), t | 1);
+    t = ((t + Math.imul(t ^ (t >>> 7), t | 61)) >>> 0) ^ t;
+    return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+  };
+}
+"""
@@ -0,0 +1,474 @@
+"""Destructible 2-D terrain as per-column runs of solid ground.
+
+The world is cut into ``COLUMNS_PER_SAMPLE`` vertical columns per terrain
+sample interval. Each column stores its solid spans as ``(top, bottom)``
+pairs (float32, top to bottom), so a crater can carve tunnels and leave
+overhangs instead of only lowering a surface. Columns are grouped in chunks
+of ``RUN_CHUNK``; a chunk keeps the spans of all its columns in one flat
+``array('f')`` with per-column offsets, and a crater rebuilds only the
+chunks it touches. ``tops`` holds the first span top per column and lets
+most queries reject open sky without looking at the spans.
+
+Ground below ``bedrock`` (the lowest surface the heightfield could have)
+is never carved, so every column keeps a floor to stand on.
+
+Mirror of the ``runs*``/``terrain*`` functions in the browser script, which
+fills the same chunks lazily.
+"""
+
+import math
+from array import array
+from collections import deque
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on environment
+    np = None
+
+COLUMNS_PER_SAMPLE = 2
+RUN_CHUNK = 256          # columns per chunk (one browser terrain chunk)
+MIN_SPAN = 0.5           # px: thinner slivers left by a crater are dropped
+SWEEP_REFINE = 10        # bisection steps for the contact point of a sweep
+PUSH_OUT = 4             # px: at most this far along the normal after a bounce
+
+
+def _directions():
+    # 16 ring directions from integer steps: sqrt is exact in both engines,
+    # unlike cos/sin
+    steps = ((1, 0), (2, 1), (1, 1), (1, 2), (0, 1), (-1, 2), (-1, 1), (-2, 1),
+             (-1, 0), (-2, -1), (-1, -1), (-1, -2), (0, -1), (1, -2), (1, -1), (2, -1))
+    out = []
+    for dx, dy in steps:
+        n = math.sqrt(dx * dx + dy * dy)
+        out.append((dx / n, dy / n))
+    return tuple(out)
+
+
+NORMAL_DIRS = _directions()
+
+
+class ColumnRuns:
+    __slots__ = (
+        "width", "height", "count", "scale", "bedrock", "tops", "offs", "spans",
+        "version", "full_version", "edits", "np_cache",
+    )
+
+    EDIT_LOG = 32
+
+    def __init__(self, heightfield):
+        """Solid from the surface of ``heightfield`` down to the world bottom."""
+        self.width = heightfield.width
+        self.height = heightfield.height
+        self.count = heightfield.last * COLUMNS_PER_SAMPLE
+        self.scale = heightfield.scale * COLUMNS_PER_SAMPLE   # columns per px
+        self.bedrock = heightfield.max_y
+        self.version = 1
+        self.full_version = 1
+        self.edits = deque(maxlen=self.EDIT_LOG)
+        self.np_cache = None     # (version, arrays) for the numpy queries
+
+        ys, h = heightfield.ys, float(self.height)
+        self.tops = array("f", bytes(4 * self.count))
+        self.offs, self.spans = [], []
+        for base in range(0, self.count, RUN_CHUNK):
+            n = min(RUN_CHUNK, self.count - base)
+            spans = array("f", bytes(8 * n))
+            for j in range(n):
+                k = base + j
+                i = k // COLUMNS_PER_SAMPLE
+                u = (k + 0.5) / COLUMNS_PER_SAMPLE - i
+                top = ys[i] + (ys[i + 1] - ys[i]) * u
+                spans[2 * j] = top
+                spans[2 * j + 1] = h
+                self.tops[k] = top
+            self.offs.append(array("I", range(0, 2 * n + 1, 2)))
+            self.spans.append(spans)
+
+    # --- storage -----------------------------------------------------------
+
+    def col(self, x: float) -> int:
+        k = math.floor(x * self.scale)
+        return 0 if k < 0 else self.count - 1 if k >= self.count else k
+
+    def column(self, k: int):
+        """Spans of column ``k`` as a flat ``[top, bottom, top, bottom, ...]``."""
+        c, j = divmod(k, RUN_CHUNK)
+        offs = self.offs[c]
+        return self.spans[c][offs[j]:offs[j + 1]]
+
+    def columns(self):
+        return [list(self.column(k)) for k in range(self.count)]
+
+    def nbytes(self) -> int:
+        size = self.tops.itemsize * len(self.tops)
+        for offs, spans in zip(self.offs, self.spans):
+            size += offs.itemsize * len(offs) + spans.itemsize * len(spans)
+        return size
+
+    def mark_dirty(self, k0: int, k1: int):
+        """Record that columns ``k0..k1`` (inclusive) changed."""
+        self.version += 1
+        self.edits.append((self.version, k0, k1))
+
+    def dirty_since(self, version: int):
+        """Merged ``(k0, k1)`` changed after ``version``, or None (full range
+        if ``version`` predates the oldest logged edit)."""
+        if version >= self.version:
+            return None
+        full = (0, self.count - 1)
+        if version < self.full_version or not self.edits or self.edits[0][0] > version + 1:
+            return full
+        lo, hi = self.count - 1, 0
+        for v, k0, k1 in self.edits:
+            if v > version:
+                lo = min(lo, k0)
+                hi = max(hi, k1)
+        return lo, hi
+
+    # --- queries -----------------------------------------------------------
+
+    def surface(self, x: float) -> float:
+        """Y of the topmost solid at ``x``."""
+        return self.tops[self.col(x)]
+
+    def ground(self, x: float, y: float) -> float:
+        """Top of the first span at ``x`` that reaches below ``y`` (the span
+        containing ``y`` or the next one down); inf if there is none."""
+        s = self.column(self.col(x))
+        for j in range(0, len(s), 2):
+            if s[j + 1] > y:
+                return s[j]
+        return math.inf
+
+    def solid(self, x: float, y: float) -> bool:
+        s = self.column(self.col(x))
+        for j in range(0, len(s), 2):
+            if s[j] > y:
+                return False
+            if s[j + 1] > y:
+                return True
+        return False
+
+    def touch(self, x: float, y: float, r: float) -> bool:
+        """Whether a circle at (x, y) of radius ``r`` overlaps solid ground.
+
+        Columns are strips; the edge columns extend beyond the map.
+        """
+        scale, tops = self.scale, self.tops
+        kx = self.col(x)
+        k0, k1 = self.col(x - r), self.col(x + r)
+        y_hi = y + r
+        for k in range(k0, k1 + 1):
+            if tops[k] > y_hi:
+                continue
+            if k < kx:
+                dx = x - (k + 1) / scale
+            elif k > kx:
+                dx = k / scale - x
+            else:
+                dx = 0.0
+            hh = r * r - dx * dx
+            if hh < 0:
+                continue
+            hh = math.sqrt(hh)
+            lo, hi = y - hh, y + hh
+            s = self.column(k)
+            for j in range(0, len(s), 2):
+                if s[j] > hi:
+                    break
+                if s[j + 1] >= lo:
+                    return True
+        return False
+
+    def sweep(self, x0: float, y0: float, x1: float, y1: float, r: float):
+        """First fraction ``t`` of the move (x0, y0) -> (x1, y1) at which a
+        circle of radius ``r`` touches solid ground, or None.
+
+        Moves that stay above every column top they pass are rejected from
+        ``tops`` alone. Otherwise the move is probed every r/2 and the first
+        touching probe is refined by bisection; the returned point touches.
+        """
+        k0 = self.col(min(x0, x1) - r)
+        k1 = self.col(max(x0, x1) + r)
+        if max(y0, y1) + r < min(self.tops[k0:k1 + 1]):
+            return None
+        if self.touch(x0, y0, r):
+            return 0.0
+        dx, dy = x1 - x0, y1 - y0
+        n = max(1, math.ceil(math.sqrt(dx * dx + dy * dy) / (r * 0.5)))
+        prev = 0.0
+        for i in range(1, n + 1):
+            t = i / n
+            if self.touch(x0 + dx * t, y0 + dy * t, r):
+                lo, hi = prev, t
+                for _ in range(SWEEP_REFINE):
+                    mid = (lo + hi) * 0.5
+                    if self.touch(x0 + dx * mid, y0 + dy * mid, r):
+                        hi = mid
+                    else:
+                        lo = mid
+                return hi
+            prev = t
+        return None
+
+    def normal(self, x: float, y: float, r: float):
+        """Unit vector pointing away from the ground around (x, y): the
+        negated mean of the solid points on a ring just outside the circle."""
+        ring = r + 2
+        sx = sy = 0.0
+        for ux, uy in NORMAL_DIRS:
+            if self.solid(x + ux * ring, y + uy * ring):
+                sx += ux
+                sy += uy
+        n = math.sqrt(sx * sx + sy * sy)
+        if n == 0:
+            return 0.0, -1.0
+        return -sx / n, -sy / n
+
+    def push_out(self, x: float, y: float, r: float, nx: float, ny: float):
+        """Step (x, y) along (nx, ny) until the circle is clear (at most PUSH_OUT px)."""
+        for _ in range(PUSH_OUT):
+            if not self.touch(x, y, r):
+                break
+            x += nx
+            y += ny
+        return x, y
+
+    # --- numpy batch queries ------------------------------------------------
+    #
+    # Lane-wise mirrors of the scalar queries above, for ``engine.batch``.
+    # They evaluate the same float64 expressions in the same order, so every
+    # lane gets exactly the scalar result.
+
+    def _arrays(self):
+        """(tops, spans, offs, nspans, tops_min) as numpy arrays with global
+        column offsets into ``spans``; rebuilt after an edit. ``tops_min[e]``
+        is the lowest top of the columns ``k .. k + 2**e - 1`` (sparse table
+        for the open-sky test of ``sweep_many``)."""
+        cache = self.np_cache
+        if cache is not None and cache[0] == self.version:
+            return cache[1]
+        offs, spans, base = [], [], 0
+        for o, sp in zip(self.offs, self.spans):
+            offs.append(np.frombuffer(o, dtype=np.uint32)[:-1].astype(np.intp) + base)
+            spans.append(np.frombuffer(sp, dtype=np.float32))
+            base += len(sp)
+        offs.append(np.array([base], np.intp))
+        offs = np.concatenate(offs)
+        tops = np.frombuffer(self.tops, dtype=np.float32).copy()
+        tops_min = [tops]
+        while 2 ** len(tops_min) <= tops.size:
+            prev, half = tops_min[-1], 2 ** (len(tops_min) - 1)
+            tops_min.append(np.minimum(prev[:-half], prev[half:]))
+        arrays = (tops, np.concatenate(spans).astype(np.float64), offs, (offs[1:] - offs[:-1]) // 2, tops_min)
+        self.np_cache = (self.version, arrays)
+        return arrays
+
+    def _cols(self, x):
+        return np.clip(np.floor(x * self.scale), 0, self.count - 1).astype(np.intp)
+
+    def surface_many(self, xs):
+        """``surface`` for many x at once (numpy array in, numpy array out).
+
+        Falls back to a list of scalar lookups when numpy is unavailable.
+        """
+        if np is None:
+            return [self.surface(x) for x in xs]
+        return self._arrays()[0][self._cols(np.asarray(xs, dtype=np.float64))].astype(np.float64)
+
+    def solid_many(self, x, y):
+        """``solid`` lane by lane: some span has top <= y < bottom."""
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64))
+        shape, x, y = x.shape, x.ravel(), y.ravel()
+        _, spans, offs, nspans, _ = self._arrays()
+        k = self._cols(x)
+        count = nspans[k]
+        out = np.zeros(x.size, bool)
+        for j in range(int(count.max()) if x.size else 0):
+            lanes = np.flatnonzero(count > j)
+            idx = offs[k[lanes]] + 2 * j
+            yl = y[lanes]
+            out[lanes[(spans[idx] <= yl) & (spans[idx + 1] > yl)]] = True
+        return out.reshape(shape)
+
+    def touch_many(self, x, y, r):
+        """``touch`` lane by lane.
+
+        Every (lane, column) pair the circles cover is tested at once.
+        """
+        x, y, r = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (x, y, r)))
+        out = np.zeros(x.shape, bool)
+        if not x.size:
+            return out
+        tops, spans, offs, nspans, _ = self._arrays()
+        scale = self.scale
+        k0, k1 = self._cols(x - r), self._cols(x + r)
+        width = k1 - k0 + 1
+        lane = np.repeat(np.arange(x.size), width)
+        k = np.arange(lane.size) - np.repeat(np.cumsum(width) - width, width) + k0[lane]
+        keep = tops[k] <= (y + r)[lane]
+        lane, k = lane[keep], k[keep]
+        if not lane.size:
+            return out
+
+        xl, kx = x[lane], self._cols(x)[lane]
+        dx = np.where(k < kx, xl - (k + 1) / scale, np.where(k > kx, k / scale - xl, 0.0))
+        rl = r[lane]
+        hh = rl * rl - dx * dx
+        keep = hh >= 0
+        lane, k = lane[keep], k[keep]
+        hh = np.sqrt(hh[keep])
+        yl = y[lane]
+        lo, hi = yl - hh, yl + hh
+        # spans are sorted and disjoint: the scalar early exit finds one iff
+        # some span has top <= hi and bottom >= lo
+        idx = offs[k]
+        count = nspans[k]
+        for j in range(int(count.max()) if k.size else 0):
+            m = count > j
+            sj = idx[m] + 2 * j
+            out[lane[m][(spans[sj] <= hi[m]) & (spans[sj + 1] >= lo[m])]] = True
+        return out
+
+    def sweep_many(self, x0, y0, x1, y1, r):
+        """``sweep`` lane by lane; NaN where nothing is touched.
+
+        The start point and every r/2 probe of every lane that is not
+        rejected from ``tops`` are tested in one ``touch_many`` call; the
+        lanes that touch are then bisected together.
+        """
+        x0, y0, x1, y1, r = (np.asarray(v, dtype=np.float64) for v in (x0, y0, x1, y1, r))
+        out = np.full(x0.shape, np.nan)
+        if not x0.size:
+            return out
+        tops_min = self._arrays()[4]
+        k0 = self._cols(np.minimum(x0, x1) - r)
+        k1 = self._cols(np.maximum(x0, x1) + r)
+        # lowest top over k0..k1 from two overlapping power-of-two ranges
+        e = np.log2(k1 - k0 + 1).astype(np.intp)
+        low = np.empty(x0.shape, np.float32)
+        for level in np.unique(e):
+            m = e == level
+            row = tops_min[level]
+            low[m] = np.minimum(row[k0[m]], row[k1[m] - 2 ** level + 1])
+        lanes = np.flatnonzero(np.maximum(y0, y1) + r >= low)
+        if not lanes.size:
+            return out
+
+        x0, y0, r = x0[lanes], y0[lanes], r[lanes]
+        dx, dy = x1[lanes] - x0, y1[lanes] - y0
+        n = np.maximum(1, np.ceil(np.sqrt(dx * dx + dy * dy) / (r * 0.5)))
+        # probe i = 0..n per lane; i = 0 is the start point (t = 0)
+        count = n.astype(np.intp) + 1
+        lane = np.repeat(np.arange(lanes.size), count)
+        i = np.arange(lane.size) - np.repeat(np.cumsum(count) - count, count)
+        t = i / n[lane]
+        hit = self.touch_many(x0[lane] + dx[lane] * t, y0[lane] + dy[lane] * t, r[lane])
+        # first touching probe per lane: hits come in lane order, i ascending
+        h = np.flatnonzero(hit)
+        if not h.size:
+            return out
+        hl = lane[h]
+        first = np.empty(h.size, bool)
+        first[0] = True
+        np.not_equal(hl[1:], hl[:-1], out=first[1:])
+        hl, i = hl[first], i[h[first]]
+
+        start = i == 0
+        out[lanes[hl[start]]] = 0.0
+        j, i = hl[~start], i[~start]
+        lo, hi = (i - 1) / n[j], i / n[j]
+        for _ in range(SWEEP_REFINE):
+            mid = (lo + hi) * 0.5
+            inside = self.touch_many(x0[j] + dx[j] * mid, y0[j] + dy[j] * mid, r[j])
+            hi = np.where(inside, mid, hi)
+            lo = np.where(inside, lo, mid)
+        out[lanes[j]] = hi
+        return out
+
+    def normal_many(self, x, y, r):
+        """``normal`` lane by lane; returns (nx, ny) arrays."""
+        x, y, r = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (x, y, r)))
+        ring = r + 2
+        ux, uy = np.array(NORMAL_DIRS).T[:, :, None]
+        solid = self.solid_many(x + ux * ring, y + uy * ring)
+        sx = np.zeros(x.shape)
+        sy = np.zeros(x.shape)
+        for d in range(len(NORMAL_DIRS)):  # summed in ring order, like ``normal``
+            sx = np.where(solid[d], sx + ux[d], sx)
+            sy = np.where(solid[d], sy + uy[d], sy)
+        n = np.sqrt(sx * sx + sy * sy)
+        flat = n == 0
+        n = np.where(flat, 1.0, n)
+        return np.where(flat, 0.0, -sx / n), np.where(flat, -1.0, -sy / n)
+
+    def push_out_many(self, x, y, r, nx, ny):
+        """``push_out`` lane by lane; returns new (x, y) arrays."""
+        x, y, r = (np.array(v, dtype=np.float64) for v in (x, y, r))
+        idx = np.arange(x.size)
+        for _ in range(PUSH_OUT):
+            idx = idx[self.touch_many(x[idx], y[idx], r[idx])]
+            if not idx.size:
+                break
+            x[idx] += nx[idx]
+            y[idx] += ny[idx]
+        return x, y
+
+    # --- edits -------------------------------------------------------------
+
+    def carve(self, cx: float, cy: float, r: float):
+        """Remove a disc (above ``bedrock``); returns the changed column
+        range ``(k0, k1)`` or None."""
+        scale, bedrock = self.scale, self.bedrock
+        k0 = max(0, math.floor((cx - r) * scale))
+        k1 = min(self.count - 1, math.floor((cx + r) * scale))
+        if k1 < k0:
+            return None
+        lo, hi = self.count, -1
+
+        for c in range(k0 // RUN_CHUNK, k1 // RUN_CHUNK + 1):
+            base = c * RUN_CHUNK
+            offs, spans = self.offs[c], self.spans[c]
+            ja, jb = max(k0, base) - base, min(k1, base + len(offs) - 2) - base
+            out = spans[:offs[ja]]
+            new_offs = offs[:ja + 1]
+            changed = False
+            for j in range(ja, jb + 1):
+                k = base + j
+                s = spans[offs[j]:offs[j + 1]]
+                dx = (k + 0.5) / scale - cx
+                hh = r * r - dx * dx
+                a = b = 0.0
+                if hh > 0:
+                    hh = math.sqrt(hh)
+                    a, b = cy - hh, min(cy + hh, bedrock)
+                hit, first = False, len(out)
+                for m in range(0, len(s), 2):
+                    top, bottom = s[m], s[m + 1]
+                    if b <= a or bottom <= a or top >= b:
+                        out.append(top)
+                        out.append(bottom)
+                        continue
+                    hit = True
+                    if a - top >= MIN_SPAN:
+                        out.append(top)
+                        out.append(a)
+                    if bottom - b >= MIN_SPAN:
+                        out.append(b)
+                        out.append(bottom)
+                if hit:
+                    changed = True
+                    lo, hi = min(lo, k), max(hi, k)
+                    self.tops[k] = out[first] if len(out) > first else self.height
+                new_offs.append(len(out))
+            if not changed:
+                continue
+            shift = len(out) - offs[jb + 1]
+            out.extend(spans[offs[jb + 1]:])
+            new_offs.extend(o + shift for o in offs[jb + 2:])
+            self.offs[c], self.spans[c] = new_offs, out
+
+        if hi < lo:
+            return None
+        self.mark_dirty(lo, hi)
+        return lo, hi
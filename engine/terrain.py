@@ -0,0 +1,81 @@
+"""Terrain generation (``makeTerrain``) and the destructible terrain built from it."""
+
+import math
+
+from .heightfield import Heightfield
+from .rng import Rng
+from .runs import ColumnRuns
+from .weapons import TERRAIN_N
+
+
+def clamp(v, a, b):
+    return max(a, min(b, v))
+
+
+def lerp(a, b, t):
+    return a + (b - a) * t
+
+
+def _smooth_noise(t, seed, screens):
+    x = t * 6.0 * screens + seed
+    return math.sin(x) * 0.5 + math.sin(x * 0.37) * 0.3 + math.sin(x * 1.73) * 0.2
+
+
+def terrain_sample(i: int, n: int, seed_a: float, seed_b: float, screens: int = 1) -> float:
+    """Sample ``i`` of ``n``; depends only on its index, so any part of the map
+    can be generated on its own (the browser fills chunks lazily)."""
+    t = i / (n - 1)
+    v = _smooth_noise(t, seed_a, screens) + _smooth_noise(t, seed_b, screens) * 0.6
+    v = clamp((v + 1.2) / 2.4, 0.0, 1.0)  # approx 0..1
+    # gentle edges: avoid very low/high at extremes
+    edge = math.sin(math.pi * t)
+    return lerp(0.55, v, clamp(edge, 0.15, 1.0))
+
+
+def make_terrain(n: int, rng: Rng, screens: int = 1):
+    """Normalized terrain samples in [0, 1]; higher values are higher ground.
+
+    ``screens`` is the map width in screens: the noise keeps its per-screen
+    frequency and the edges only flatten at the ends of the map.
+    """
+    seed_a = rng.random() * 1000
+    seed_b = rng.random() * 1000
+    return [terrain_sample(i, n, seed_a, seed_b, screens) for i in range(n)]
+
+
+class Terrain:
+    """Generated terrain samples stretched over a ``width`` x ``height`` view.
+
+    ``values`` are the normalized samples as generated (or received), and
+    ``heightfield`` their pixel-space surface; both stay as they are. The
+    playing field is ``runs``, the destructible 2-D terrain built from that
+    surface: craters carve it, collisions and ground queries read it.
+    """
+
+    def __init__(self, values, width: float, height: float):
+        self.values = values
+        self.width = width
+        self.height = height
+        self.heightfield = Heightfield(values, width, height)
+        self.runs = ColumnRuns(self.heightfield)
+
+    @classmethod
+    def generate(cls, rng: Rng, width: float, height: float, n: int = TERRAIN_N, screens: int = 1):
+        """``n`` samples per screen, ``screens`` screens wide."""
+        return cls(make_terrain((n - 1) * screens + 1, rng, screens), width, height)
+
+    def y_at(self, x: float) -> float:
+        """Topmost surface at ``x``."""
+        return self.runs.surface(x)
+
+    def y_at_many(self, xs):
+        """``y_at`` for many x at once (see ``ColumnRuns.surface_many``)."""
+        return self.runs.surface_many(xs)
+
+    def ground_y(self, x: float, y: float) -> float:
+        """Surface a body at (x, y) would land on."""
+        return self.runs.ground(x, y)
+
+    def apply_crater(self, cx: float, cy: float, r: float):
+        """Carve a crater; returns the changed column range ``(k0, k1)`` or None."""
+        return self.runs.carve(cx, cy, r)
@@ -0,0 +1,55 @@
+"""Game constants and the weapon table, mirrored from the browser game."""
+
+import math
+from typing import NamedTuple
+
+GRAVITY = 420.0          # px/s^2
+SUBSTEPS = 4             # projectile substeps per 60 Hz frame (integration step bound)
+MAX_SUBSTEP = 1 / 240    # longest projectile substep in s
+PHYSICS_DT = 1 / 240     # fixed simulation step of the browser loop
+WIND_MAX = 55.0          # |wind| in px/s^2
+KNOCKBACK = 4.0          # worm launch speed in px/s per point of damage
+MAX_TEAM_SIZE = 16
+TERRAIN_N = 620          # terrain samples per screen width
+MAX_MAP_SCREENS = 8      # widest map, in screen widths
+DEFAULT_WIDTH = 1024     # world size in CSS px (canvas default)
+DEFAULT_HEIGHT = 480
+
+ANGLE_MIN, ANGLE_MAX = 10.0, 80.0
+POWER_MIN, POWER_MAX = 10.0, 100.0
+
+
+class Weapon(NamedTuple):
+    key: str
+    name: str
+    proj_r: float
+    radius: float
+    max_dmg: int
+    fuse: float
+    bounce: int
+
+
+WEAPONS = {
+    "bazooka": Weapon("bazooka", "Bazooka", 3.5, 26, 55, 0.0, 0),
+    "grenade": Weapon("grenade", "Granate", 4.2, 34, 65, 2.6, 2),
+    "banana": Weapon("banana", "Banane", 4.6, 46, 85, 0.0, 0),
+}
+
+
+def weapon_by_slot(slot: int, table=None) -> Weapon:
+    """Weapon for HUD slot 1..3, from ``table`` (default ``WEAPONS``)."""
+    table = WEAPONS if table is None else table
+    if slot == 1:
+        return table["bazooka"]
+    if slot == 2:
+        return table["grenade"]
+    return table["banana"]
+
+
+def substeps_for(dt: float) -> int:
+    """Projectile substeps for a step of ``dt`` (4 at 60 Hz, 1 at 240 Hz)."""
+    return max(1, math.ceil(dt / MAX_SUBSTEP - 1e-9))
+
+
+def launch_speed(power: float) -> float:
+    return 120 + (power / 100) * 520
@@ -0,0 +1,68 @@
+"""Production gunicorn settings.
+
+gunicorn reads ``./gunicorn.conf.py`` on its own, so the plain Cloud Run
+entry point (``gunicorn -b :$PORT main:app``) picks this up; command line
+flags still override it.
+
+The app is preloaded in the master and ``main.warm_up`` renders, compresses
+and fingerprints the page and its assets there before the workers fork, so
+every worker shares them copy-on-write instead of building them on its
+first request.
+
+Workers (``WORKER_MODE``, default ``auto``):
+
+- ``threads``: one gthread process with ``WEB_THREADS`` (200) threads. Online
+  rooms live in the process (``online.LocalBroker``), and an open WebSocket
+  holds a thread, so this is what a room server needs.
+- ``processes``: ``WEB_CONCURRENCY`` (one per CPU) gthread processes with
+  ``WEB_THREADS`` (8) threads each, for the CPU-bound API (``/api/ai/solve``,
+  replay checks) that threads cannot spread over cores.
+- ``auto``: processes on more than one CPU when rooms are off
+  (``MAX_ROOMS=0``), threads otherwise.
+"""
+
+import os
+
+
+def _cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))  # the container's share, not the host's
+    except AttributeError:  # pragma: no cover - not on Linux
+        return os.cpu_count() or 1
+
+
+def _mode(cpus: int) -> str:
+    mode = os.environ.get("WORKER_MODE", "auto")
+    if mode not in ("auto", "threads", "processes"):
+        raise ValueError("WORKER_MODE must be auto, threads or processes, not %r" % mode)
+    if mode == "auto":
+        rooms = int(os.environ.get("MAX_ROOMS", "5000"))
+        mode = "processes" if cpus > 1 and rooms == 0 else "threads"
+    return mode
+
+
+CPUS = _cpus()
+MODE = _mode(CPUS)
+
+bind = "0.0.0.0:" + os.environ.get("PORT", "8080")
+preload_app = True
+worker_class = "gthread"
+if MODE == "threads":
+    workers = 1
+    threads = int(os.environ.get("WEB_THREADS", "200"))
+else:
+    workers = int(os.environ.get("WEB_CONCURRENCY", str(CPUS)))
+    threads = int(os.environ.get("WEB_THREADS", "8"))
+# the heartbeat file is touched constantly; keep it off the container's disk
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+
+def when_ready(server):
+    # runs in the master after the app was loaded, before the first fork
+    if server.cfg.preload_app:
+        import main
+
+        main.warm_up()
+        server.log.info("warmed up: %s mode, %d worker(s) x %d thread(s), %d CPU(s)",
+                        MODE, server.cfg.workers, server.cfg.threads, CPUS)
@@ -4,12 +4,47 @@
 API:
 - GET /api/health -> Überprüft den Zustand des Dienstes
 - GET /api/meta   -> Gibt Metadaten über den Dienst zurück
+- POST /api/perf  -> Nimmt Frame-Timing-Histogramme des Clients an (?perf=1)
+- GET /api/perf   -> Aggregierte Timing-Perzentile pro Gerät und Phase
+- POST /api/rooms -> Legt ein Online-Match an
+- GET /api/rooms/<id> -> Status eines Online-Matches
+- WS /ws/rooms/<id>   -> Online-Match (Eingaben rein, Zustands-Deltas raus;
+                        ?fmt=bin für das Binärformat aus online/wire.py)
+- POST /api/replay -> Speichert ein Replay (Seed + Eingaben), prüft es headless
+- GET /api/replay/<id> -> Replay herunterladen (?turn=N: Zustand vor Zug N,
+                          beim Hochladen einmal aufgezeichnet)
+- POST /api/ai/solve -> Bester Schuss für eine Stellung (Terrain oder Seed +
+                        Krater, Würmer, Wind, Waffe); LRU-gecacht
+- GET /api/metrics -> Prometheus-Textformat: Latenz-Histogramme pro Route und
+                      Status, laufende Anfragen, Seiten-Cache, Bytes pro Encoding
 """
 
+import bisect
+import gc
+import gzip
+import hashlib
+import json
 import os
-from flask import Flask, jsonify, make_response, render_template_string, request
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from flask import Flask, abort, jsonify, make_response, render_template_string, request
+from flask_sock import Sock
 from werkzeug.exceptions import HTTPException
 
+from engine.ai import Position, PositionError, table as ai_table
+from engine.replay import REPLAY_VERSION, Replay, ReplayError, play as play_replay, summary as replay_summary
+from engine.rng import MULBERRY32_JS
+from online import LocalBroker, Outbox, RoomError, RoomRegistry, wire
+from online.rooms import encode as encode_json
+
+try:  # optional: brotli is not part of requirements.txt
+    import brotli
+except ImportError:  # pragma: no cover - depends on environment
+    brotli = None
+
 SERVICE_NAME_SLUG = "worms-mini"
 PAGE_TITLE = "Mini Worms – Local Duel"
 PAGE_H1 = "Mini Worms"
@@ -20,15 +55,40 @@ PLZ_URL = "https://plz.data-tales.dev/"
 
 VERSION = os.environ.get("SERVICE_VERSION", "1.0.0")
 
-app = Flask(__name__)
+# Client frame-timing histograms: bucket k counts samples <= BASE * FACTOR**k ms,
+# the last bucket is overflow. Shared with the page script via the template.
+PERF_BUCKETS = 41
+PERF_BASE_MS = 0.001
+PERF_FACTOR = 2 ** 0.5
+PERF_MAX_DEVICES = 64
+PERF_MAX_PHASES = 32
+
+app = Flask(__name__, static_folder=None)
 app.config.update(
     ENV="production",
     DEBUG=False,
     TESTING=False,
     PROPAGATE_EXCEPTIONS=False,
     TEMPLATES_AUTO_RELOAD=False,
+    # Revalidation policy for GET /. "no-cache" lets browsers keep the page
+    # but forces an If-None-Match round trip (answered with 304).
+    INDEX_CACHE_CONTROL=os.environ.get("INDEX_CACHE_CONTROL", "no-cache"),
+    # Fingerprinted /static/app.<hash>.* assets never change under their name.
+    STATIC_CACHE_CONTROL="public, max-age=31536000, immutable",
+    MAX_ROOMS=int(os.environ.get("MAX_ROOMS", "5000")),
+    # Replays are a few hundred bytes; the oldest are evicted beyond this.
+    MAX_REPLAYS=int(os.environ.get("MAX_REPLAYS", "10000")),
+    # Cached CPU solutions (~200 bytes each), keyed by the quantized position.
+    MAX_AI_SOLUTIONS=int(os.environ.get("MAX_AI_SOLUTIONS", "4096")),
+    # Frames queued per WebSocket before a peer that does not read is cut off.
+    WS_SEND_QUEUE=int(os.environ.get("WS_SEND_QUEUE", "256")),
+    # Request metrics for GET /api/metrics ("0" turns off the hooks and the route).
+    METRICS=os.environ.get("METRICS", "1") != "0",
 )
 
+sock = Sock(app)
+ROOMS = RoomRegistry(LocalBroker(), max_rooms=app.config["MAX_ROOMS"])
+
 
 HTML = r"""<!doctype html>
 <html lang="de">
@@ -433,6 +493,9 @@ HTML = r"""<!doctype html>
                 <div class="hud-mini" id="aimTag">Angle: — · Power: —</div>
               </div>
               <div class="hud-row">
+                <button class="btn btn-secondary" id="cpuBtn" type="button">Gegen CPU</button>
+                <button class="btn btn-secondary" id="onlineBtn" type="button">Online-Match</button>
+                <button class="btn btn-secondary" id="replayBtn" type="button">Replay speichern</button>
                 <button class="btn btn-secondary" id="restartBtn" type="button">Neustart</button>
               </div>
             </div>
@@ -562,7 +625,10 @@ HTML = r"""<!doctype html>
       fallback.style.display = "none";
     }
 
+    var toastMuted = false;  // set while a replay fast-forwards
+
     function showToast(msg){
+      if(toastMuted) return;
       try{
         safeText(toastEl, msg);
         toastEl.classList.add("show");
@@ -644,8 +710,13 @@ HTML = r"""<!doctype html>
     var p2HpText = $("#p2HpText");
     var p1HpFill = $("#p1HpFill");
     var p2HpFill = $("#p2HpFill");
+    var p1Name = $("#p1Name");
+    var p2Name = $("#p2Name");
 
     var restartBtn = $("#restartBtn");
+    var onlineBtn = $("#onlineBtn");
+    var cpuBtn = $("#cpuBtn");
+    var replayBtn = $("#replayBtn");
     var canvas = $("#gameCanvas");
     if(!canvas){
       showFallback("Canvas fehlt", "Das Spielfeld-Element wurde nicht gefunden.");
@@ -687,10 +758,12 @@ HTML = r"""<!doctype html>
       primary: hexToRgb("#6ea8fe"),
       primary2: hexToRgb("#8bd4ff"),
       text: "#e6eaf2",
-      border: "rgba(255,255,255,.10)"
+      border: "rgba(255,255,255,.10)",
+      version: 0
     };
 
     function refreshPalette(){
+      palette.version += 1;
       try{
         palette.primary = hexToRgb(cssVar("--primary"));
         palette.primary2 = hexToRgb(cssVar("--primary2"));
@@ -699,100 +772,376 @@ HTML = r"""<!doctype html>
       }catch(_e){}
     }
 
-    function setCanvasSize(){
+    // Local games use the canvas size as world size. Online matches use the
+    // server's fixed world ({w, h}), scaled uniformly and centered.
+    // The view maps the world onto the canvas. A world of about one screen
+    // is scaled to fit (online/replay worlds are letterboxed); wider maps are
+    // scaled to the canvas height and scroll: cam.w is the visible width in
+    // world px and applyCamera shifts the transform to cam.x.
+    function setCanvasSize(world, screens){
       var dpr = window.devicePixelRatio || 1;
       var rect = canvas.getBoundingClientRect();
       var w = Math.max(320, Math.floor(rect.width));
       var h = Math.max(320, Math.floor(rect.height));
       canvas.width = Math.floor(w * dpr);
       canvas.height = Math.floor(h * dpr);
-      ctx.setTransform(dpr, 0, 0, dpr, 0, 0);
-      return { w: w, h: h };
+      if(!world) world = { w: w * (screens || 1), h: h };
+      var sc = Math.min(w / world.w, h / world.h);
+      var scroll = world.w * (h / world.h) > w * 1.25;
+      if(scroll) sc = h / world.h;
+      var ox = scroll ? 0 : (w - world.w * sc) / 2;
+      var oy = (h - world.h * sc) / 2;
+      var view = { w: world.w, h: world.h, dpr: dpr * sc, sc: sc, ox: ox, oy: oy, px: dpr,
+                   cam: { x: 0, w: scroll ? w / sc : world.w, scroll: scroll } };
+      applyCamera(view);
+      return view;
     }
 
-    function makeTerrain(n){
-      var arr = new Array(n);
-      var seedA = Math.random() * 1000;
-      var seedB = Math.random() * 1000;
+    function applyCamera(view){
+      var k = view.px * view.sc;
+      ctx.setTransform(k, 0, 0, k, view.px * view.ox - k * view.cam.x, view.px * view.oy);
+    }
 
-      function smoothNoise(t, seed){
-        var x = t * 6.0 + seed;
-        var s = Math.sin(x) * 0.5 + Math.sin(x*0.37) * 0.3 + Math.sin(x*1.73) * 0.2;
-        return s;
-      }
+    // Seeded RNG (Mulberry32), bit-identical to engine/rng.py.
+    {{ mulberry32_js|indent(4)|safe }}
 
-      for(var i=0;i<n;i++){
-        var t = i / (n - 1);
-        var n1 = smoothNoise(t, seedA);
-        var n2 = smoothNoise(t, seedB) * 0.6;
-        var v = (n1 + n2);
-        v = (v + 1.2) / 2.4; // approx 0..1
-        v = clamp(v, 0.0, 1.0);
-        arr[i] = v;
+    function randomSeed(){
+      var m = /(?:^|[?&])seed=(\d+)(?:&|$)/.exec(window.location.search || "");
+      if(m) return parseInt(m[1], 10) >>> 0;
+      return Math.floor(Math.random() * 4294967296) >>> 0;
+    }
+
+    // Terrain: generated as a surface (samples from two noise seeds) and
+    // played on as destructible 2-D ground. Every sample interval is cut into
+    // TERRAIN_COLUMNS_PER_SAMPLE columns, and a column stores its solid spans
+    // as (top, bottom) pairs, top to bottom, so craters carve discs and leave
+    // tunnels and overhangs. Columns are grouped in chunks of RUN_CHUNK: a
+    // chunk keeps all its spans in one Float32Array with per-column offsets
+    // (a crater rebuilds only the chunks it touches) and the first span top
+    // per column, which rejects open sky without looking at the spans.
+    // A sample depends only on its index and the noise seeds, so a chunk is
+    // built the first time anything reads it; maps several screens wide only
+    // pay for the parts that are flown over or scrolled into view. Mirror of
+    // engine/runs.py (which builds every chunk up front).
+    var TERRAIN_COLUMNS_PER_SAMPLE = 2;
+    var RUN_CHUNK_SHIFT = 8;
+    var RUN_CHUNK = 1 << RUN_CHUNK_SHIFT;
+    var RUN_CHUNK_MASK = RUN_CHUNK - 1;
+    var RUN_MIN_SPAN = 0.5;     // px: thinner slivers left by a crater are dropped
+    var RUN_SWEEP_REFINE = 10;  // bisection steps for the contact point of a sweep
+    var RUN_PUSH_OUT = 4;       // px: at most this far along the normal after a bounce
+
+    // 16 ring directions for terrainNormal, from integer steps (sqrt is exact
+    // in both engines, unlike cos/sin)
+    function runNormalDirs(){
+      var steps = [[1,0],[2,1],[1,1],[1,2],[0,1],[-1,2],[-1,1],[-2,1],
+                   [-1,0],[-2,-1],[-1,-1],[-1,-2],[0,-1],[1,-2],[1,-1],[2,-1]];
+      var out = [];
+      for(var i=0;i<steps.length;i++){
+        var n = Math.sqrt(steps[i][0]*steps[i][0] + steps[i][1]*steps[i][1]);
+        out.push([steps[i][0] / n, steps[i][1] / n]);
       }
+      return out;
+    }
+    var RUN_NORMAL_DIRS = runNormalDirs();
+
+    // n samples over `screens` screen widths; draws the noise seeds from rand.
+    function makeTerrain(n, rand, screens){
+      var count = (n - 1) * TERRAIN_COLUMNS_PER_SAMPLE;
+      return {
+        n: n, screens: screens || 1, count: count,
+        seedA: rand() * 1000, seedB: rand() * 1000,
+        chunks: new Array((count + RUN_CHUNK - 1) >> RUN_CHUNK_SHIFT)
+      };
+    }
 
+    function terrainSample(i){
+      var t = state.terrain;
+      function smoothNoise(u, seed){
+        var x = u * 6.0 * t.screens + seed;
+        return Math.sin(x) * 0.5 + Math.sin(x*0.37) * 0.3 + Math.sin(x*1.73) * 0.2;
+      }
+      var u = i / (t.n - 1);
+      var v = smoothNoise(u, t.seedA) + smoothNoise(u, t.seedB) * 0.6;
+      v = clamp((v + 1.2) / 2.4, 0.0, 1.0); // approx 0..1
       // gentle edges: avoid very low/high at extremes
-      for(var j=0;j<n;j++){
-        var t2 = j / (n - 1);
-        var edge = Math.sin(Math.PI * t2);
-        arr[j] = lerp(0.55, arr[j], clamp(edge, 0.15, 1.0));
+      var edge = Math.sin(Math.PI * u);
+      return lerp(0.55, v, clamp(edge, 0.15, 1.0));
+    }
+
+    // Generated surface Y of sample i (float32, like the heightfield).
+    function terrainSurfaceY(i){
+      var hf = state.heightfield;
+      return Math.fround(lerp(hf.maxY, hf.minY, terrainSample(i)));
+    }
+
+    // Chunk c as generated: solid from the surface to the bottom.
+    function terrainChunk(c){
+      var t = state.terrain, h = state.heightfield.h;
+      var per = TERRAIN_COLUMNS_PER_SAMPLE;
+      var base = c << RUN_CHUNK_SHIFT;
+      var len = Math.min(RUN_CHUNK, t.count - base);
+      var chunk = { offs: new Uint32Array(len + 1), spans: new Float32Array(2 * len), tops: new Float32Array(len) };
+      var i = -1, y0 = 0, y1 = 0;
+      for(var j=0;j<len;j++){
+        var k = base + j;
+        if(Math.floor(k / per) !== i){
+          i = Math.floor(k / per);
+          y0 = terrainSurfaceY(i);
+          y1 = terrainSurfaceY(i + 1);
+        }
+        var u = (k + 0.5) / per - i;
+        chunk.spans[2 * j] = chunk.tops[j] = y0 + (y1 - y0) * u;
+        chunk.spans[2 * j + 1] = h;
+        chunk.offs[j + 1] = 2 * (j + 1);
       }
-      return arr;
+      t.chunks[c] = chunk;
+      return chunk;
     }
 
-    function terrainYAt(x){
+    function runsChunk(c){
+      return state.terrain.chunks[c] || terrainChunk(c);
+    }
+
+    // Column under x; the edge columns extend beyond the map.
+    function runsCol(x){
+      var k = Math.floor(x * state.heightfield.cscale), last = state.terrain.count - 1;
+      return k < 0 ? 0 : (k > last ? last : k);
+    }
+
+    function runsTop(k){
+      return runsChunk(k >> RUN_CHUNK_SHIFT).tops[k & RUN_CHUNK_MASK];
+    }
+
+    // Every column's spans as plain arrays (builds the whole map).
+    function terrainColumns(){
+      var out = new Array(state.terrain.count);
+      for(var k=0;k<out.length;k++){
+        var chunk = runsChunk(k >> RUN_CHUNK_SHIFT), j = k & RUN_CHUNK_MASK;
+        out[k] = Array.prototype.slice.call(chunk.spans, chunk.offs[j], chunk.offs[j + 1]);
+      }
+      return out;
+    }
+
+    // Heightfield: the pixel-space mapping of the generated samples and the
+    // column grid, plus the edit log. A rebuild drops every chunk (they are
+    // rebuilt, uncarved, on demand).
+    function buildHeightfield(){
       var w = state.view.w;
       var h = state.view.h;
-      var n = state.terrain.length;
-      if(w <= 1) return h * 0.75;
+      var n = state.terrain.n;
+      var hf = state.heightfield || { version: 0, edits: [] };
+
+      // full rebuild: consumers older than fullVersion must re-derive everything
+      hf.version += 1;
+      hf.fullVersion = hf.version;
+      hf.edits.length = 0;
+
+      hf.w = w;
+      hf.h = h;
+      hf.last = n - 1;
+      hf.scale = w > 1 ? (n - 1) / w : 0;
+      hf.cscale = hf.scale * TERRAIN_COLUMNS_PER_SAMPLE;   // columns per px
+      hf.minY = h * 0.42;
+      hf.maxY = h * 0.84;  // bedrock: craters never dig below the lowest surface
+      state.heightfield = hf;
+      state.terrain.chunks = new Array(state.terrain.chunks.length);
+      return hf;
+    }
+
+    // Dirty ranges: every local terrain edit bumps hf.version and logs the
+    // touched column interval, so caches derived from the terrain (draw
+    // tiles, the aim preview, ...) can patch [k0, k1] instead of re-deriving
+    // the whole width.
+    var TERRAIN_EDIT_LOG = 32;
+
+    function markTerrainDirty(k0, k1){
+      var hf = state.heightfield;
+      hf.version += 1;
+      hf.edits.push({ v: hf.version, k0: k0, k1: k1 });
+      if(hf.edits.length > TERRAIN_EDIT_LOG) hf.edits.shift();
+    }
 
-      var fx = clamp(x / w, 0, 1);
-      var idx = fx * (n - 1);
-      var i0 = Math.floor(idx);
-      var i1 = Math.min(n - 1, i0 + 1);
-      var t = idx - i0;
+    // Merged column range changed after `version`: null if nothing changed,
+    // the full range if the caller is older than a rebuild or the edit log.
+    function terrainDirtySince(version){
+      var hf = state.heightfield;
+      if(version >= hf.version) return null;
+      var full = { k0: 0, k1: state.terrain.count - 1 };
+      if(version < hf.fullVersion) return full;
+      if(!hf.edits.length || hf.edits[0].v > version + 1) return full;
+
+      var k0 = state.terrain.count - 1, k1 = 0;
+      for(var k=0;k<hf.edits.length;k++){
+        var e = hf.edits[k];
+        if(e.v <= version) continue;
+        if(e.k0 < k0) k0 = e.k0;
+        if(e.k1 > k1) k1 = e.k1;
+      }
+      return { k0: k0, k1: k1 };
+    }
+
+    // Y of the topmost solid at x.
+    function terrainYAt(x){
+      return runsTop(runsCol(x));
+    }
+
+    // Top of the first span at x that reaches below y (the span containing y
+    // or the next one down): the surface a body at (x, y) lands on.
+    function terrainGroundY(x, y){
+      var k = runsCol(x), chunk = runsChunk(k >> RUN_CHUNK_SHIFT), j = k & RUN_CHUNK_MASK;
+      for(var m=chunk.offs[j]; m<chunk.offs[j + 1]; m+=2){
+        if(chunk.spans[m + 1] > y) return chunk.spans[m];
+      }
+      return Infinity;
+    }
+
+    function terrainSolid(x, y){
+      var k = runsCol(x), chunk = runsChunk(k >> RUN_CHUNK_SHIFT), j = k & RUN_CHUNK_MASK;
+      for(var m=chunk.offs[j]; m<chunk.offs[j + 1]; m+=2){
+        if(chunk.spans[m] > y) return false;
+        if(chunk.spans[m + 1] > y) return true;
+      }
+      return false;
+    }
+
+    // Whether a circle at (x, y) of radius r overlaps solid ground; columns
+    // are strips.
+    function terrainTouch(x, y, r){
+      var scale = state.heightfield.cscale;
+      var kx = runsCol(x), k0 = runsCol(x - r), k1 = runsCol(x + r);
+      var yHi = y + r;
+      for(var k=k0; k<=k1; k++){
+        var chunk = runsChunk(k >> RUN_CHUNK_SHIFT), j = k & RUN_CHUNK_MASK;
+        if(chunk.tops[j] > yHi) continue;
+        var dx = k < kx ? x - (k + 1) / scale : (k > kx ? k / scale - x : 0);
+        var hh = r * r - dx * dx;
+        if(hh < 0) continue;
+        hh = Math.sqrt(hh);
+        var lo = y - hh, hi = y + hh;
+        for(var m=chunk.offs[j]; m<chunk.offs[j + 1]; m+=2){
+          if(chunk.spans[m] > hi) break;
+          if(chunk.spans[m + 1] >= lo) return true;
+        }
+      }
+      return false;
+    }
+
+    // First fraction t of the move (x0,y0) -> (x1,y1) at which a circle of
+    // radius r touches solid ground, or -1. Moves that stay above every
+    // column top they pass are rejected from the tops alone; otherwise the
+    // move is probed every r/2 and the first touching probe refined by
+    // bisection (the returned point touches).
+    function terrainSweep(x0, y0, x1, y1, r){
+      var k0 = runsCol(Math.min(x0, x1) - r), k1 = runsCol(Math.max(x0, x1) + r);
+      var low = Infinity;
+      for(var k=k0; k<=k1; k++){
+        var top = runsTop(k);
+        if(top < low) low = top;
+      }
+      if(Math.max(y0, y1) + r < low) return -1;
+      if(terrainTouch(x0, y0, r)) return 0;
+      var dx = x1 - x0, dy = y1 - y0;
+      var n = Math.max(1, Math.ceil(Math.sqrt(dx * dx + dy * dy) / (r * 0.5)));
+      var prev = 0;
+      for(var i=1; i<=n; i++){
+        var t = i / n;
+        if(terrainTouch(x0 + dx * t, y0 + dy * t, r)){
+          var lo = prev, hi = t;
+          for(var s=0; s<RUN_SWEEP_REFINE; s++){
+            var mid = (lo + hi) * 0.5;
+            if(terrainTouch(x0 + dx * mid, y0 + dy * mid, r)) hi = mid; else lo = mid;
+          }
+          return hi;
+        }
+        prev = t;
+      }
+      return -1;
+    }
+
+    // Unit vector away from the ground around (x, y): the negated mean of
+    // the solid points on a ring just outside the circle.
+    function terrainNormal(x, y, r){
+      var ring = r + 2, sx = 0, sy = 0;
+      for(var d=0; d<RUN_NORMAL_DIRS.length; d++){
+        var u = RUN_NORMAL_DIRS[d];
+        if(terrainSolid(x + u[0] * ring, y + u[1] * ring)){
+          sx += u[0];
+          sy += u[1];
+        }
+      }
+      var n = Math.sqrt(sx * sx + sy * sy);
+      return n === 0 ? [0, -1] : [-sx / n, -sy / n];
+    }
 
-      var base = lerp(state.terrain[i0], state.terrain[i1], t);
-      var minY = h * 0.42;
-      var maxY = h * 0.84;
-      var y = lerp(maxY, minY, base); // lower value => lower terrain? invert for feel
-      return y;
+    // Step (x, y) along n until the circle is clear (at most RUN_PUSH_OUT px).
+    function terrainPushOut(x, y, r, n){
+      for(var s=0; s<RUN_PUSH_OUT; s++){
+        if(!terrainTouch(x, y, r)) break;
+        x += n[0];
+        y += n[1];
+      }
+      return [x, y];
     }
 
+    // Carve a disc (above bedrock); returns the changed column range or null.
     function applyCrater(cx, cy, r){
-      var w = state.view.w;
-      var h = state.view.h;
-      var n = state.terrain.length;
-
-      var fx0 = clamp((cx - r) / w, 0, 1);
-      var fx1 = clamp((cx + r) / w, 0, 1);
-      var i0 = Math.floor(fx0 * (n - 1));
-      var i1 = Math.ceil(fx1 * (n - 1));
-
-      for(var i=i0; i<=i1; i++){
-        var fx = i / (n - 1);
-        var x = fx * w;
-        var dx = x - cx;
-        var adx = Math.abs(dx);
-        if(adx > r) continue;
-
-        var depth = Math.sqrt(Math.max(0, r*r - dx*dx));
-        var cutY = cy + depth;
-        cutY = clamp(cutY, 0, h + 200);
-
-        var curY = terrainYAt(x);
-
-        // If crater would push the surface downward, increase the terrain value locally.
-        if(cutY > curY){
-          var delta = cutY - curY;          // pixels down
-          var denom = Math.max(1, (h * 0.42)); // normalize
-          var bump = clamp(delta / denom, 0, 0.45);
-
-          // convert pixel-down into smaller "base" value (since y = lerp(maxY, minY, base))
-          // pushing surface down => increase y => decrease base
-          state.terrain[i] = clamp(state.terrain[i] - bump, 0.0, 1.0);
+      var t = state.terrain, hf = state.heightfield;
+      var scale = hf.cscale, bedrock = hf.maxY;
+      var k0 = Math.max(0, Math.floor((cx - r) * scale));
+      var k1 = Math.min(t.count - 1, Math.floor((cx + r) * scale));
+      if(k1 < k0) return null;
+      var lo = t.count, hi = -1;
+
+      for(var c=k0 >> RUN_CHUNK_SHIFT; c<=k1 >> RUN_CHUNK_SHIFT; c++){
+        var chunk = runsChunk(c);
+        var base = c << RUN_CHUNK_SHIFT, len = chunk.tops.length;
+        var ja = Math.max(k0, base) - base, jb = Math.min(k1, base + len - 1) - base;
+        var offs = chunk.offs, spans = chunk.spans;
+        var out = Array.prototype.slice.call(spans, 0, offs[ja]);
+        var newOffs = new Uint32Array(len + 1);
+        newOffs.set(offs.subarray(0, ja + 1));
+        var changed = false;
+        for(var j=ja; j<=jb; j++){
+          var k = base + j;
+          var dx = (k + 0.5) / scale - cx;
+          var hh = r * r - dx * dx;
+          var a = 0, b = 0;
+          if(hh > 0){
+            hh = Math.sqrt(hh);
+            a = cy - hh;
+            b = Math.min(cy + hh, bedrock);
+          }
+          var hit = false, first = out.length;
+          for(var m=offs[j]; m<offs[j + 1]; m+=2){
+            var top = spans[m], bottom = spans[m + 1];
+            if(b <= a || bottom <= a || top >= b){
+              out.push(top, bottom);
+              continue;
+            }
+            hit = true;
+            if(a - top >= RUN_MIN_SPAN) out.push(top, a);
+            if(bottom - b >= RUN_MIN_SPAN) out.push(b, bottom);
+          }
+          if(hit){
+            changed = true;
+            if(k < lo) lo = k;
+            if(k > hi) hi = k;
+            chunk.tops[j] = out.length > first ? out[first] : hf.h;
+          }
+          newOffs[j + 1] = out.length;
         }
+        if(!changed) continue;
+        var shift = out.length - offs[jb + 1];
+        for(var m2=offs[jb + 1]; m2<spans.length; m2++) out.push(spans[m2]);
+        for(var j2=jb + 2; j2<=len; j2++) newOffs[j2] = offs[j2] + shift;
+        chunk.offs = newOffs;
+        chunk.spans = new Float32Array(out);
       }
+
+      if(hi < lo) return null;
+      markTerrainDirty(lo, hi);
+      return { k0: lo, k1: hi };
     }
 
     function dist(ax, ay, bx, by){
@@ -800,12 +1149,84 @@ HTML = r"""<!doctype html>
       return Math.sqrt(dx*dx + dy*dy);
     }
 
+    // --- worm broadphase -----------------------------------------------------
+    // Uniform x-columns of GRID_COLUMN_W px. Each column keeps the ascending
+    // indices of the worms whose extent [x - r, x + r] touches it, so a query
+    // yields candidates in the same order as a scan over state.players.
+    // Mirror of engine/broadphase.py.
+    var GRID_COLUMN_W = 32;
+    var KNOCKBACK = 4.0;  // worm launch speed in px/s per point of damage
+
+    function gridBuild(w, players, cell){
+      var g = { w: w, cell: cell || GRID_COLUMN_W, cols: [], spans: [], mark: [], stamp: 0 };
+      var n = Math.max(1, Math.ceil(w / g.cell));
+      for(var c=0;c<n;c++) g.cols.push([]);
+      for(var i=0;i<players.length;i++){
+        g.mark.push(0);
+        gridInsert(g, i, players[i]);
+      }
+      return g;
+    }
+
+    function gridCol(g, x){
+      var c = Math.floor(x / g.cell), last = g.cols.length - 1;
+      return c < 0 ? 0 : (c > last ? last : c);
+    }
+
+    function gridInsert(g, i, pl){
+      var x = pl.x * g.w;
+      var c0 = gridCol(g, x - pl.r), c1 = gridCol(g, x + pl.r);
+      g.spans[i] = [c0, c1];
+      for(var c=c0;c<=c1;c++){
+        var col = g.cols[c], k = col.length;
+        while(k && col[k - 1] > i) k--;
+        col.splice(k, 0, i);
+      }
+    }
+
+    // Re-index worm i after its x changed.
+    function gridMove(g, i, pl){
+      var span = g.spans[i], x = pl.x * g.w;
+      if(span[0] === gridCol(g, x - pl.r) && span[1] === gridCol(g, x + pl.r)) return;
+      for(var c=span[0];c<=span[1];c++){
+        var col = g.cols[c];
+        col.splice(col.indexOf(i), 1);
+      }
+      gridInsert(g, i, pl);
+    }
+
+    // Indices of worms whose extent may overlap [lo, hi], ascending. The
+    // result may be a column's own array: read it, don't keep or change it.
+    function gridQuery(g, lo, hi){
+      var c0 = gridCol(g, lo), c1 = gridCol(g, hi);
+      if(c0 === c1) return g.cols[c0];
+      var stamp = ++g.stamp, out = [];
+      for(var c=c0;c<=c1;c++){
+        var col = g.cols[c];
+        for(var k=0;k<col.length;k++){
+          if(g.mark[col[k]] !== stamp){
+            g.mark[col[k]] = stamp;
+            out.push(col[k]);
+          }
+        }
+      }
+      return out.sort(function(a, b){ return a - b; });
+    }
+
+    // Rebuild the grid and wake every worm; after placing worms from outside.
+    function reindexWorms(){
+      state.grid = gridBuild(state.view.w, state.players);
+      state.awake = [];
+      for(var i=0;i<state.players.length;i++) state.awake.push(i);
+    }
+
     function explosion(cx, cy, radius, maxDmg, crater){
-      if(crater) applyCrater(cx, cy, radius);
+      var dirty = crater ? applyCrater(cx, cy, radius) : null;
 
-      var hits = [];
-      for(var p=0;p<state.players.length;p++){
-        var pl = state.players[p];
+      var hits = [], wake = [];
+      var near = gridQuery(state.grid, cx - radius, cx + radius);
+      for(var p=0;p<near.length;p++){
+        var pl = state.players[near[p]];
         if(!pl.alive) continue;
 
         var px = pl.x * state.view.w;
@@ -819,6 +1240,12 @@ HTML = r"""<!doctype html>
           if(dmg > 0){
             pl.hp = clamp(pl.hp - dmg, 0, 100);
             hits.push({ id: pl.id, dmg: dmg });
+            // knockback: away from the blast, always with some lift
+            var speed = KNOCKBACK * dmg;
+            var ux = d > 0 ? (px - cx) / d : 0, uy = d > 0 ? (py - cy) / d : -1;
+            pl.vx = ux * speed;
+            pl.vy = (uy - 1) * 0.5 * speed;
+            wake.push(near[p]);
           }
         }
       }
@@ -830,33 +1257,54 @@ HTML = r"""<!doctype html>
         dur: 360
       };
 
-      // Trigger falling if ground changed under worms
-      for(var p2=0;p2<state.players.length;p2++){
-        var pl2 = state.players[p2];
+      // Trigger falling if ground changed under worms (one column of margin)
+      var scale = state.heightfield.cscale;
+      if(dirty && scale > 0){
+        wake = wake.concat(gridQuery(state.grid, (dirty.k0 - 1) / scale, (dirty.k1 + 2) / scale));
+      }
+      for(var p2=0;p2<wake.length;p2++){
+        var pl2 = state.players[wake[p2]];
         if(!pl2.alive) continue;
         pl2.falling = true;
       }
+      if(wake.length){
+        var all = state.awake.concat(wake).sort(function(a, b){ return a - b; });
+        state.awake = all.filter(function(v, k){ return k === 0 || v !== all[k - 1]; });
+      }
 
       return hits;
     }
 
+    // Worms outside state.awake rest on unchanged ground and are not falling.
     function allPlayersStable(){
-      for(var i=0;i<state.players.length;i++){
-        var pl = state.players[i];
+      for(var k=0;k<state.awake.length;k++){
+        var pl = state.players[state.awake[k]];
         if(!pl.alive) continue;
         if(pl.falling) return false;
       }
       return true;
     }
 
+    function teamName(team){
+      return state.teamSize === 1 ? "Player " + (team + 1) : "Team " + (team + 1);
+    }
+
+    // HUD name of the worm with player id ``id`` (ids are 1-based indices).
+    function playerName(id){
+      return state.players[id - 1].name;
+    }
+
     function checkGameOver(){
-      var alive = state.players.filter(function(p){ return p.hp > 0; });
-      if(alive.length <= 1){
+      var alive = [false, false];
+      for(var i=0;i<state.players.length;i++){
+        if(state.players[i].hp > 0) alive[state.players[i].team] = true;
+      }
+      if(!alive[0] || !alive[1]){
         state.phase = "gameover";
         state.inputLocked = true;
-        var winner = alive.length === 1 ? alive[0] : null;
-        state.winner = winner ? winner.id : 0;
-        showToast(winner ? ("Game Over: " + winner.name + " gewinnt!") : "Game Over: Unentschieden");
+        // winning team + 1, which is the player id in a duel
+        state.winner = alive[0] ? 1 : (alive[1] ? 2 : 0);
+        showToast(state.winner ? ("Game Over: " + teamName(state.winner - 1) + " gewinnt!") : "Game Over: Unentschieden");
         return true;
       }
       return false;
@@ -877,11 +1325,19 @@ HTML = r"""<!doctype html>
     function setWeapon(slot){
       state.weaponSlot = clamp(slot, 1, 3);
       state.weapon = weaponBySlot(state.weaponSlot);
-      safeText(weaponTag, "Waffe: " + state.weapon.name);
+      updateHud();
     }
 
     function newTurn(){
-      state.active = 1 - state.active;
+      // the other team moves, with its next living worm in order
+      var team = 1 - state.players[state.active].team;
+      var n = state.teamSize, k = state.cursor[team];
+      for(var step=1; step<=n; step++){
+        k = (state.cursor[team] + step) % n;
+        if(state.players[team * n + k].hp > 0) break;
+      }
+      state.cursor[team] = k;
+      state.active = team * n + k;
       state.angleDeg = 45;
       state.power = 62;
       state.inputLocked = false;
@@ -889,22 +1345,68 @@ HTML = r"""<!doctype html>
       state.projectile = null;
       state.pendingSwitch = false;
       state.postShotHold = 0;
+      state.turn += 1;
+      state.aimTicks = 0;
 
-      state.wind = (Math.random() * 2 - 1) * 55; // px/s^2
+      state.wind = (state.rng() * 2 - 1) * 55; // px/s^2
       updateHud();
     }
 
-    function startGame(){
+    // ?map=N: the map is N screens wide and scrolls (1 = one screen).
+    var mapMatch = /(?:^|[?&])map=(\d{1,2})(?:&|$)/.exec(window.location.search || "");
+    var MAX_MAP_SCREENS = 8;
+    var MAP_SCREENS = mapMatch ? clamp(parseInt(mapMatch[1], 10), 1, MAX_MAP_SCREENS) : 1;
+    var TERRAIN_N = 620;  // samples per screen width
+
+    // ?teams=N: N worms per side take turns team by team (1 = the duel).
+    // Online matches stay duels; replays carry their own team size.
+    var MAX_TEAM_SIZE = 16;
+    var teamsMatch = /(?:^|[?&])teams=(\d{1,2})(?:&|$)/.exec(window.location.search || "");
+    var TEAM_SIZE = teamsMatch ? clamp(parseInt(teamsMatch[1], 10), 1, MAX_TEAM_SIZE) : 1;
+
+    // Worms of both teams, team 0 on the left facing right; ids 1..2n. On
+    // wider maps the front line stays as far apart as on one screen (shots
+    // have a limited range); teams spread over up to three screens.
+    function spawnPlayers(teamSize, screens){
+      var spread = teamSize > 1 ? Math.min(screens, 3) : 1;
+      var players = [];
+      for(var team=0; team<2; team++){
+        for(var k=0;k<teamSize;k++){
+          var x = teamSize === 1 ? 0.18 : 0.06 + 0.36 * k / (teamSize - 1);
+          if(screens > 1) x = 0.5 + (-0.08 + (x - 0.42) * spread) / screens;
+          players.push({
+            id: team * teamSize + k + 1, team: team,
+            name: teamSize === 1 ? "Player " + (team + 1) : "Team " + (team + 1) + " · Wurm " + (k + 1),
+            x: team === 0 ? x : 1 - x, y: 0, r: 12, hp: 100, vx: 0, vy: 0, falling: false, alive: true
+          });
+        }
+      }
+      return players;
+    }
+
+    function startGame(seed, world){
       refreshPalette();
 
+      if(seed === undefined) seed = randomSeed();
+      var rng = mulberry32(seed);
+      var teamSize = Net.on ? 1 : (Replay.on ? clamp(Replay.data.teams || 1, 1, MAX_TEAM_SIZE) : TEAM_SIZE);
+      var screens = Net.on ? 1 : (Replay.on ? clamp(Replay.data.screens || 1, 1, MAX_MAP_SCREENS) : MAP_SCREENS);
+
       state = {
-        view: setCanvasSize(),
-        terrainN: 620,
-        terrain: makeTerrain(620),
-        players: [
-          { id: 1, name: "Player 1", x: 0.18, y: 0, r: 12, hp: 100, vy: 0, falling: false, alive: true },
-          { id: 2, name: "Player 2", x: 0.82, y: 0, r: 12, hp: 100, vy: 0, falling: false, alive: true }
-        ],
+        view: setCanvasSize(world, screens),
+        seed: seed,
+        rng: rng,
+        turn: 0,
+        acc: 0,
+        renderAlpha: 1,
+        terrainN: (TERRAIN_N - 1) * screens + 1,
+        terrain: makeTerrain((TERRAIN_N - 1) * screens + 1, rng, screens),
+        screens: screens,
+        players: spawnPlayers(teamSize, screens),
+        teamSize: teamSize,
+        cursor: [0, teamSize - 1],
+        grid: null,
+        awake: null,
         active: 0,
         angleDeg: 45,
         power: 62,
@@ -920,23 +1422,33 @@ HTML = r"""<!doctype html>
         postShotHold: 0,
         winner: 0,
         isCharging: false,
-        _lastAimToast: 0
+        _lastAimToast: 0,
+        aimTicks: 0,
+        heightfield: null
       };
+      state.record = { v: {{ replay_version }}, seed: seed, w: state.view.w, h: state.view.h, teams: teamSize, screens: screens, shots: [] };
+      buildHeightfield();
 
       // place worms on ground
       for(var i=0;i<state.players.length;i++){
         var pl = state.players[i];
         var px = pl.x * state.view.w;
         pl.y = terrainYAt(px) - pl.r - 1;
+        pl.prevX = pl.x;
+        pl.prevY = pl.y;
         pl.vy = 0;
         pl.falling = false;
         pl.alive = true;
         pl.hp = 100;
       }
+      reindexWorms();
+      safeText(p1Name, teamName(0));
+      safeText(p2Name, teamName(1));
 
       state.active = 0;
-      state.wind = (Math.random() * 2 - 1) * 55;
+      state.wind = (rng() * 2 - 1) * 55;
       setWeapon(1);
+      updateCamera(0, true);
 
       state.phase = "aim";
       state.inputLocked = false;
@@ -944,34 +1456,77 @@ HTML = r"""<!doctype html>
 
       hideFallback();
       updateHud();
-      showToast("Player 1 am Zug");
+      showToast(state.players[0].name + " am Zug");
     }
 
-    function updateHud(){
-      if(!state) return;
+    // HUD model: the values last written to the DOM. updateHud runs every
+    // frame but only touches elements whose value actually changed, so idle
+    // frames cause no style/layout work.
+    var hud = {
+      p1Hp: null, p2Hp: null, activeId: null,
+      wind: null, weapon: null, angle: null, power: null
+    };
 
-      var p1 = state.players[0];
-      var p2 = state.players[1];
+    function hudText(el, txt){
+      safeText(el, txt);
+      perfCount("hud.writes");
+    }
 
-      safeText(p1HpText, String(Math.round(p1.hp)));
-      safeText(p2HpText, String(Math.round(p2.hp)));
+    function hudScale(el, hp){
+      if(!el) return;
+      el.style.transform = "scaleX(" + clamp(hp / 100, 0, 1).toFixed(3) + ")";
+      perfCount("hud.writes");
+    }
 
-      var p1Scale = clamp(p1.hp / 100, 0, 1);
-      var p2Scale = clamp(p2.hp / 100, 0, 1);
+    function updateHud(){
+      if(!state) return;
 
-      if(p1HpFill) p1HpFill.style.transform = "scaleX(" + p1Scale.toFixed(3) + ")";
-      if(p2HpFill) p2HpFill.style.transform = "scaleX(" + p2Scale.toFixed(3) + ")";
+      // team totals; the bar shows the share of the team's starting HP
+      var p1Hp = 0, p2Hp = 0;
+      for(var i=0;i<state.players.length;i++){
+        var pl = state.players[i];
+        if(pl.team === 0) p1Hp += pl.hp;
+        else p2Hp += pl.hp;
+      }
+      p1Hp = Math.round(p1Hp);
+      p2Hp = Math.round(p2Hp);
+      if(p1Hp !== hud.p1Hp){
+        hud.p1Hp = p1Hp;
+        hudText(p1HpText, String(p1Hp));
+        hudScale(p1HpFill, p1Hp / state.teamSize);
+      }
+      if(p2Hp !== hud.p2Hp){
+        hud.p2Hp = p2Hp;
+        hudText(p2HpText, String(p2Hp));
+        hudScale(p2HpFill, p2Hp / state.teamSize);
+      }
 
       var activeId = state.players[state.active].id;
-      safeText(turnTag, "Player " + activeId + " am Zug");
+      if(activeId !== hud.activeId){
+        hud.activeId = activeId;
+        hudText(turnTag, state.players[state.active].name + " am Zug");
+      }
 
-      var w = Math.round(Math.abs(state.wind));
-      var dir = state.wind < -1 ? "←" : (state.wind > 1 ? "→" : "·");
-      safeText(windTag, "Wind: " + dir + " " + w);
+      // signed, rounded wind; the arrow only depends on |wind| > 1
+      var windKey = (state.wind < -1 ? -1 : (state.wind > 1 ? 1 : 0)) * 1000 + Math.round(Math.abs(state.wind));
+      if(windKey !== hud.wind){
+        hud.wind = windKey;
+        var dir = state.wind < -1 ? "←" : (state.wind > 1 ? "→" : "·");
+        hudText(windTag, "Wind: " + dir + " " + Math.round(Math.abs(state.wind)));
+      }
 
-      safeText(weaponTag, "Waffe: " + state.weapon.name);
+      if(state.weapon.name !== hud.weapon){
+        hud.weapon = state.weapon.name;
+        hudText(weaponTag, "Waffe: " + state.weapon.name);
+      }
 
-      safeText(aimTag, "Angle: " + Math.round(state.angleDeg) + "° · Power: " + Math.round(state.power));
+      var angle = Math.round(state.angleDeg);
+      var power = Math.round(state.power);
+      if(angle !== hud.angle || power !== hud.power){
+        hud.angle = angle;
+        hud.power = power;
+        hudText(aimTag, "Angle: " + angle + "° · Power: " + power);
+      }
     }
 
     function fire(){
@@ -981,6 +1536,16 @@ HTML = r"""<!doctype html>
       var shooter = state.players[state.active];
       if(shooter.hp <= 0) return;
 
+      if(Net.on){
+        netFire();
+        return;
+      }
+
+      // replay record: everything else follows from the seed
+      if(state.record){
+        state.record.shots.push([state.weaponSlot, state.angleDeg, state.power, state.aimTicks, state.wind]);
+      }
+
       state.inputLocked = true;
       state.phase = "projectile";
 
@@ -990,7 +1555,7 @@ HTML = r"""<!doctype html>
       var sx = shooter.x * w;
       var sy = shooter.y - shooter.r * 0.15;
 
-      var dir = (shooter.id === 1) ? 1 : -1;
+      var dir = (shooter.team === 0) ? 1 : -1;
 
       var angleDeg = state.angleDeg;
       if(dir === -1) angleDeg = 180 - angleDeg;
@@ -1005,13 +1570,22 @@ HTML = r"""<!doctype html>
         y: sy - shooter.r * 0.1,
         vx: vx,
         vy: vy,
+        prevX: 0,
+        prevY: 0,
         r: state.weapon.projR,
         age: 0,
         bounces: 0,
         fuse: state.weapon.fuse,
         exploded: false,
-        owner: shooter.id
+        owner: shooter.id,
+        // ids of the shooter's team the projectile has not been outside of
+        // yet: it spawns inside the shooter, and in a crowded team inside
+        // neighbours
+        inside: state.players.filter(function(pl){ return pl.team === shooter.team; })
+                             .map(function(pl){ return pl.id; })
       };
+      state.projectile.prevX = state.projectile.x;
+      state.projectile.prevY = state.projectile.y;
     }
 
     function endShotAndSwitch(msg){
@@ -1027,7 +1601,7 @@ HTML = r"""<!doctype html>
       var hits = explosion(cx, cy, wpn.radius, wpn.maxDmg, true);
 
       if(hits.length){
-        var txt = hits.map(function(h){ return "P" + h.id + " -" + h.dmg; }).join(" · ");
+        var txt = hits.map(function(h){ return playerName(h.id) + " -" + h.dmg; }).join(" · ");
         showToast("Treffer! " + txt);
       }else{
         showToast("Boom!");
@@ -1038,22 +1612,51 @@ HTML = r"""<!doctype html>
       endShotAndSwitch(null);
     }
 
-    function projectileCollidesWorm(px, py){
-      for(var i=0;i<state.players.length;i++){
-        var pl = state.players[i];
+    // First fraction t of the move (x0,y0) -> +(dx,dy) that comes within
+    // reach of (cx,cy): 0 when it starts inside, -1 if never.
+    function sweepCircle(x0, y0, dx, dy, cx, cy, reach){
+      var ox = x0 - cx, oy = y0 - cy;
+      var c = ox * ox + oy * oy - reach * reach;
+      if(c <= 0) return 0;
+      var b = ox * dx + oy * dy;
+      if(b >= 0) return -1;  // not approaching
+      var a = dx * dx + dy * dy;
+      var disc = b * b - a * c;
+      if(disc < 0) return -1;
+      var t = (-b - Math.sqrt(disc)) / a;
+      return t <= 1 ? t : -1;
+    }
+
+    // Earliest worm the projectile hits moving (x0,y0) -> +(dx,dy), as
+    // { t, pl } or null. The shooter and its teammates are skipped until the
+    // projectile has left their hitbox once (see fire).
+    function projectileSweepWorms(p, x0, y0, dx, dy){
+      var best = null;
+      var near = gridQuery(state.grid, Math.min(x0, x0 + dx) - p.r, Math.max(x0, x0 + dx) + p.r);
+      for(var i=0;i<near.length;i++){
+        var pl = state.players[near[i]];
         if(pl.hp <= 0) continue;
-        var wx = pl.x * state.view.w;
-        var wy = pl.y;
-        if(dist(px, py, wx, wy) <= pl.r + (state.projectile ? state.projectile.r : 3)){
-          return { pl: pl, x: wx, y: wy };
+        var cx = pl.x * state.view.w, cy = pl.y, reach = pl.r + p.r;
+        var at = p.inside.indexOf(pl.id);
+        if(at >= 0){
+          var ox = x0 - cx, oy = y0 - cy;
+          if(ox * ox + oy * oy <= reach * reach) continue;
+          p.inside.splice(at, 1);
         }
+        var t = sweepCircle(x0, y0, dx, dy, cx, cy, reach);
+        if(t >= 0 && (!best || t < best.t)) best = { t: t, pl: pl };
       }
-      return null;
+      return best;
     }
 
+    // Only awake worms are stepped: a worm resting on ground that did not
+    // change would be pinned to the same y again. explosion() wakes the
+    // worms it hits or digs under.
     function updateWormPhysics(dt){
       var w = state.view.w;
-      for(var i=0;i<state.players.length;i++){
+      var still = [];
+      for(var k=0;k<state.awake.length;k++){
+        var i = state.awake[k];
         var pl = state.players[i];
         if(pl.hp <= 0){
           pl.alive = false;
@@ -1061,8 +1664,9 @@ HTML = r"""<!doctype html>
         }
         pl.alive = true;
 
-        var px = pl.x * w;
-        var gy = terrainYAt(px) - pl.r - 1;
+        // ground under the worm's centre: caves have more than one floor
+        var px = pl.x * w, y0 = pl.y;
+        var gy = terrainGroundY(px, y0) - pl.r - 1;
 
         // If worm is above ground -> fall
         if(pl.y < gy - 0.5){
@@ -1071,17 +1675,27 @@ HTML = r"""<!doctype html>
 
         if(pl.falling){
           pl.vy += state.gravity * dt;
+          if(pl.vy < 0 && terrainSolid(px, y0 - pl.r)) pl.vy = 0;  // ceiling
           pl.y += pl.vy * dt;
+          if(pl.vx){
+            var x = clamp(pl.x + pl.vx * dt / w, pl.r / w, 1 - pl.r / w);
+            if(terrainSolid(x * w, y0)){
+              pl.vx = 0;  // wall
+            }else{
+              pl.x = x;
+              gridMove(state.grid, i, pl);
+              gy = terrainGroundY(x * w, y0) - pl.r - 1;
+            }
+          }
 
-          var gy2 = terrainYAt(px) - pl.r - 1;
-          if(pl.y >= gy2){
-            pl.y = gy2;
+          if(pl.y >= gy){
+            pl.y = gy;
             pl.vy = 0;
+            pl.vx = 0;
             pl.falling = false;
           }
         }else{
-          // keep pinned to ground if terrain rises slightly
-          pl.y = terrainYAt(px) - pl.r - 1;
+          pl.y = gy;
           pl.vy = 0;
         }
 
@@ -1089,86 +1703,96 @@ HTML = r"""<!doctype html>
         if(pl.y > state.view.h + 80){
           pl.hp = 0;
           pl.alive = false;
+        }else if(pl.falling){
+          still.push(i);
         }
       }
+      state.awake = still;
     }
 
     function updateProjectile(dt){
       var p = state.projectile;
       if(!p) return;
 
-      var w = state.view.w;
-      var h = state.view.h;
-
-      var steps = 4; // reduce tunneling
+      // collisions are swept, so substeps only bound the integration step
+      // (4 at 60 Hz, 1 at 240 Hz)
+      var steps = Math.max(1, Math.ceil(dt / MAX_SUBSTEP - 1e-9));
       var sub = dt / steps;
 
       for(var s=0; s<steps; s++){
-        p.age += sub;
+        if(projectileSubstep(p, sub)) return;
+      }
+    }
 
-        // fuse for grenade
-        if(state.weapon.key === "grenade" && p.fuse > 0 && p.age >= p.fuse){
-          impactExplode(p.x, p.y);
-          return;
-        }
+    // One integration substep; returns true once the shot is over.
+    function projectileSubstep(p, sub){
+      var w = state.view.w;
+      var h = state.view.h;
 
-        // integrate
-        p.vx += state.wind * sub;
-        p.vy += state.gravity * sub;
-        p.x += p.vx * sub;
-        p.y += p.vy * sub;
+      p.age += sub;
 
-        // worm collision
-        var hit = projectileCollidesWorm(p.x, p.y);
-        if(hit){
-          impactExplode(p.x, p.y);
-          return;
-        }
+      // fuse for grenade
+      if(state.weapon.key === "grenade" && p.fuse > 0 && p.age >= p.fuse){
+        impactExplode(p.x, p.y);
+        return true;
+      }
 
-        // bounds
-        if(p.x < -80 || p.x > w + 80 || p.y > h + 120 || p.y < -160){
-          endShotAndSwitch("Verfehlt.");
-          return;
-        }
+      // integrate
+      var x0 = p.x, y0 = p.y;
+      p.vx += state.wind * sub;
+      p.vy += state.gravity * sub;
+      p.x += p.vx * sub;
+      p.y += p.vy * sub;
+      var mx = p.x - x0, my = p.y - y0;
+
+      // earliest contact along the step: worm first on a tie
+      var hit = projectileSweepWorms(p, x0, y0, mx, my);
+      var tGround = terrainSweep(x0, y0, p.x, p.y, p.r);
+      if(hit && (tGround < 0 || hit.t <= tGround)){
+        p.x = x0 + mx * hit.t;
+        p.y = y0 + my * hit.t;
+        impactExplode(p.x, p.y);
+        return true;
+      }
+      if(tGround >= 0){
+        p.x = x0 + mx * tGround;
+        p.y = y0 + my * tGround;
+      }
 
-        // terrain collision
-        var gy = terrainYAt(p.x);
-        if(p.y + p.r >= gy){
-          if(state.weapon.key === "grenade" && p.bounces < state.weapon.bounce){
-            // bounce with simple normal from slope
-            var eps = 6;
-            var gyL = terrainYAt(p.x - eps);
-            var gyR = terrainYAt(p.x + eps);
-            var dx = 2*eps;
-            var dy = gyR - gyL;
-            // tangent (dx, dy) => normal (-dy, dx)
-            var nx = -dy;
-            var ny = dx;
-            var nlen = Math.sqrt(nx*nx + ny*ny) || 1;
-            nx /= nlen; ny /= nlen;
-
-            // reflect v around normal
-            var dot = p.vx * nx + p.vy * ny;
-            p.vx = p.vx - 2 * dot * nx;
-            p.vy = p.vy - 2 * dot * ny;
-
-            // restitution + friction
-            p.vx *= 0.62;
-            p.vy *= 0.55;
-
-            // reposition above ground
-            p.y = gy - p.r - 1;
-
-            p.bounces += 1;
-            if(p.bounces >= state.weapon.bounce){
-              // let it still fly until fuse expires
-            }
-          }else{
-            impactExplode(p.x, gy - 1);
-            return;
+      // bounds
+      if(p.x < -80 || p.x > w + 80 || p.y > h + 120 || p.y < -160){
+        endShotAndSwitch("Verfehlt.");
+        return true;
+      }
+
+      // terrain collision
+      if(tGround >= 0){
+        if(state.weapon.key === "grenade" && p.bounces < state.weapon.bounce){
+          // reflect v around the ground normal (walls and ceilings too)
+          var n = terrainNormal(p.x, p.y, p.r);
+          var dot = p.vx * n[0] + p.vy * n[1];
+          p.vx = p.vx - 2 * dot * n[0];
+          p.vy = p.vy - 2 * dot * n[1];
+
+          // restitution + friction
+          p.vx *= 0.62;
+          p.vy *= 0.55;
+
+          // out of the ground
+          var out = terrainPushOut(p.x, p.y, p.r, n);
+          p.x = out[0];
+          p.y = out[1];
+
+          p.bounces += 1;
+          if(p.bounces >= state.weapon.bounce){
+            // let it still fly until fuse expires
           }
+        }else{
+          impactExplode(p.x, p.y);
+          return true;
         }
       }
+      return false;
     }
 
     function updatePost(dt){
@@ -1181,11 +1805,11 @@ HTML = r"""<!doctype html>
 
       if(state.postShotHold > 0.25 && allPlayersStable()){
         newTurn();
-        showToast("Player " + state.players[state.active].id + " am Zug");
+        showToast(state.players[state.active].name + " am Zug");
       }else if(state.postShotHold > 2.25){
         // hard timeout to avoid getting stuck
         newTurn();
-        showToast("Player " + state.players[state.active].id + " am Zug");
+        showToast(state.players[state.active].name + " am Zug");
       }
     }
 
@@ -1196,13 +1820,16 @@ HTML = r"""<!doctype html>
         if(state.isCharging){
           state.power = clamp(state.power + 45 * dt, 10, 100);
         }
+        state.aimTicks += 1;
         updateWormPhysics(dt);
       }else if(state.phase === "projectile"){
         updateProjectile(dt);
         updateWormPhysics(dt);
       }else if(state.phase === "post"){
         updatePost(dt);
-      }else if(state.phase === "gameover"){
+      }else if(state.phase === "remoteShot"){
+        updateRemoteShot(dt);
+      }else if(state.phase === "gameover" || state.phase === "remote"){
         updateWormPhysics(dt);
       }
 
@@ -1213,52 +1840,169 @@ HTML = r"""<!doctype html>
           state.fx.explosion = null;
         }
       }
+    }
+
+    // Terrain tiles: every terrain chunk is painted into its own offscreen
+    // canvas and repainted only after a crater touches it (or on palette /
+    // resolution changes). A frame draws just the tiles inside the camera;
+    // tiles that scroll out of view hand their canvas back to a pool, so
+    // draw work and memory depend on the screen size, not the map size.
+    var terrainTiles = { terrain: null, tiles: {}, pool: [], palette: -1, dpr: 0, pw: 0, ph: 0 };
+
+    function makeLayerCanvas(pw, ph){
+      if(typeof OffscreenCanvas !== "undefined"){
+        try{ return new OffscreenCanvas(pw, ph); }catch(_e){}
+      }
+      var c = document.createElement("canvas");
+      c.width = pw;
+      c.height = ph;
+      return c;
+    }
 
-      updateHud();
+    // World x range [x0, x1) covered by the tile of chunk c.
+    function tileSpan(c){
+      var hf = state.heightfield;
+      var k1 = (c + 1) << RUN_CHUNK_SHIFT;
+      return {
+        x0: Math.floor((c << RUN_CHUNK_SHIFT) / hf.cscale),
+        x1: k1 >= state.terrain.count ? state.view.w : Math.floor(k1 / hf.cscale)
+      };
     }
 
-    function drawTerrain(){
-      var w = state.view.w;
+    function paintTile(tile, c){
       var h = state.view.h;
+      var hf = state.heightfield;
+      var dpr = terrainTiles.dpr;
+      var span = tileSpan(c);
+      var lctx = tile.ctx;
 
       var c1 = palette.primary;
       var c2 = palette.primary2;
 
-      ctx.beginPath();
-      ctx.moveTo(0, h);
-      ctx.lineTo(0, terrainYAt(0));
-
-      var step = Math.max(2, Math.floor(w / 220));
-      for(var x=0; x<=w; x+=step){
-        ctx.lineTo(x, terrainYAt(x));
+      // one column of slack on each side: the outline continues across tiles
+      var k0 = Math.max(0, (c << RUN_CHUNK_SHIFT) - 1);
+      var k1 = Math.min(state.terrain.count - 1, ((c + 1) << RUN_CHUNK_SHIFT));
+      var cw = 1 / hf.cscale;
+
+      lctx.setTransform(dpr, 0, 0, dpr, -span.x0 * dpr, 0);
+      lctx.clearRect(span.x0, 0, span.x1 - span.x0 + 1, h);
+      lctx.save();
+      lctx.beginPath();
+      lctx.rect(span.x0, 0, span.x1 - span.x0, h);
+      lctx.clip();
+
+      // every solid span as a column rect (slightly wider, so neighbours
+      // overlap instead of leaving anti-aliased seams)
+      lctx.beginPath();
+      for(var k=k0; k<=k1; k++){
+        var chunk = runsChunk(k >> RUN_CHUNK_SHIFT), j = k & RUN_CHUNK_MASK;
+        for(var m=chunk.offs[j]; m<chunk.offs[j + 1]; m+=2){
+          lctx.rect(k * cw, chunk.spans[m], cw + 0.5, chunk.spans[m + 1] - chunk.spans[m]);
+        }
       }
-      ctx.lineTo(w, terrainYAt(w));
-      ctx.lineTo(w, h);
-      ctx.closePath();
 
-      var grad = ctx.createLinearGradient(0, h*0.4, 0, h);
+      var grad = lctx.createLinearGradient(0, h*0.4, 0, h);
       grad.addColorStop(0, rgba(c1, 0.14));
       grad.addColorStop(1, rgba(c2, 0.10));
-      ctx.fillStyle = grad;
-      ctx.fill();
+      lctx.fillStyle = grad;
+      lctx.fill();
+
+      // outline: a 2 px band along every span top and every cave ceiling
+      lctx.beginPath();
+      for(var k2=k0; k2<=k1; k2++){
+        var ch = runsChunk(k2 >> RUN_CHUNK_SHIFT), j2 = k2 & RUN_CHUNK_MASK;
+        for(var m2=ch.offs[j2]; m2<ch.offs[j2 + 1]; m2+=2){
+          lctx.rect(k2 * cw, ch.spans[m2] - 1, cw + 0.5, 2);
+          if(ch.spans[m2 + 1] < h) lctx.rect(k2 * cw, ch.spans[m2 + 1] - 1, cw + 0.5, 2);
+        }
+      }
+      lctx.fillStyle = rgba(c1, 0.22);
+      lctx.fill();
+      lctx.restore();
 
-      // outline
-      ctx.beginPath();
-      ctx.moveTo(0, terrainYAt(0));
-      for(var xx=0; xx<=w; xx+=step){
-        ctx.lineTo(xx, terrainYAt(xx));
+      tile.version = hf.version;
+      tile.pw = Math.min(terrainTiles.pw, Math.ceil((span.x1 - span.x0) * dpr));
+      perfCount("draw.tilePaints");
+    }
+
+    function terrainTile(c){
+      var tt = terrainTiles;
+      var tile = tt.tiles[c];
+      if(!tile){
+        var canvas = tt.pool.pop() || makeLayerCanvas(tt.pw, tt.ph);
+        tile = tt.tiles[c] = { canvas: canvas, ctx: canvas.getContext("2d"), version: -1, pw: 0 };
+        paintTile(tile, c);
+        return tile;
       }
-      ctx.strokeStyle = rgba(c1, 0.22);
-      ctx.lineWidth = 2;
-      ctx.stroke();
+      var dirty = terrainDirtySince(tile.version);
+      if(dirty && dirty.k1 >= (c << RUN_CHUNK_SHIFT) - 1 && dirty.k0 <= ((c + 1) << RUN_CHUNK_SHIFT)){
+        paintTile(tile, c);
+      }else{
+        tile.version = state.heightfield.version;
+      }
+      return tile;
+    }
+
+    function drawTerrain(){
+      var view = state.view, hf = state.heightfield, tt = terrainTiles;
+      var dpr = view.dpr || 1;
+      var chunkW = RUN_CHUNK / hf.cscale;
+      var key;
+
+      if(tt.terrain !== state.terrain || tt.palette !== palette.version || tt.dpr !== dpr || tt.ph !== Math.floor(view.h * dpr)){
+        // start over: tiles and pooled canvases no longer fit
+        tt.tiles = {};
+        tt.pool.length = 0;
+        tt.terrain = state.terrain;
+        tt.palette = palette.version;
+        tt.dpr = dpr;
+        tt.pw = Math.ceil((chunkW + 2) * dpr);
+        tt.ph = Math.floor(view.h * dpr);
+      }
+
+      var last = state.terrain.chunks.length - 1;
+      var c0 = clamp(Math.floor(view.cam.x * hf.cscale) >> RUN_CHUNK_SHIFT, 0, last);
+      var c1 = clamp(Math.floor((view.cam.x + view.cam.w) * hf.cscale) >> RUN_CHUNK_SHIFT, 0, last);
+      for(key in tt.tiles){
+        if(key < c0 - 1 || key > c1 + 1){
+          tt.pool.push(tt.tiles[key].canvas);
+          delete tt.tiles[key];
+        }
+      }
+      for(var c=c0; c<=c1; c++){
+        var tile = terrainTile(c);
+        var x0 = tileSpan(c).x0;
+        ctx.drawImage(tile.canvas, 0, 0, tile.pw, tt.ph, x0, 0, tile.pw / dpr, tt.ph / dpr);
+        perfCount("draw.tiles");
+      }
+    }
+
+    // Camera: follows the projectile, then the explosion, then the worm to
+    // move; only wide (scrolling) maps move it.
+    var CAMERA_FOLLOW = 6;  // 1/s: fraction of the distance closed per second ~ 1 - e^-k
+
+    function cameraGoal(){
+      var cam = state.view.cam;
+      var x;
+      if(state.projectile) x = state.projectile.x;
+      else if(state.fx.explosion) x = state.fx.explosion.x;
+      else x = state.players[state.active].x * state.view.w;
+      return clamp(x - cam.w / 2, 0, Math.max(0, state.view.w - cam.w));
+    }
+
+    function updateCamera(dt, snap){
+      var cam = state.view.cam;
+      if(!cam.scroll) return;
+      var goal = cameraGoal();
+      cam.x = snap ? goal : cam.x + (goal - cam.x) * (1 - Math.exp(-CAMERA_FOLLOW * dt));
     }
 
     function drawWorm(pl){
       var w = state.view.w;
-      var px = pl.x * w;
-      var py = pl.y;
+      var px = lerp(pl.prevX, pl.x, state.renderAlpha) * w;
+      var py = lerp(pl.prevY, pl.y, state.renderAlpha);
 
-      var col = (pl.id === 1) ? palette.primary : palette.primary2;
+      var col = (pl.team === 0) ? palette.primary : palette.primary2;
 
       ctx.beginPath();
       ctx.arc(px, py, pl.r, 0, Math.PI*2);
@@ -1282,8 +2026,9 @@ HTML = r"""<!doctype html>
       var p = state.projectile;
       if(!p) return;
 
+      var a = state.renderAlpha;
       ctx.beginPath();
-      ctx.arc(p.x, p.y, p.r, 0, Math.PI*2);
+      ctx.arc(lerp(p.prevX, p.x, a), lerp(p.prevY, p.y, a), p.r, 0, Math.PI*2);
       ctx.fillStyle = rgba(palette.primary, 0.35);
       ctx.fill();
 
@@ -1311,69 +2056,137 @@ HTML = r"""<!doctype html>
       ctx.fill();
     }
 
-    function drawAimPreview(){
-      if(state.inputLocked) return;
-      if(state.phase !== "aim") return;
-
-      var shooter = state.players[state.active];
-      if(!shooter || shooter.hp <= 0) return;
-
-      var w = state.view.w;
+    // Aim preview. The fixed-step flight (v += a*h; x += v*h) has the closed
+    // form x_n = x_0 + n*h*v_0 + a*h^2*n*(n+1)/2, so dots are evaluated
+    // directly at whole physics steps and match the real shot. The dots are
+    // cached until angle, power, wind, weapon, shooter or terrain change. The
+    // ground is probed every AIM_PREVIEW_PROBE steps; the landing step inside
+    // the first probe interval that ends in contact with the ground is found
+    // by bisection, the contact point inside it by terrainSweep.
+    var AIM_PREVIEW_DOTS = 26;
+    var AIM_PREVIEW_STRIDE = 24;      // physics steps between dots (0.1 s)
+    var AIM_PREVIEW_PROBE = 6;        // physics steps between ground probes
+    var AIM_PREVIEW_BISECT = true;    // false: stop at the last dot above ground
+
+    var aimPreview = {
+      angle: NaN, power: NaN, wind: NaN, slot: 0, sx: NaN, sy: NaN, hfVersion: -1, w: 0,
+      xs: new Float64Array(AIM_PREVIEW_DOTS), ys: new Float64Array(AIM_PREVIEW_DOTS), n: 0,
+      land: false, lx: 0, ly: 0,
+      styleFor: -1, styleVersion: -1, style: ""
+    };
 
-      var dir = (shooter.id === 1) ? 1 : -1;
-      var angleDeg = state.angleDeg;
-      if(dir === -1) angleDeg = 180 - angleDeg;
+    function aimPreviewUpdate(shooter){
+      var p = aimPreview;
+      var hf = state.heightfield;
+      var w = state.view.w, h = state.view.h;
+      if(p.angle === state.angleDeg && p.power === state.power && p.wind === state.wind &&
+         p.slot === state.weaponSlot && p.sx === shooter.x && p.sy === shooter.y &&
+         p.hfVersion === hf.version && p.w === w) return p;
+      p.angle = state.angleDeg; p.power = state.power; p.wind = state.wind;
+      p.slot = state.weaponSlot; p.sx = shooter.x; p.sy = shooter.y;
+      p.hfVersion = hf.version; p.w = w;
+
+      // launch exactly like fire()
+      var dir = (shooter.team === 0) ? 1 : -1;
+      var angleDeg = dir === -1 ? 180 - state.angleDeg : state.angleDeg;
       var angle = angleDeg * Math.PI / 180;
       var speed = 120 + (state.power / 100) * 520;
+      var x0 = shooter.x * w + dir * (shooter.r + 2);
+      var y0 = shooter.y - shooter.r * 0.15 - shooter.r * 0.1;
+      var dt = PHYSICS_DT;
+      var vx = Math.cos(angle) * speed * dt, vy = -Math.sin(angle) * speed * dt;
+      var ax = state.wind * dt * dt * 0.5, ay = state.gravity * dt * dt * 0.5;
+      var r = state.weapon.projR;
+
+      function below(n){
+        return terrainTouch(x0 + n * vx + ax * n * (n + 1), y0 + n * vy + ay * n * (n + 1), r);
+      }
 
-      var x = shooter.x * w + dir * (shooter.r + 2);
-      var y = shooter.y - shooter.r * 0.15;
-
-      var vx = Math.cos(angle) * speed;
-      var vy = -Math.sin(angle) * speed;
+      p.n = 0;
+      p.land = false;
+      var prev = 0;
+      for(var n=AIM_PREVIEW_PROBE; n<=AIM_PREVIEW_DOTS * AIM_PREVIEW_STRIDE; n+=AIM_PREVIEW_PROBE){
+        var px = x0 + n * vx + ax * n * (n + 1), py = y0 + n * vy + ay * n * (n + 1);
+        if(px < -40 || px > w + 40 || py > h + 40) break;
+        if(below(n)){
+          if(AIM_PREVIEW_BISECT){
+            var lo = prev, hi = n;
+            while(hi - lo > 1){
+              var mid = (lo + hi) >> 1;
+              if(below(mid)) hi = mid; else lo = mid;
+            }
+            // contact inside step hi, as projectileSubstep's sweep finds it
+            var xa = x0 + lo * vx + ax * lo * (lo + 1), ya = y0 + lo * vy + ay * lo * (lo + 1);
+            var xb = x0 + hi * vx + ax * hi * (hi + 1), yb = y0 + hi * vy + ay * hi * (hi + 1);
+            var t = Math.max(0, terrainSweep(xa, ya, xb, yb, r));
+            p.lx = xa + (xb - xa) * t;
+            p.ly = ya + (yb - ya) * t;
+            p.land = true;
+          }
+          break;
+        }
+        if(n % AIM_PREVIEW_STRIDE === 0){
+          p.xs[p.n] = px;
+          p.ys[p.n] = py;
+          p.n += 1;
+        }
+        prev = n;
+      }
+      return p;
+    }
 
-      var points = 26;
-      var stepT = 0.10;
-      var px = x, py = y, pvx = vx, pvy = vy;
+    function drawAimPreview(){
+      if(state.inputLocked) return;
+      if(state.phase !== "aim") return;
 
-      ctx.save();
-      ctx.lineWidth = 0;
-      for(var i=0;i<points;i++){
-        pvx += state.wind * stepT;
-        pvy += state.gravity * stepT;
-        px += pvx * stepT;
-        py += pvy * stepT;
+      var shooter = state.players[state.active];
+      if(!shooter || shooter.hp <= 0) return;
 
-        if(px < -40 || px > state.view.w + 40 || py > state.view.h + 40) break;
+      var p = aimPreviewUpdate(shooter);
+      if(p.styleFor !== shooter.id || p.styleVersion !== palette.version){
+        p.styleFor = shooter.id;
+        p.styleVersion = palette.version;
+        p.style = rgba((shooter.team === 0) ? palette.primary : palette.primary2, 0.55);
+      }
 
-        var gy = terrainYAt(px);
-        if(py >= gy) break;
+      // all dots in one path, one fill
+      ctx.beginPath();
+      for(var i=0;i<p.n;i++){
+        ctx.moveTo(p.xs[i] + 2.1, p.ys[i]);
+        ctx.arc(p.xs[i], p.ys[i], 2.1, 0, Math.PI*2);
+      }
+      ctx.fillStyle = p.style;
+      ctx.fill();
 
+      if(p.land){
         ctx.beginPath();
-        ctx.arc(px, py, 2.1, 0, Math.PI*2);
-        ctx.fillStyle = rgba((shooter.id === 1) ? palette.primary : palette.primary2, 0.55);
-        ctx.fill();
+        ctx.arc(p.lx, p.ly, 5, 0, Math.PI*2);
+        ctx.strokeStyle = p.style;
+        ctx.lineWidth = 2;
+        ctx.stroke();
       }
-      ctx.restore();
 
       // aim line
-      var ax = x;
-      var ay = y;
+      var dir = (shooter.team === 0) ? 1 : -1;
+      var angle = state.angleDeg * Math.PI / 180;
+      var ax = shooter.x * state.view.w + dir * (shooter.r + 2);
+      var ay = shooter.y - shooter.r * 0.15;
       var lx = ax + Math.cos(angle) * 34 * dir;
       var ly = ay - Math.sin(angle) * 34;
 
       ctx.beginPath();
       ctx.moveTo(ax, ay);
       ctx.lineTo(lx, ly);
-      ctx.strokeStyle = rgba((shooter.id === 1) ? palette.primary : palette.primary2, 0.55);
+      ctx.strokeStyle = p.style;
       ctx.lineWidth = 3;
       ctx.stroke();
     }
 
+    // Drawn in screen space (camera at 0), over the visible width.
     function drawGameOverOverlay(){
       if(state.phase !== "gameover") return;
 
-      var w = state.view.w;
+      var w = state.view.cam.w;
       var h = state.view.h;
 
       ctx.save();
@@ -1381,7 +2194,7 @@ HTML = r"""<!doctype html>
       ctx.fillRect(0, 0, w, h);
 
       var text = "Game Over";
-      var sub = (state.winner === 1) ? "Player 1 gewinnt" : (state.winner === 2 ? "Player 2 gewinnt" : "Unentschieden");
+      var sub = state.winner ? teamName(state.winner - 1) + " gewinnt" : "Unentschieden";
 
       ctx.fillStyle = palette.text;
       ctx.textAlign = "center";
@@ -1393,67 +2206,296 @@ HTML = r"""<!doctype html>
       ctx.restore();
     }
 
+    var WORM_CULL_MARGIN = 48;  // px beyond the grid extent: marker, knockback since the last step
+
     function render(){
       if(!state) return;
 
-      var w = state.view.w;
-      var h = state.view.h;
+      var view = state.view;
+      var cam = view.cam;
+      var h = view.h;
 
-      // clear
-      ctx.clearRect(0, 0, w, h);
+      // clear (whole backing store: online worlds are letterboxed)
+      ctx.save();
+      ctx.setTransform(1, 0, 0, 1, 0, 0);
+      ctx.clearRect(0, 0, canvas.width, canvas.height);
+      ctx.restore();
 
-      // subtle canvas haze
+      // subtle canvas haze (screen space)
+      cam.x = Math.round(cam.x * view.dpr) / view.dpr;  // whole device pixels: no tile seams
+      var camX = cam.x;
+      cam.x = 0;
+      applyCamera(view);
       var g = ctx.createLinearGradient(0, 0, 0, h);
       g.addColorStop(0, rgba(palette.primary, 0.08));
       g.addColorStop(1, rgba(palette.primary2, 0.05));
       ctx.fillStyle = g;
-      ctx.fillRect(0, 0, w, h);
+      ctx.fillRect(0, 0, cam.w, h);
 
+      // world space: only what intersects the camera
+      cam.x = camX;
+      applyCamera(view);
       drawTerrain();
       drawAimPreview();
 
-      for(var i=0;i<state.players.length;i++){
-        drawWorm(state.players[i]);
+      var near = gridQuery(state.grid, cam.x - WORM_CULL_MARGIN, cam.x + cam.w + WORM_CULL_MARGIN);
+      for(var i=0;i<near.length;i++){
+        drawWorm(state.players[near[i]]);
+        perfCount("draw.worms");
       }
 
       drawProjectile();
       drawExplosionFx();
+
+      // back to screen space for overlays
+      cam.x = 0;
+      applyCamera(view);
+      cam.x = camX;
       drawGameOverOverlay();
     }
 
-    var lastT = nowMs();
-    function loop(){
-      var t = nowMs();
-      var dt = (t - lastT) / 1000;
-      lastT = t;
-      dt = clamp(dt, 0, 0.033);
+    // --- Profiling (opt-in via ?perf=1) ------------------------------------
+    // Per-phase timings go into log-scale histograms (bucket k covers up to
+    // PERF_BASE_MS * PERF_FACTOR^k ms, the last bucket is overflow). The
+    // overlay shows p50/p95/p99; histograms are POSTed to /api/perf as deltas.
+    var PERF_BUCKETS = {{ perf_buckets }};
+    var PERF_BASE_MS = {{ perf_base_ms }};
+    var PERF_FACTOR = {{ perf_factor }};
+    var PERF_FLUSH_MS = 15000;
+
+    var Perf = {
+      on: /(?:^|[?&])perf=1(?:&|$)/.test(window.location.search || ""),
+      hists: {},
+      counts: {},
+      lastFlush: 0,
+      lastOverlay: 0,
+      overlayLines: []
+    };
 
-      update(dt);
-      render();
+    function perfBucket(ms){
+      if(!(ms > PERF_BASE_MS)) return 0;
+      var k = Math.ceil(Math.log(ms / PERF_BASE_MS) / Math.log(PERF_FACTOR));
+      return Math.min(PERF_BUCKETS - 1, k);
+    }
 
-      requestAnimationFrame(loop);
+    function perfRecord(name, ms){
+      var hist = Perf.hists[name];
+      if(!hist){
+        hist = Perf.hists[name] = { counts: new Uint32Array(PERF_BUCKETS), n: 0 };
+      }
+      hist.counts[perfBucket(ms)] += 1;
+      hist.n += 1;
     }
 
-    function preventScrollKeys(e){
-      // prevent scroll for game keys
-      var code = e.code;
-      if(
-        keyIn(code, KEYS.UP) || keyIn(code, KEYS.DOWN) ||
-        keyIn(code, KEYS.LEFT) || keyIn(code, KEYS.RIGHT) ||
-        keyIn(code, KEYS.FIRE)
-      ){
-        e.preventDefault();
+    function perfQuantile(hist, q){
+      var want = q * hist.n;
+      var acc = 0;
+      for(var k=0;k<PERF_BUCKETS;k++){
+        acc += hist.counts[k];
+        if(acc >= want && acc > 0) return PERF_BASE_MS * Math.pow(PERF_FACTOR, k);
       }
+      return 0;
     }
 
-    function onKeyDown(e){
-      preventScrollKeys(e);
-      if(!state) return;
+    // Event counters (e.g. HUD DOM writes); shown per second in the overlay.
+    function perfCount(name){
+      if(!Perf.on) return;
+      Perf.counts[name] = (Perf.counts[name] || 0) + 1;
+    }
 
+    // Replace fn with a timed wrapper; only used when profiling is on.
+    function perfWrap(name, fn){
+      return function(){
+        var t0 = nowMs();
+        try{
+          return fn.apply(this, arguments);
+        }finally{
+          perfRecord(name, nowMs() - t0);
+        }
+      };
+    }
+
+    function perfDeviceKey(){
+      var coarse = false;
+      try{ coarse = window.matchMedia("(pointer: coarse)").matches; }catch(_e){}
+      return [
+        coarse ? "touch" : "desktop",
+        (navigator.hardwareConcurrency || 0) + "c",
+        (window.devicePixelRatio || 1).toFixed(1) + "x"
+      ].join("/");
+    }
+
+    function perfFlush(useBeacon){
+      var phases = {};
+      var any = false;
+      for(var name in Perf.hists){
+        var hist = Perf.hists[name];
+        if(!hist.n) continue;
+        phases[name] = Array.prototype.slice.call(hist.counts);
+        any = true;
+      }
+      if(!any) return;
+      var body = JSON.stringify({ v: 1, device: perfDeviceKey(), phases: phases });
+      Perf.hists = {};
+
+      try{
+        if(useBeacon && navigator.sendBeacon){
+          navigator.sendBeacon("/api/perf", new Blob([body], { type: "application/json" }));
+        }else if(window.fetch){
+          window.fetch("/api/perf", {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: body,
+            keepalive: true
+          }).catch(function(){});
+        }
+      }catch(_e){}
+    }
+
+    function perfTick(t){
+      if(t - Perf.lastOverlay > 500){
+        var secs = Perf.lastOverlay ? (t - Perf.lastOverlay) / 1000 : 0;
+        Perf.lastOverlay = t;
+        var lines = [];
+        for(var cname in Perf.counts){
+          lines.push(cname + "  " + (secs ? (Perf.counts[cname] / secs).toFixed(1) : "0") + " /s");
+          Perf.counts[cname] = 0;
+        }
+        for(var name in Perf.hists){
+          var hist = Perf.hists[name];
+          lines.push(
+            name + "  p50 " + perfQuantile(hist, 0.50).toFixed(2) +
+            "  p95 " + perfQuantile(hist, 0.95).toFixed(2) +
+            "  p99 " + perfQuantile(hist, 0.99).toFixed(2) + " ms"
+          );
+        }
+        Perf.overlayLines = lines;
+      }
+      if(!Perf.lastFlush) Perf.lastFlush = t;
+      if(t - Perf.lastFlush > PERF_FLUSH_MS){
+        Perf.lastFlush = t;
+        perfFlush(false);
+      }
+    }
+
+    function drawPerfOverlay(){
+      var lines = Perf.overlayLines;
+      if(!lines.length) return;
+      ctx.save();
+      ctx.font = "600 11px ui-monospace, SFMono-Regular, Menlo, Consolas, monospace";
+      ctx.textAlign = "left";
+      ctx.textBaseline = "top";
+      ctx.fillStyle = "rgba(0,0,0,0.55)";
+      ctx.fillRect(6, 6, 300, lines.length * 14 + 8);
+      ctx.fillStyle = "#e6eaf2";
+      for(var i=0;i<lines.length;i++){
+        ctx.fillText(lines[i], 12, 10 + i * 14);
+      }
+      ctx.restore();
+    }
+
+    function enablePerf(){
+      update = perfWrap("update", update);
+      render = perfWrap("render", render);
+      updateHud = perfWrap("updateHud", updateHud);
+      projectileSubstep = perfWrap("physics.substep", projectileSubstep);
+      updateWormPhysics = perfWrap("physics.worms", updateWormPhysics);
+      drawTerrain = perfWrap("draw.terrain", drawTerrain);
+      drawAimPreview = perfWrap("draw.aim", drawAimPreview);
+      drawWorm = perfWrap("draw.worm", drawWorm);
+      drawProjectile = perfWrap("draw.projectile", drawProjectile);
+      drawExplosionFx = perfWrap("draw.explosion", drawExplosionFx);
+      drawGameOverOverlay = perfWrap("draw.gameover", drawGameOverOverlay);
+
+      document.addEventListener("visibilitychange", function(){
+        if(document.visibilityState === "hidden") perfFlush(true);
+      });
+    }
+
+    // Fixed-timestep simulation: physics always advances in PHYSICS_DT steps,
+    // independent of the display refresh rate, so a shot lands the same at
+    // 60 Hz, 120 Hz or under jank. Rendering interpolates between the last two
+    // steps; MAX_STEPS_PER_FRAME bounds catch-up work (no spiral of death).
+    var PHYSICS_DT = 1 / 240;
+    var MAX_SUBSTEP = 1 / 240;
+    var MAX_STEPS_PER_FRAME = 16;
+
+    function snapshotPrev(){
+      for(var i=0;i<state.players.length;i++){
+        state.players[i].prevX = state.players[i].x;
+        state.players[i].prevY = state.players[i].y;
+      }
+      var p = state.projectile;
+      if(p){
+        p.prevX = p.x;
+        p.prevY = p.y;
+      }
+    }
+
+    function advance(frameDt){
+      state.acc += frameDt;
+      var steps = 0;
+      while(state.acc >= PHYSICS_DT && steps < MAX_STEPS_PER_FRAME){
+        snapshotPrev();
+        if(Replay.data) replayDrive();
+        else if(Cpu.on) cpuDrive();
+        update(PHYSICS_DT);
+        state.acc -= PHYSICS_DT;
+        steps += 1;
+      }
+      // still behind after the cap: drop the backlog instead of catching up
+      if(state.acc >= PHYSICS_DT) state.acc = 0;
+      state.renderAlpha = state.acc / PHYSICS_DT;
+      updateHud();
+    }
+
+    var lastT = nowMs();
+    function loop(){
+      var t = nowMs();
+      var dt = (t - lastT) / 1000;
+      lastT = t;
+      dt = clamp(dt, 0, 0.25);
+
+      if(state){
+        advance(dt);
+        updateCamera(dt, false);
+      }
+      render();
+
+      if(Perf.on){
+        perfRecord("frame", nowMs() - t);
+        perfTick(t);
+        drawPerfOverlay();
+      }
+
+      requestAnimationFrame(loop);
+    }
+
+    function preventScrollKeys(e){
+      // prevent scroll for game keys
       var code = e.code;
+      if(
+        keyIn(code, KEYS.UP) || keyIn(code, KEYS.DOWN) ||
+        keyIn(code, KEYS.LEFT) || keyIn(code, KEYS.RIGHT) ||
+        keyIn(code, KEYS.FIRE)
+      ){
+        e.preventDefault();
+      }
+    }
+
+    function onKeyDown(e){
+      preventScrollKeys(e);
+      if(!state) return;
+
+      var code = e.code;
+
+      if(Replay.on){
+        onReplayKey(code);
+        return;
+      }
 
       if(keyIn(code, KEYS.RESTART)){
-        startGame();
+        if(!Net.on) startGame();
         return;
       }
 
@@ -1461,27 +2503,35 @@ HTML = r"""<!doctype html>
         return;
       }
 
-      if(keyIn(code, KEYS.W1)) { setWeapon(1); return; }
-      if(keyIn(code, KEYS.W2)) { setWeapon(2); return; }
-      if(keyIn(code, KEYS.W3)) { setWeapon(3); return; }
+      // online: only the seated, active player controls the worm
+      if(Net.on && (state.active !== Net.seat || state.phase !== "aim")) return;
+      if(cpuToMove()) return;
+
+      if(keyIn(code, KEYS.W1)) { setWeapon(1); netSendAim(); return; }
+      if(keyIn(code, KEYS.W2)) { setWeapon(2); netSendAim(); return; }
+      if(keyIn(code, KEYS.W3)) { setWeapon(3); netSendAim(); return; }
 
       if(state.inputLocked) return;
       if(state.phase !== "aim") return;
 
       if(keyIn(code, KEYS.UP)){
         state.angleDeg = clamp(state.angleDeg + 2, 10, 80);
+        netSendAim();
         return;
       }
       if(keyIn(code, KEYS.DOWN)){
         state.angleDeg = clamp(state.angleDeg - 2, 10, 80);
+        netSendAim();
         return;
       }
       if(keyIn(code, KEYS.RIGHT)){
         state.power = clamp(state.power + 3, 10, 100);
+        netSendAim();
         return;
       }
       if(keyIn(code, KEYS.LEFT)){
         state.power = clamp(state.power - 3, 10, 100);
+        netSendAim();
         return;
       }
        if(keyIn(code, KEYS.FIRE)){
@@ -1494,7 +2544,8 @@ HTML = r"""<!doctype html>
     }
 
     function onKeyUp(e){
-      if(!state || state.inputLocked || state.phase !== "aim") return;
+      if(!state || Replay.on || state.inputLocked || state.phase !== "aim") return;
+      if(cpuToMove()) return;
       var code = e.code;
       if(keyIn(code, KEYS.FIRE)){
         if(state.isCharging){
@@ -1509,22 +2560,754 @@ HTML = r"""<!doctype html>
       window.clearTimeout(resizeTimer);
       resizeTimer = window.setTimeout(function(){
         if(!state) return;
+        var world = Net.on ? Net.world : (Replay.on ? Replay.world : null);
+        if(world){
+          // fixed online/replay world: only the view transform changes
+          state.view = setCanvasSize(world);
+          updateCamera(0, true);
+          return;
+        }
         // safest: restart on resize to keep terrain + physics consistent
         startGame();
         showToast("Neu gestartet (Resize).");
       }, 200);
     }
 
+    // --- Online matches -----------------------------------------------------
+    // ?room=<id> joins a server-authoritative match over WebSocket. The
+    // client only sends aim/fire; the server simulates every shot and sends
+    // one "shot" delta that is replayed here (path, crater, hp, next turn).
+    var roomMatch = /(?:^|[?&])room=([A-Za-z0-9_-]{1,32})(?:&|$)/.exec(window.location.search || "");
+    var Net = {
+      on: !!roomMatch, room: roomMatch ? roomMatch[1] : null, ws: null, seat: -1, world: null,
+      binary: typeof DataView !== "undefined" && !/(?:^|[?&])wire=json(?:&|$)/.test(window.location.search || "")
+    };
+
+    // Binary wire format, mirror of online/wire.py: <version><type> header,
+    // fixed little-endian layouts, the crater history in "hello", path
+    // points as int16 quarter pixels. Decodes to the JSON message shape.
+    var WIRE_VERSION = {{ wire_version }};
+    var WIRE_PATH_SCALE = {{ wire_path_scale }};
+    var WIRE_TYPES = { hello: 1, aim: 2, fire: 3, shot: 4, error: 5, sync: 6 };
+    var WIRE_NAMES = ["", "hello", "aim", "fire", "shot", "error", "sync"];
+
+    // Client -> server frames: aim, fire, sync.
+    function wireEncode(msg){
+      var code = WIRE_TYPES[msg.t];
+      var hasBody = code === 2 || code === 3;
+      var dv = new DataView(new ArrayBuffer(hasBody ? 12 : 2));
+      dv.setUint8(0, WIRE_VERSION);
+      dv.setUint8(1, code);
+      if(hasBody){
+        dv.setInt8(2, -1);
+        dv.setFloat32(3, msg.a, true);
+        dv.setFloat32(7, msg.p, true);
+        dv.setUint8(11, msg.w);
+      }
+      return dv.buffer;
+    }
+
+    function wireDecode(buf){
+      var dv = new DataView(buf);
+      if(dv.getUint8(0) !== WIRE_VERSION) return null;
+      var t = WIRE_NAMES[dv.getUint8(1)];
+      var off = 2;
+      var i, n;
+
+      function players(msg){
+        n = dv.getUint8(off); off += 1;
+        msg.hp = []; msg.ys = [];
+        for(i=0;i<n;i++){
+          msg.hp.push(dv.getUint16(off, true));
+          msg.ys.push(dv.getFloat32(off + 2, true));
+          off += 6;
+        }
+      }
+      function winner(v){ return v < 0 ? null : v; }
+
+      if(t === "shot"){
+        var shot = {
+          t: t, turn: dv.getUint32(off, true), seat: dv.getUint8(off + 4), w: dv.getUint8(off + 5),
+          a: dv.getFloat32(off + 6, true), p: dv.getFloat32(off + 10, true), stride: dv.getUint8(off + 14),
+          winner: winner(dv.getInt8(off + 15)),
+          next: { turn: dv.getUint32(off + 16, true), active: dv.getUint8(off + 20), wind: dv.getFloat32(off + 21, true) },
+          boom: null, hits: []
+        };
+        var hasBoom = dv.getUint8(off + 25);
+        off += 26;
+        if(hasBoom){
+          shot.boom = [dv.getFloat64(off, true), dv.getFloat64(off + 8, true), dv.getUint16(off + 16, true)];
+          n = dv.getUint8(off + 18); off += 19;
+          for(i=0;i<n;i++){
+            shot.hits.push([dv.getUint8(off), dv.getUint16(off + 1, true)]);
+            off += 3;
+          }
+        }
+        players(shot);
+        n = dv.getUint16(off, true); off += 2;
+        shot.path = new Float32Array(2 * n);
+        for(i=0;i<2*n;i++){
+          shot.path[i] = dv.getInt16(off, true) / WIRE_PATH_SCALE;
+          off += 2;
+        }
+        return shot;
+      }
+      if(t === "aim" || t === "fire"){
+        return { t: t, seat: dv.getInt8(off), a: dv.getFloat32(off + 1, true), p: dv.getFloat32(off + 5, true), w: dv.getUint8(off + 9) };
+      }
+      if(t === "hello"){
+        var hello = {
+          t: t, seat: dv.getInt8(off), seed: dv.getUint32(off + 1, true),
+          w: dv.getUint16(off + 5, true), h: dv.getUint16(off + 7, true), turn: dv.getUint32(off + 9, true),
+          active: dv.getUint8(off + 13), wind: dv.getFloat32(off + 14, true), slot: dv.getUint8(off + 18),
+          a: dv.getFloat32(off + 19, true), p: dv.getFloat32(off + 23, true), winner: winner(dv.getInt8(off + 27))
+        };
+        off += 28;
+        players(hello);
+        n = dv.getUint16(off, true); off += 2;
+        hello.craters = new Array(n);
+        for(i=0;i<n;i++){
+          hello.craters[i] = [dv.getFloat64(off, true), dv.getFloat64(off + 8, true), dv.getUint16(off + 16, true)];
+          off += 18;
+        }
+        return hello;
+      }
+      if(t === "error"){
+        n = dv.getUint8(off);
+        var code = "";
+        for(i=0;i<n;i++) code += String.fromCharCode(dv.getUint8(off + 1 + i));
+        return { t: t, error: code };
+      }
+      return t ? { t: t } : null;
+    }
+
+    function netSend(msg){
+      if(!Net.ws || Net.ws.readyState !== 1) return false;
+      Net.ws.send(Net.binary ? wireEncode(msg) : JSON.stringify(msg));
+      return true;
+    }
+
+    function netSendAim(){
+      if(!Net.on || !state) return;
+      netSend({ t: "aim", a: state.angleDeg, p: Math.round(state.power), w: state.weaponSlot });
+    }
+
+    function netFire(){
+      state.inputLocked = true;
+      state.phase = "remote";
+      if(!netSend({ t: "fire", a: state.angleDeg, p: state.power, w: state.weaponSlot })){
+        state.inputLocked = false;
+        state.phase = "aim";
+        showToast("Keine Verbindung zum Server.");
+      }
+    }
+
+    function netApplyTurn(next){
+      state.turn = next.turn;
+      state.active = next.active;
+      state.wind = next.wind;
+      state.angleDeg = 45;
+      state.power = 62;
+      state.projectile = null;
+      state.phase = "aim";
+      state.inputLocked = false;
+    }
+
+    function netApplyPlayers(hp, ys){
+      for(var i=0;i<state.players.length;i++){
+        var pl = state.players[i];
+        pl.hp = hp[i];
+        pl.y = ys[i];
+        pl.prevY = ys[i];
+        pl.vy = 0;
+        pl.falling = false;
+        pl.alive = pl.hp > 0;
+      }
+      reindexWorms();
+    }
+
+    function netGameOver(winner){
+      state.phase = "gameover";
+      state.inputLocked = true;
+      state.winner = winner;
+      showToast(winner ? ("Game Over: " + teamName(winner - 1) + " gewinnt!") : "Game Over: Unentschieden");
+    }
+
+    function netTurnToast(){
+      var mine = state.active === Net.seat;
+      showToast(state.players[state.active].name + " am Zug" + (mine ? " (du)" : ""));
+    }
+
+    function netOnHello(msg){
+      Net.seat = msg.seat;
+      Net.world = { w: msg.w, h: msg.h };
+      startGame(msg.seed, Net.world);
+      for(var i=0;i<msg.craters.length;i++){
+        var c = msg.craters[i];
+        applyCrater(c[0], c[1], c[2]);
+      }
+      setWeapon(msg.slot);
+      netApplyTurn({ turn: msg.turn, active: msg.active, wind: msg.wind });
+      state.angleDeg = msg.a;
+      state.power = msg.p;
+      netApplyPlayers(msg.hp, msg.ys);
+      if(msg.winner !== null){
+        netGameOver(msg.winner);
+        return;
+      }
+      showToast(Net.seat >= 0 ? ("Online: du bist " + teamName(Net.seat)) : "Online: Zuschauer");
+    }
+
+    function netOnShot(msg){
+      setWeapon(msg.w);
+      state.angleDeg = msg.a;
+      state.power = msg.p;
+      state.isCharging = false;
+      state.inputLocked = true;
+      state.phase = "remoteShot";
+      state.remoteShot = { msg: msg, k: 0 };
+      var path = msg.path;
+      state.projectile = path.length ? {
+        x: path[0], y: path[1], prevX: path[0], prevY: path[1], r: state.weapon.projR
+      } : null;
+    }
+
+    // Advance the server-simulated projectile by one physics step.
+    function updateRemoteShot(_dt){
+      var rs = state.remoteShot;
+      var msg = rs.msg;
+      var path = msg.path;
+      rs.k += 1;
+      var idx = Math.floor(rs.k / msg.stride);
+      if(idx * 2 + 1 < path.length){
+        var t = (rs.k % msg.stride) / msg.stride;
+        var j = idx * 2;
+        var nx = j + 3 < path.length ? path[j + 2] : path[j];
+        var ny = j + 3 < path.length ? path[j + 3] : path[j + 1];
+        state.projectile.x = lerp(path[j], nx, t);
+        state.projectile.y = lerp(path[j + 1], ny, t);
+        return;
+      }
+
+      state.remoteShot = null;
+      state.projectile = null;
+      if(msg.boom){
+        applyCrater(msg.boom[0], msg.boom[1], msg.boom[2]);
+        state.fx.explosion = { x: msg.boom[0], y: msg.boom[1], r: msg.boom[2], started: nowMs(), dur: 360 };
+        if(msg.hits.length){
+          showToast("Treffer! " + msg.hits.map(function(h){ return playerName(h[0]) + " -" + h[1]; }).join(" · "));
+        }else{
+          showToast("Boom!");
+        }
+      }else{
+        showToast("Verfehlt.");
+      }
+      netApplyPlayers(msg.hp, msg.ys);
+      if(msg.winner !== null){
+        netGameOver(msg.winner);
+        return;
+      }
+      netApplyTurn(msg.next);
+    }
+
+    function netOnMessage(ev){
+      var msg = null;
+      try{
+        msg = typeof ev.data === "string" ? JSON.parse(ev.data) : wireDecode(ev.data);
+      }catch(_e){ return; }
+      if(!msg) return;
+
+      if(msg.t === "hello"){
+        netOnHello(msg);
+      }else if(!state){
+        return;
+      }else if(msg.t === "aim"){
+        if(msg.seat !== Net.seat){
+          setWeapon(msg.w);
+          state.angleDeg = msg.a;
+          state.power = msg.p;
+        }
+      }else if(msg.t === "shot"){
+        netOnShot(msg);
+      }else if(msg.t === "error"){
+        if(state.phase === "remote"){
+          state.phase = "aim";
+          state.inputLocked = false;
+        }
+        showToast("Server: " + msg.error);
+      }
+    }
+
+    function netConnect(){
+      var proto = window.location.protocol === "https:" ? "wss:" : "ws:";
+      var url = proto + "//" + window.location.host + "/ws/rooms/" + encodeURIComponent(Net.room) +
+        (Net.binary ? "?fmt=bin" : "");
+      showToast("Verbinde mit Match " + Net.room + "…");
+      try{
+        Net.ws = new WebSocket(url);
+      }catch(_e){
+        showFallback("Online-Match nicht verfügbar", "WebSocket-Verbindung fehlgeschlagen.");
+        return;
+      }
+      Net.ws.binaryType = "arraybuffer";
+      Net.ws.onmessage = netOnMessage;
+      Net.ws.onclose = function(){
+        showToast("Verbindung zum Match getrennt.");
+        if(state) state.inputLocked = true;
+      };
+    }
+
+    function createOnlineMatch(){
+      if(!window.fetch) return;
+      window.fetch("/api/rooms", { method: "POST" })
+        .then(function(r){ return r.json(); })
+        .then(function(data){
+          if(!data || !data.ok) throw new Error("room");
+          window.location.search = "?room=" + encodeURIComponent(data.room);
+        })
+        .catch(function(){ showToast("Online-Match konnte nicht erstellt werden."); });
+    }
+
+    // --- Replays -------------------------------------------------------------
+    // Every local match records seed, world size and per-shot inputs in
+    // state.record (see engine/replay.py). ?replay=<id> plays a stored
+    // replay; jumping to a turn restarts from the seed and re-simulates
+    // headlessly (no rendering, no toasts) up to that turn.
+    var REPLAY_AIM_HOLD = 150;                 // real-time playback: idle aim shown for 0.6 s
+    var REPLAY_SEEK_MAX_STEPS = 240 * 60 * 30; // guard: 30 simulated minutes per seek
+
+    var replayMatch = /(?:^|[?&])replay=([0-9a-f]{16})(?:&|$)/.exec(window.location.search || "");
+    var Replay = { on: !!replayMatch, id: replayMatch ? replayMatch[1] : null, data: null, world: null, seeking: false, desync: -1 };
+
+    // Drive the replayed turn: show the recorded aim, fire once the recorded
+    // aim-phase steps are done. With every worm at rest the remaining aim
+    // steps change nothing, so they are skipped.
+    function replayDrive(){
+      if(state.phase !== "aim") return;
+      var shot = Replay.data.shots[state.turn];
+      if(!shot) return;
+      if(state.aimTicks === 0){
+        setWeapon(shot[0]);
+        state.angleDeg = shot[1];
+        state.power = shot[2];
+        if(Math.abs(state.wind - shot[4]) > 1e-9 && Replay.desync < 0){
+          Replay.desync = state.turn;
+          showToast("Replay weicht ab (Zug " + (state.turn + 1) + ")");
+        }
+      }
+      var due = shot[3];
+      if(state.aimTicks < due && allPlayersStable()){
+        due = Replay.seeking ? 0 : Math.min(due, REPLAY_AIM_HOLD);
+      }
+      if(state.aimTicks < due) return;
+      setWeapon(shot[0]);
+      state.angleDeg = shot[1];
+      state.power = shot[2];
+      fire();
+    }
+
+    function replayToast(){
+      var n = Replay.data.shots.length;
+      showToast("Replay: Zug " + Math.min(state.turn + 1, n) + " / " + n + " (← → springen)");
+    }
+
+    function replaySeek(turn){
+      var data = Replay.data;
+      turn = clamp(turn, 0, data.shots.length);
+      Replay.seeking = toastMuted = true;
+      try{
+        startGame(data.seed, Replay.world);
+        for(var steps = 0; state.turn < turn && state.phase !== "gameover" && steps < REPLAY_SEEK_MAX_STEPS; steps++){
+          replayDrive();
+          update(PHYSICS_DT);
+        }
+      }finally{
+        Replay.seeking = toastMuted = false;
+      }
+      state.fx.explosion = null;
+      state.acc = 0;
+      snapshotPrev();
+      replayToast();
+    }
+
+    function onReplayKey(code){
+      if(!Replay.data) return;
+      // back: to the start of the current turn, or the previous one if already there
+      if(keyIn(code, KEYS.LEFT)) replaySeek(state.phase === "aim" ? state.turn - 1 : state.turn);
+      else if(keyIn(code, KEYS.RIGHT)) replaySeek(state.turn + 1);
+      else if(code === "Home" || keyIn(code, KEYS.RESTART)) replaySeek(0);
+      else if(code === "End") replaySeek(Replay.data.shots.length);
+    }
+
+    function replayLoad(){
+      showToast("Lade Replay " + Replay.id + "…");
+      window.fetch("/api/replay/" + Replay.id)
+        .then(function(r){ return r.json(); })
+        .then(function(data){
+          if(!data || !data.ok) throw new Error("replay");
+          Replay.data = data.replay;
+          Replay.world = { w: data.replay.w, h: data.replay.h };
+          replaySeek(0);
+        })
+        .catch(function(){ showFallback("Replay nicht verfügbar", "Das Replay wurde nicht gefunden."); });
+    }
+
+    function saveReplay(){
+      if(!window.fetch || !state) return;
+      if(Net.on){
+        showToast("Im Online-Match nicht verfügbar.");
+        return;
+      }
+      var record = Replay.data || state.record;
+      if(!record || !record.shots.length){
+        showToast("Noch keine Schüsse zum Speichern.");
+        return;
+      }
+      window.fetch("/api/replay", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify(record)
+      })
+        .then(function(r){ return r.json(); })
+        .then(function(data){
+          if(!data || !data.ok) throw new Error("replay");
+          if(navigator.clipboard){
+            navigator.clipboard.writeText(window.location.origin + data.url).catch(function(){});
+          }
+          showToast("Replay gespeichert: " + data.url);
+        })
+        .catch(function(){ showToast("Replay konnte nicht gespeichert werden."); });
+    }
+
+    // --- CPU opponent ---------------------------------------------------------
+    // ?cpu=easy|medium|hard|perfect: team 2 (Player 2 in a duel) is played by
+    // the CPU. Mirror of engine/ai.py: a flat-ground range table over angle x
+    // power x wind gives a first power per candidate angle, a few exact
+    // rollouts over the real terrain refine it, and the difficulty adds noise
+    // to the chosen shot. It aims at the nearest enemy worm and scores a shot
+    // by the damage to the enemy team minus the weighted damage to its own.
+    var AI_DIFFICULTY = { easy: [6.0, 8.0], medium: [3.0, 4.0], hard: [1.2, 1.5], perfect: [0, 0] };
+    var AI_ANGLES = [45, 60, 30, 72, 20];
+    var AI_ROLLOUTS_PER_ANGLE = 3;
+    var AI_MAX_ROLLOUT_STEPS = 240 * 8;
+    var AI_SELF_WEIGHT = 1.5;
+    var AI_THINK_TICKS = 180;  // 0.75 s of visible aiming before the CPU fires
+
+    var cpuMatch = /(?:^|[?&])cpu=(easy|medium|hard|perfect)(?:&|$)/.exec(window.location.search || "");
+    var Cpu = {
+      on: !!cpuMatch && !Net.on && !Replay.on, team: 1,
+      difficulty: cpuMatch ? cpuMatch[1] : "medium", plan: null
+    };
+
+    function aiGrid(lo, hi, step){
+      var n = Math.round((hi - lo) / step);
+      var out = [];
+      for(var i=0;i<=n;i++) out.push(lo + i * step);
+      return out;
+    }
+
+    // Flat-ground range: the fixed-step integration v += a*h; x += v*h has the
+    // closed form x_n = x_0 + n*h*v_0 + a*h^2*n*(n+1)/2, so no stepping needed.
+    var aiTableCache = null;
+    function aiTable(){
+      if(aiTableCache) return aiTableCache;
+      var t = { angles: aiGrid(10, 80, 2.5), powers: aiGrid(10, 100, 2.5), winds: aiGrid(-55, 55, 5) };
+      var nP = t.powers.length, nW = t.winds.length;
+      var h = PHYSICS_DT;
+      t.ranges = new Float64Array(t.angles.length * nP * nW);
+      for(var i=0;i<t.angles.length;i++){
+        var theta = t.angles[i] * Math.PI / 180;
+        for(var j=0;j<nP;j++){
+          var speed = 120 + (t.powers[j] / 100) * 520;
+          var vx0 = Math.cos(theta) * speed, vy0 = -Math.sin(theta) * speed;
+          var n = -2 * vy0 / (state.gravity * h) - 1;
+          for(var k=0;k<nW;k++){
+            t.ranges[(i * nP + j) * nW + k] = n * h * vx0 + t.winds[k] * h * h * n * (n + 1) / 2;
+          }
+        }
+      }
+      aiTableCache = t;
+      return t;
+    }
+
+    function aiCell(axis, v){
+      var step = axis[1] - axis[0];
+      var t = clamp((v - axis[0]) / step, 0, axis.length - 1.000001);
+      var i = Math.floor(t);
+      return { f: t - i, i: i };
+    }
+
+    // Power whose flat-ground range is `distance` (bilinear in angle and wind).
+    function aiPowerFor(tab, angle, wind, distance){
+      var a = aiCell(tab.angles, angle), w = aiCell(tab.winds, wind);
+      var nP = tab.powers.length, nW = tab.winds.length, rs = tab.ranges, ps = tab.powers;
+      var out = new Array(nP);
+      for(var j=0;j<nP;j++){
+        var b0 = (a.i * nP + j) * nW + w.i;
+        var b1 = ((a.i + 1) * nP + j) * nW + w.i;
+        var r0 = rs[b0] + (rs[b0 + 1] - rs[b0]) * w.f;
+        var r1 = rs[b1] + (rs[b1 + 1] - rs[b1]) * w.f;
+        out[j] = r0 + (r1 - r0) * a.f;
+      }
+      for(var q=0;q<nP-1;q++){
+        if((out[q] - distance) * (out[q + 1] - distance) <= 0 && out[q + 1] !== out[q]){
+          var slope = (out[q + 1] - out[q]) / (ps[q + 1] - ps[q]);
+          return { power: ps[q] + (distance - out[q]) / slope, slope: slope };
+        }
+      }
+      if(Math.abs(out[nP - 1] - distance) < Math.abs(out[0] - distance)){
+        return { power: ps[nP - 1], slope: (out[nP - 1] - out[nP - 2]) / (ps[nP - 1] - ps[nP - 2]) };
+      }
+      return { power: ps[0], slope: (out[1] - out[0]) / (ps[1] - ps[0]) };
+    }
+
+    // One shot of the active player with the rules of projectileSubstep at the
+    // fixed step, without touching state (no crater, damage or turn switch).
+    function aiRollout(angleDeg, power, slot){
+      var wpn = weaponBySlot(slot);
+      var shooter = state.players[state.active];
+      var dir = shooter.team === 0 ? 1 : -1;
+      angleDeg = clamp(angleDeg, 10, 80);
+      power = clamp(power, 10, 100);
+      if(dir === -1) angleDeg = 180 - angleDeg;
+      var ang = angleDeg * Math.PI / 180;
+      var speed = 120 + (power / 100) * 520;
+
+      var sy = shooter.y - shooter.r * 0.15;
+      var x = shooter.x * state.view.w + dir * (shooter.r + 2);
+      var y = sy - shooter.r * 0.1;
+      var vx = Math.cos(ang) * speed, vy = -Math.sin(ang) * speed;
+      var r = wpn.projR;
+      var grenade = wpn.key === "grenade";
+      var age = 0, bounces = 0;
+      var w = state.view.w, h = state.view.h;
+      var worms = [];
+      for(var i=0;i<state.players.length;i++){
+        var pl = state.players[i];
+        worms.push(pl.hp > 0 ? { x: pl.x * w, y: pl.y, reach: pl.r + r } : null);
+      }
+      var inside = [];
+      for(var j=0;j<state.players.length;j++){
+        if(state.players[j].team === shooter.team) inside.push(j);
+      }
+      var sub = PHYSICS_DT;
+
+      for(var step=0; step<AI_MAX_ROLLOUT_STEPS; step++){
+        age += sub;
+        if(grenade && wpn.fuse > 0 && age >= wpn.fuse) return { x: x, y: y, exploded: true, worm: -1 };
+
+        var x0 = x, y0 = y;
+        vx += state.wind * sub;
+        vy += state.gravity * sub;
+        x += vx * sub;
+        y += vy * sub;
+        var mx = x - x0, my = y - y0;
+
+        var tWorm = -1, worm = -1;
+        var near = gridQuery(state.grid, Math.min(x0, x) - r, Math.max(x0, x) + r);
+        for(var k=0;k<near.length;k++){
+          var wk = worms[near[k]];
+          if(!wk) continue;
+          var at = inside.indexOf(near[k]);
+          if(at >= 0){
+            var ox = x0 - wk.x, oy = y0 - wk.y;
+            if(ox * ox + oy * oy <= wk.reach * wk.reach) continue;
+            inside.splice(at, 1);
+          }
+          var t = sweepCircle(x0, y0, mx, my, wk.x, wk.y, wk.reach);
+          if(t >= 0 && (worm < 0 || t < tWorm)){ tWorm = t; worm = near[k]; }
+        }
+        var tGround = terrainSweep(x0, y0, x, y, r);
+        if(worm >= 0 && (tGround < 0 || tWorm <= tGround)){
+          return { x: x0 + mx * tWorm, y: y0 + my * tWorm, exploded: true, worm: worm };
+        }
+        if(tGround >= 0){
+          x = x0 + mx * tGround;
+          y = y0 + my * tGround;
+        }
+        if(x < -80 || x > w + 80 || y > h + 120 || y < -160) return { x: x, y: y, exploded: false, worm: -1 };
+
+        if(tGround >= 0){
+          if(grenade && bounces < wpn.bounce){
+            var n = terrainNormal(x, y, r);
+            var dot = vx * n[0] + vy * n[1];
+            vx = (vx - 2 * dot * n[0]) * 0.62;
+            vy = (vy - 2 * dot * n[1]) * 0.55;
+            var out = terrainPushOut(x, y, r, n);
+            x = out[0];
+            y = out[1];
+            bounces += 1;
+          }else{
+            return { x: x, y: y, exploded: true, worm: -1 };
+          }
+        }
+      }
+      return { x: x, y: y, exploded: false, worm: -1 };
+    }
+
+    function aiDamageAt(impact, slot){
+      var out = [];
+      var wpn = weaponBySlot(slot);
+      for(var i=0;i<state.players.length;i++) out.push(0);
+      if(!impact.exploded) return out;
+      var near = gridQuery(state.grid, impact.x - wpn.radius, impact.x + wpn.radius);
+      for(var k=0;k<near.length;k++){
+        var pl = state.players[near[k]];
+        if(!pl.alive) continue;
+        var d = dist(impact.x, impact.y, pl.x * state.view.w, pl.y);
+        if(d <= wpn.radius + pl.r){
+          out[near[k]] = clamp(Math.round(wpn.maxDmg * (1 - clamp(d / wpn.radius, 0, 1))), 0, wpn.maxDmg);
+        }
+      }
+      return out;
+    }
+
+    function aiBetter(a, b){
+      return !b || a.score > b.score || (a.score === b.score && Math.abs(a.miss) < Math.abs(b.miss));
+    }
+
+    // Closest living worm of the other team (lowest index on ties).
+    function aiNearestEnemy(){
+      var shooter = state.players[state.active];
+      var best = -1, bestD = 0;
+      for(var i=0;i<state.players.length;i++){
+        var pl = state.players[i];
+        if(pl.team === shooter.team || pl.hp <= 0) continue;
+        var d = Math.abs(pl.x - shooter.x);
+        if(best < 0 || d < bestD){ best = i; bestD = d; }
+      }
+      return best;
+    }
+
+    function aiSolveSlot(slot, tab){
+      var targetI = aiNearestEnemy();
+      var shooter = state.players[state.active], target = state.players[targetI];
+      var dir = shooter.team === 0 ? 1 : -1;
+      var x0 = shooter.x * state.view.w + dir * (shooter.r + 2);
+      var tx = target.x * state.view.w;
+      var distance = dir * (tx - x0);
+      var wind = dir * state.wind;
+      var best = null, rollouts = 0;
+
+      for(var a=0;a<AI_ANGLES.length;a++){
+        var angle = AI_ANGLES[a];
+        var guess = aiPowerFor(tab, angle, wind, distance);
+        var power = guess.power, slope = guess.slope, prev = null;
+        for(var k=0;k<AI_ROLLOUTS_PER_ANGLE;k++){
+          power = clamp(power, 10, 100);
+          var impact = aiRollout(angle, power, slot);
+          rollouts += 1;
+          var dmg = aiDamageAt(impact, slot);
+          var miss = dir * (impact.x - tx);
+          var enemy = 0, own = 0;
+          for(var j=0;j<dmg.length;j++){
+            if(state.players[j].team === shooter.team) own += dmg[j];
+            else enemy += dmg[j];
+          }
+          var cand = { slot: slot, angle: angle, power: power, score: enemy - AI_SELF_WEIGHT * own,
+                       damage: enemy, selfDamage: own, miss: miss };
+          if(aiBetter(cand, best)) best = cand;
+          if(impact.worm === targetI) break;
+          if(prev && miss !== prev.miss && power !== prev.power) slope = (miss - prev.miss) / (power - prev.power);
+          prev = { power: power, miss: miss };
+          if(!slope) break;
+          var stepP = miss / slope;
+          if(Math.abs(stepP) < 0.05) break;
+          power -= stepP;
+        }
+        if(best.damage && !best.selfDamage && Math.abs(best.miss) < target.r) break;
+      }
+      best.rollouts = rollouts;
+      return best;
+    }
+
+    function aiGauss(rng){
+      var u1 = 1 - rng();
+      var u2 = rng();
+      return Math.sqrt(-2 * Math.log(u1)) * Math.cos(2 * Math.PI * u2);
+    }
+
+    // Best shot for the active player (every weapon when slot is null).
+    function aiSolve(slot, difficulty){
+      var tab = aiTable();
+      var slots = slot ? [clamp(slot, 1, 3)] : [1, 2, 3];
+      var best = null, rollouts = 0;
+      for(var i=0;i<slots.length;i++){
+        var sol = aiSolveSlot(slots[i], tab);
+        rollouts += sol.rollouts;
+        if(aiBetter(sol, best)) best = sol;
+      }
+      best.rollouts = rollouts;
+
+      var sigma = AI_DIFFICULTY[difficulty] || AI_DIFFICULTY.perfect;
+      if(sigma[0] || sigma[1]){
+        var rng = mulberry32(state.seed ^ Math.imul(state.turn, 0x9E3779B9));
+        best.angle = clamp(best.angle + sigma[0] * aiGauss(rng), 10, 80);
+        best.power = clamp(best.power + sigma[1] * aiGauss(rng), 10, 100);
+      }
+      return best;
+    }
+
+    function cpuToMove(){
+      return Cpu.on && state.players[state.active].team === Cpu.team;
+    }
+
+    // CPU turn: solve once, sweep the visible aim towards the plan, then fire.
+    function cpuDrive(){
+      if(state.phase !== "aim" || !cpuToMove()) return;
+      var plan = Cpu.plan;
+      if(!plan || plan.turn !== state.turn || plan.seed !== state.seed){
+        var t0 = nowMs();
+        plan = Cpu.plan = { turn: state.turn, seed: state.seed, sol: aiSolve(null, Cpu.difficulty) };
+        if(Perf.on) perfRecord("ai", nowMs() - t0);
+        setWeapon(plan.sol.slot);
+      }
+      var k = Math.min(1, state.aimTicks / AI_THINK_TICKS);
+      state.angleDeg = lerp(45, plan.sol.angle, k);
+      state.power = lerp(62, plan.sol.power, k);
+      if(state.aimTicks >= AI_THINK_TICKS) fire();
+    }
+
+    if(replayBtn){
+      replayBtn.addEventListener("click", saveReplay);
+    }
+
     if(restartBtn){
       restartBtn.addEventListener("click", function(){
+        if(Net.on || Replay.on){
+          window.location.search = "";
+          return;
+        }
         startGame();
       });
     }
 
+    if(onlineBtn){
+      onlineBtn.addEventListener("click", createOnlineMatch);
+    }
+
+    if(cpuBtn){
+      cpuBtn.addEventListener("click", function(){
+        // keep the match setup (team size, map width) when switching
+        var keep = [];
+        if(TEAM_SIZE > 1) keep.push("teams=" + TEAM_SIZE);
+        if(MAP_SCREENS > 1) keep.push("map=" + MAP_SCREENS);
+        if(!Cpu.on) keep.unshift("cpu=" + Cpu.difficulty);
+        window.location.search = keep.length ? "?" + keep.join("&") : "";
+      });
+      if(Cpu.on) safeText(cpuBtn, "Zu zweit spielen");
+    }
+
     // Boot
     try{
+      if(Perf.on) enablePerf();
       refreshPalette();
-      startGame();
+      if(Net.on) netConnect();
+      else if(Replay.on) replayLoad();
+      else{
+        startGame();
+        if(Cpu.on) showToast(teamName(Cpu.team) + " ist die CPU (" + Cpu.difficulty + ")");
+      }
       window.addEventListener("keydown", onKeyDown, { passive: false });
       window.addEventListener("keyup", onKeyUp, { passive: false });
       window.addEventListener("resize", onResize);
@@ -1549,7 +3332,7 @@ def _security_headers(resp):
     resp.headers.setdefault("Cross-Origin-Resource-Policy", "same-origin")
     resp.headers.setdefault("Permissions-Policy", "interest-cohort=()")
 
-    # CSP: inline CSS/JS required by spec (single-file HTML)
+    # CSP: game CSS/JS is served from /static, only error pages keep inline CSS
     resp.headers.setdefault(
         "Content-Security-Policy",
         "default-src 'self'; "
@@ -1557,29 +3340,197 @@ def _security_headers(resp):
         "object-src 'none'; "
         "frame-ancestors 'none'; "
         "img-src 'self' data:; "
-        "style-src 'self' 'unsafe-inline'; "
-        "script-src 'self' 'unsafe-inline'; "
+        "style-src 'self'; "
+        "script-src 'self'; "
         "connect-src 'self';",
     )
     return resp
 
 
+# Request metrics. Every thread counts into its own shard, so the request
+# path takes no lock; a scrape sums the shards. A shard is registered once
+# per thread, and shards of finished threads (the dev server starts one per
+# request) are folded into _METRICS_RETIRED then.
+# Latency buckets in seconds (upper bounds; +Inf is implied).
+METRICS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_METRICS_LOCAL = threading.local()
+_METRICS_SHARDS = []    # (thread, shard)
+_METRICS_LOCK = threading.Lock()
+
+
+def _metrics_new_shard():
+    # requests: (method, route, status) -> bucket counts + [sum of seconds]
+    # in_flight: (method, route) -> open requests (WebSockets stay open)
+    # bytes: encoding -> body bytes; cache: (cache, "hit"/"miss") -> count
+    return {"requests": {}, "in_flight": {}, "bytes": {}, "cache": {}}
+
+
+_METRICS_RETIRED = _metrics_new_shard()
+
+
+def _metrics_merge(dst, src):
+    # list(d.items()) copies in one C call, so a shard can be read while
+    # its thread keeps counting into it
+    for key, hist in list(src["requests"].items()):
+        acc = dst["requests"].get(key)
+        if acc is None:
+            dst["requests"][key] = list(hist)
+        else:
+            for i, v in enumerate(list(hist)):
+                acc[i] += v
+    for name in ("in_flight", "bytes", "cache"):
+        acc = dst[name]
+        for key, v in list(src[name].items()):
+            acc[key] = acc.get(key, 0) + v
+
+
+def _metrics_reset():
+    """Zero every count (in place: threads keep their shards)."""
+    with _METRICS_LOCK:
+        for shard in [_METRICS_RETIRED] + [shard for _, shard in _METRICS_SHARDS]:
+            for counts in shard.values():
+                counts.clear()
+
+
+def _metrics_shard():
+    try:
+        return _METRICS_LOCAL.shard
+    except AttributeError:
+        pass
+    shard = _METRICS_LOCAL.shard = _metrics_new_shard()
+    with _METRICS_LOCK:
+        live = []
+        for thread, other in _METRICS_SHARDS:
+            if thread.is_alive():
+                live.append((thread, other))
+            else:
+                _metrics_merge(_METRICS_RETIRED, other)
+        live.append((threading.current_thread(), shard))
+        _METRICS_SHARDS[:] = live
+    return shard
+
+
+def _metrics_cache(cache: str, hit: bool):
+    if not app.config["METRICS"]:
+        return
+    counts = _metrics_shard()["cache"]
+    key = (cache, "hit" if hit else "miss")
+    counts[key] = counts.get(key, 0) + 1
+
+
+@app.before_request
+def metrics_start():
+    if not app.config["METRICS"]:
+        return
+    # the proxy costs ~1 us per attribute; resolve the request once
+    req = request._get_current_object()
+    rule = req.url_rule
+    key = (req.method, rule.rule if rule is not None else "<unmatched>")
+    shard = _metrics_shard()
+    flight = shard["in_flight"]
+    flight[key] = flight.get(key, 0) + 1
+    # [route key, shard, body encoding, start]; _send_rendered sets the
+    # encoding, so no header lookup is needed afterwards
+    req.metrics = [key, shard, "identity", time.perf_counter()]
+
+
+@app.after_request
+def metrics_observe(resp):
+    state = request._get_current_object().__dict__.pop("metrics", None)
+    if state is None:
+        return resp
+    (method, route), shard, enc, t0 = state
+    elapsed = time.perf_counter() - t0
+    shard["in_flight"][method, route] -= 1
+    key = (method, route, resp.status_code)
+    hist = shard["requests"].get(key)
+    if hist is None:
+        hist = shard["requests"][key] = [0] * (len(METRICS_BUCKETS) + 1) + [0.0]
+    hist[bisect.bisect_left(METRICS_BUCKETS, elapsed)] += 1
+    hist[-1] += elapsed
+    if resp.is_sequence:  # not for streamed bodies (WebSockets)
+        size = sum(map(len, resp.response))
+        if size:
+            counts = shard["bytes"]
+            counts[enc] = counts.get(enc, 0) + size
+    return resp
+
+
+@app.teardown_request
+def metrics_finish(_exc):
+    # only does something when the after_request hooks did not run (an
+    # error while finishing the response): keeps the in-flight gauge right
+    state = request._get_current_object().__dict__.pop("metrics", None)
+    if state is not None:
+        state[1]["in_flight"][state[0]] -= 1
+
+
+def _metrics_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _metrics_text() -> str:
+    """All shards in the Prometheus text exposition format (0.0.4)."""
+    total = _metrics_new_shard()
+    with _METRICS_LOCK:
+        _metrics_merge(total, _METRICS_RETIRED)
+        for _thread, shard in _METRICS_SHARDS:
+            _metrics_merge(total, shard)
+
+    out = [
+        "# HELP worms_http_request_duration_seconds Request latency by route, method and status.",
+        "# TYPE worms_http_request_duration_seconds histogram",
+    ]
+    bounds = [repr(b) for b in METRICS_BUCKETS] + ["+Inf"]
+    for (method, route, status), hist in sorted(total["requests"].items()):
+        labels = f'method="{method}",route="{_metrics_label(route)}",status="{status}"'
+        cumulative = 0
+        for le, n in zip(bounds, hist):
+            cumulative += n
+            out.append(f'worms_http_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+        out.append(f"worms_http_request_duration_seconds_sum{{{labels}}} {hist[-1]!r}")
+        out.append(f"worms_http_request_duration_seconds_count{{{labels}}} {cumulative}")
+
+    out += [
+        "# HELP worms_http_requests_in_flight Requests (and WebSockets) being served.",
+        "# TYPE worms_http_requests_in_flight gauge",
+    ]
+    for (method, route), n in sorted(total["in_flight"].items()):
+        out.append(f'worms_http_requests_in_flight{{method="{method}",route="{_metrics_label(route)}"}} {n}')
+
+    out += [
+        "# HELP worms_http_response_bytes_total Response body bytes by content encoding.",
+        "# TYPE worms_http_response_bytes_total counter",
+    ]
+    for enc, n in sorted(total["bytes"].items()):
+        out.append(f'worms_http_response_bytes_total{{encoding="{_metrics_label(enc)}"}} {n}')
+
+    out += [
+        "# HELP worms_template_cache_total Rendered page and error page cache lookups.",
+        "# TYPE worms_template_cache_total counter",
+    ]
+    for (cache, result), n in sorted(total["cache"].items()):
+        out.append(f'worms_template_cache_total{{cache="{cache}",result="{result}"}} {n}')
+    return "\n".join(out) + "\n"
+
+
 @app.after_request
 def add_headers(resp):
     _security_headers(resp)
     path = request.path or "/"
     if path == "/":
-        resp.headers["Cache-Control"] = "no-store"
+        resp.headers["Cache-Control"] = app.config["INDEX_CACHE_CONTROL"]
+    elif path.startswith("/static/") and resp.status_code in (200, 304):
+        resp.headers["Cache-Control"] = app.config["STATIC_CACHE_CONTROL"]
     elif path.startswith("/api/"):
         resp.headers["Cache-Control"] = "no-store"
         resp.headers.setdefault("Content-Type", "application/json; charset=utf-8")
     return resp
 
 
-@app.get("/")
-def index():
-    html = render_template_string(
-        HTML,
+def _page_context():
+    return dict(
         service_name_slug=SERVICE_NAME_SLUG,
         page_title=PAGE_TITLE,
         page_h1=PAGE_H1,
@@ -1588,12 +3539,200 @@ def index():
         cookbook_url=COOKBOOK_URL,
         plz_url=PLZ_URL,
         version=VERSION,
+        perf_buckets=PERF_BUCKETS,
+        perf_base_ms=PERF_BASE_MS,
+        perf_factor=PERF_FACTOR,
+        mulberry32_js=MULBERRY32_JS.strip(),
+        wire_version=wire.VERSION,
+        replay_version=REPLAY_VERSION,
+        wire_path_scale=wire.PATH_SCALE,
     )
-    resp = make_response(html, 200)
-    resp.headers["Content-Type"] = "text/html; charset=utf-8"
+
+
+class RenderedPage:
+    """Rendered page plus its precompressed variants (encoding -> bytes).
+
+    Each variant gets its own strong ETag derived from the content hash of
+    the uncompressed body.
+    """
+
+    def __init__(self, body: bytes, content_type: str = "text/html; charset=utf-8"):
+        self.body = body
+        self.content_type = content_type
+        self.digest = hashlib.sha256(body).hexdigest()[:32]
+        self.variants = {"identity": body}
+        self.variants["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(body, quality=11)
+
+    def etag(self, encoding: str) -> str:
+        if encoding == "identity":
+            return self.digest
+        return f"{self.digest}-{encoding}"
+
+    def sizes(self):
+        return {enc: len(data) for enc, data in self.variants.items()}
+
+
+# Inline blocks that get moved out of the page into fingerprinted assets:
+# (opening tag, closing tag, file extension, content type, replacement tag)
+_EXTRACTED_BLOCKS = (
+    ("<style>", "</style>", "css", "text/css; charset=utf-8",
+     '<link rel="stylesheet" href="/static/{name}" />'),
+    ("<script>", "</script>", "js", "text/javascript; charset=utf-8",
+     '<script src="/static/{name}"></script>'),
+)
+
+
+def _extract_static_assets(html: str):
+    """Move inline <style>/<script> blocks of ``html`` into hashed assets.
+
+    Blocks of the same kind are concatenated in document order; the first
+    one is replaced by a reference to the asset, the others are dropped.
+    Returns the rewritten HTML and a dict of asset name -> RenderedPage.
+    """
+    assets = {}
+    for open_tag, close_tag, ext, content_type, ref in _EXTRACTED_BLOCKS:
+        parts = []
+        first_at = None
+        while True:
+            start = html.find(open_tag)
+            if start < 0:
+                break
+            end = html.find(close_tag, start)
+            if end < 0:
+                break
+            parts.append(html[start + len(open_tag):end])
+            html = html[:start] + html[end + len(close_tag):]
+            if first_at is None:
+                first_at = start
+        if first_at is None:
+            continue
+
+        body = "\n".join(parts).encode("utf-8")
+        name = f"app.{hashlib.sha256(body).hexdigest()[:12]}.{ext}"
+        assets[name] = RenderedPage(body, content_type)
+        html = html[:first_at] + ref.format(name=name) + html[first_at:]
+    return html, assets
+
+
+class PageBundle:
+    """The index page shell plus the static assets it references."""
+
+    def __init__(self, html: str):
+        shell, self.assets = _extract_static_assets(html)
+        self.page = RenderedPage(shell.encode("utf-8"))
+
+
+# Preference order when the client accepts several encodings equally.
+_ENCODING_PREFERENCE = ("br", "gzip", "identity")
+
+
+def _negotiate_encoding(page: RenderedPage) -> str:
+    accepted = request.accept_encodings
+    best, best_q = "identity", 0.0
+    for enc in _ENCODING_PREFERENCE:
+        if enc not in page.variants:
+            continue
+        q = accepted.quality(enc)
+        if enc == "identity" and enc not in accepted:
+            q = 0.001  # implicitly acceptable, but only as a last resort
+        if q > best_q:
+            best, best_q = enc, q
+    return best
+
+
+def _send_rendered(page: RenderedPage):
+    encoding = _negotiate_encoding(page)
+    etag = page.etag(encoding)
+
+    if request.if_none_match.contains(etag):
+        resp = make_response("", 304)
+    else:
+        resp = make_response(page.variants[encoding], 200)
+        resp.headers["Content-Type"] = page.content_type
+        if encoding != "identity":
+            resp.headers["Content-Encoding"] = encoding
+            state = getattr(request._get_current_object(), "metrics", None)
+            if state is not None:
+                state[2] = encoding
+    resp.set_etag(etag)
+    resp.headers["Vary"] = "Accept-Encoding"
     return resp
 
 
+# Rendered page bundles, keyed by VERSION. All template inputs are module
+# constants, so the page only has to be rendered once per version.
+_PAGE_CACHE = {}
+_PAGE_CACHE_LOCK = threading.Lock()
+
+
+def _render_page_bundle() -> PageBundle:
+    with app.app_context():
+        html = render_template_string(HTML, **_page_context())
+    return PageBundle(html)
+
+
+def get_page_bundle(version: str = VERSION) -> PageBundle:
+    bundle = _PAGE_CACHE.get(version)
+    _metrics_cache("page", bundle is not None)
+    if bundle is None:
+        with _PAGE_CACHE_LOCK:
+            bundle = _PAGE_CACHE.get(version)
+            if bundle is None:
+                bundle = _render_page_bundle()
+                _PAGE_CACHE[version] = bundle
+    return bundle
+
+
+def get_index_page(version: str = VERSION) -> RenderedPage:
+    return get_page_bundle(version).page
+
+
+def invalidate_page_cache(version: str = None):
+    """Drop the cached page for ``version`` (or all versions)."""
+    with _PAGE_CACHE_LOCK:
+        if version is None:
+            _PAGE_CACHE.clear()
+        else:
+            _PAGE_CACHE.pop(version, None)
+
+
+def warm_up():
+    """Build everything that is the same for every request, up front.
+
+    The gunicorn master calls this after preloading the app
+    (``gunicorn.conf.py``), so the page bundle (shell, hashed assets and
+    their gzip/brotli variants), the error pages and the CPU opponent's
+    range table exist once and the forked workers share them copy-on-write
+    instead of each building its own copy on its first request.
+    ``gc.freeze`` moves them out of the collector's generations: otherwise
+    the first collection in every worker writes to their object headers and
+    copies the pages after all.
+    """
+    get_page_bundle()
+    for _status, title, message in (_NOT_FOUND_PAGE, _SERVER_ERROR_PAGE):
+        _error_page_html(title, message)
+    ai_table()
+    # the cache misses above are not traffic; every forked worker would
+    # report them again
+    _metrics_reset()
+    gc.freeze()
+
+
+@app.get("/")
+def index():
+    return _send_rendered(get_index_page())
+
+
+@app.get("/static/<name>")
+def static_asset(name):
+    asset = get_page_bundle().assets.get(name)
+    if asset is None:
+        abort(404)
+    return _send_rendered(asset)
+
+
 @app.get("/api/health")
 def health():
     return jsonify(ok=True)
@@ -1601,11 +3740,286 @@ def health():
 
 @app.get("/api/meta")
 def meta():
-    return jsonify(ok=True, service=SERVICE_NAME_SLUG, version=VERSION)
+    bundle = get_page_bundle()
+    return jsonify(
+        ok=True,
+        service=SERVICE_NAME_SLUG,
+        version=VERSION,
+        page=_size_report(bundle.page),
+        assets={name: _size_report(asset) for name, asset in bundle.assets.items()},
+        online=ROOMS.stats(),
+        ai_cache=_ai_cache_stats(),
+    )
 
 
-def _render_error_page(status_code: int, title: str, message: str):
-    tmpl = r"""<!doctype html>
+@app.get("/api/metrics")
+def metrics():
+    if not app.config["METRICS"]:
+        abort(404)
+    resp = make_response(_metrics_text(), 200)
+    resp.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+    return resp
+
+
+# device key -> phase -> bucket counts, aggregated across all clients
+_PERF_STATS = {}
+_PERF_LOCK = threading.Lock()
+
+
+def _perf_quantile(counts, q: float) -> float:
+    total = sum(counts)
+    want = q * total
+    acc = 0
+    for k, c in enumerate(counts):
+        acc += c
+        if acc >= want and acc > 0:
+            return round(PERF_BASE_MS * PERF_FACTOR**k, 4)
+    return 0.0
+
+
+def _parse_perf_payload(data):
+    if not isinstance(data, dict) or data.get("v") != 1:
+        return None
+    device = data.get("device")
+    phases = data.get("phases")
+    if not isinstance(device, str) or not isinstance(phases, dict):
+        return None
+    if len(device) > 64 or len(phases) > PERF_MAX_PHASES:
+        return None
+    parsed = {}
+    for name, counts in phases.items():
+        if not isinstance(name, str) or len(name) > 40:
+            return None
+        if not isinstance(counts, list) or len(counts) != PERF_BUCKETS:
+            return None
+        if not all(isinstance(c, int) and 0 <= c < 1_000_000 for c in counts):
+            return None
+        parsed[name] = counts
+    return device, parsed
+
+
+@app.post("/api/perf")
+def perf_ingest():
+    if (request.content_length or 0) > 64 * 1024:
+        return jsonify(ok=False, error="payload_too_large"), 413
+    parsed = _parse_perf_payload(request.get_json(force=True, silent=True))
+    if parsed is None:
+        return jsonify(ok=False, error="bad_request"), 400
+
+    device, phases = parsed
+    with _PERF_LOCK:
+        if device not in _PERF_STATS and len(_PERF_STATS) >= PERF_MAX_DEVICES:
+            device = "other"
+        per_device = _PERF_STATS.setdefault(device, {})
+        for name, counts in phases.items():
+            agg = per_device.get(name)
+            if agg is None:
+                if len(per_device) >= PERF_MAX_PHASES:
+                    continue
+                agg = per_device[name] = [0] * PERF_BUCKETS
+            for k, c in enumerate(counts):
+                agg[k] += c
+    return jsonify(ok=True)
+
+
+@app.get("/api/perf")
+def perf_summary():
+    with _PERF_LOCK:
+        snapshot = {dev: {n: list(c) for n, c in ph.items()} for dev, ph in _PERF_STATS.items()}
+    devices = {}
+    for device, phases in snapshot.items():
+        devices[device] = {
+            name: {
+                "n": sum(counts),
+                "p50": _perf_quantile(counts, 0.50),
+                "p95": _perf_quantile(counts, 0.95),
+                "p99": _perf_quantile(counts, 0.99),
+            }
+            for name, counts in phases.items()
+        }
+    return jsonify(
+        ok=True,
+        buckets={"count": PERF_BUCKETS, "base_ms": PERF_BASE_MS, "factor": PERF_FACTOR},
+        devices=devices,
+    )
+
+
+@app.post("/api/rooms")
+def create_room():
+    try:
+        room = ROOMS.create()
+    except RoomError as e:
+        return jsonify(ok=False, error=e.code), 503
+    return jsonify(ok=True, room=room.id, url=f"/?room={room.id}")
+
+
+@app.get("/api/rooms/<room_id>")
+def room_status(room_id):
+    room = ROOMS.get(room_id)
+    if room is None:
+        return jsonify(ok=False, error="not_found"), 404
+    g = room.game
+    return jsonify(
+        ok=True,
+        room=room.id,
+        seated=sum(1 for s in room.seats if s is not None),
+        turn=g.turn,
+        phase=g.phase,
+        winner=g.winner if g.phase == "gameover" else None,
+    )
+
+
+# replay id -> (Replay, final summary, per-turn states), least recently used first
+_REPLAYS = OrderedDict()
+_REPLAYS_LOCK = threading.Lock()
+
+
+def _replay_states(rp):
+    """Re-simulate ``rp`` once; returns the final summary and the summary
+    before every turn (``len(shots) + 1`` entries, the last one is the final
+    state) as zlib-compressed JSON, so ``?turn=N`` never replays the match."""
+    states = [replay_summary(play_replay(rp, until_turn=0))]
+    play_replay(rp, on_shot=lambda turn, game: states.append(replay_summary(game)))
+    blob = zlib.compress(json.dumps(states, separators=(",", ":")).encode("utf-8"))
+    return states[-1], blob
+
+
+@app.post("/api/replay")
+def replay_upload():
+    if (request.content_length or 0) > 64 * 1024:
+        return jsonify(ok=False, error="payload_too_large"), 413
+    try:
+        rp = Replay.from_dict(request.get_json(force=True, silent=True))
+    except ReplayError as e:
+        return jsonify(ok=False, error="bad_replay", detail=str(e)), 400
+
+    replay_id = rp.digest()
+    with _REPLAYS_LOCK:
+        known = _REPLAYS.get(replay_id)
+    if known is None:
+        # validate by re-simulating the whole match (a few ms per shot)
+        try:
+            final, states = _replay_states(rp)
+        except ReplayError as e:
+            return jsonify(ok=False, error="replay_mismatch", detail=str(e)), 422
+        known = (rp, final, states)
+    with _REPLAYS_LOCK:
+        _REPLAYS[replay_id] = known
+        _REPLAYS.move_to_end(replay_id)
+        while len(_REPLAYS) > app.config["MAX_REPLAYS"]:
+            _REPLAYS.popitem(last=False)
+    return jsonify(ok=True, id=replay_id, url=f"/?replay={replay_id}", summary=known[1])
+
+
+@app.get("/api/replay/<replay_id>")
+def replay_download(replay_id):
+    with _REPLAYS_LOCK:
+        known = _REPLAYS.get(replay_id)
+        if known is not None:
+            _REPLAYS.move_to_end(replay_id)
+    if known is None:
+        return jsonify(ok=False, error="not_found"), 404
+    rp, final, states = known
+
+    turn = request.args.get("turn", type=int)
+    if turn is None:
+        return jsonify(ok=True, id=replay_id, replay=rp.to_dict(), summary=final)
+    if not 0 <= turn <= len(rp.shots):
+        return jsonify(ok=False, error="bad_turn"), 400
+    state = json.loads(zlib.decompress(states))[turn]
+    return jsonify(ok=True, id=replay_id, replay=rp.to_dict(), summary=final, state=state)
+
+
+# quantized position key -> solution dict, least recently used first
+_AI_CACHE = OrderedDict()
+_AI_CACHE_LOCK = threading.Lock()
+_AI_CACHE_COUNTS = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def _ai_cache_stats():
+    with _AI_CACHE_LOCK:
+        return dict(_AI_CACHE_COUNTS, size=len(_AI_CACHE), max=app.config["MAX_AI_SOLUTIONS"])
+
+
+@app.post("/api/ai/solve")
+def ai_solve():
+    if (request.content_length or 0) > 128 * 1024:
+        return jsonify(ok=False, error="payload_too_large"), 413
+    try:
+        pos = Position.from_dict(request.get_json(force=True, silent=True))
+    except PositionError as e:
+        return jsonify(ok=False, error="bad_position", detail=str(e)), 400
+
+    key = pos.key()
+    with _AI_CACHE_LOCK:
+        shot = _AI_CACHE.get(key)
+        if shot is not None:
+            _AI_CACHE.move_to_end(key)
+            _AI_CACHE_COUNTS["hits"] += 1
+        else:
+            _AI_CACHE_COUNTS["misses"] += 1
+    if shot is not None:
+        return jsonify(ok=True, key=key, cached=True, shot=shot)
+
+    # a few ms of rollouts; concurrent misses on one key may both compute
+    sol = pos.solve()
+    shot = {
+        "weapon": sol.slot, "angle": sol.angle, "power": sol.power, "damage": sol.damage,
+        "self_damage": sol.self_damage, "miss": sol.miss, "rollouts": sol.rollouts,
+    }
+    with _AI_CACHE_LOCK:
+        _AI_CACHE[key] = shot
+        while len(_AI_CACHE) > app.config["MAX_AI_SOLUTIONS"]:
+            _AI_CACHE.popitem(last=False)
+            _AI_CACHE_COUNTS["evictions"] += 1
+    return jsonify(ok=True, key=key, cached=False, shot=shot)
+
+
+@sock.route("/ws/rooms/<room_id>")
+def room_socket(ws, room_id):
+    # ?fmt=bin: binary frames (online.wire); default: JSON text frames.
+    # Both start with a hello carrying the seed and the crater history.
+    binary = request.args.get("fmt") == "bin"
+    encode = wire.encode if binary else encode_json
+
+    room = ROOMS.get(room_id)
+    if room is None:
+        ws.send(encode({"t": "error", "error": "not_found"}))
+        return
+
+    # deltas are published under the room lock: queue them, the outbox
+    # thread does the blocking sends
+    outbox = Outbox(ws.send, ws.close, limit=app.config["WS_SEND_QUEUE"], name="ws-" + room_id)
+
+    def send(message):
+        outbox.put(encode(message))
+
+    token, seat = ROOMS.connect(room, send)
+    try:
+        while True:
+            raw = ws.receive()
+            if raw is None:
+                break
+            reply = ROOMS.handle(room, seat, raw)
+            if reply is not None:
+                send(reply)
+    except RoomError:  # the outbox cut this peer off
+        pass
+    finally:
+        ROOMS.disconnect(room, token)
+        outbox.close()
+
+
+def _size_report(page: RenderedPage):
+    sizes = page.sizes()
+    identity = sizes["identity"]
+    savings = {
+        enc: round(1 - size / identity, 3) for enc, size in sizes.items() if enc != "identity"
+    }
+    return {"bytes": sizes, "savings": savings}
+
+
+_ERROR_TEMPLATE = r"""<!doctype html>
 <html lang="de">
 <head>
   <meta charset="utf-8" />
@@ -1668,10 +4082,33 @@ def _render_error_page(status_code: int, title: str, message: str):
   </div>
 </body>
 </html>"""
-    html = render_template_string(tmpl, title=title, message=message)
-    resp = make_response(html, status_code)
+
+# (status, title, message) of the error pages the handlers below send
+_NOT_FOUND_PAGE = (404, "Seite nicht gefunden", "Die angeforderte Seite existiert nicht.")
+_SERVER_ERROR_PAGE = (500, "Serverfehler", "Ein unerwarteter Fehler ist aufgetreten.")
+
+# Rendered error pages by (title, message); the handlers only pass constants.
+_ERROR_PAGES = {}
+
+
+def _error_page_html(title: str, message: str) -> str:
+    html = _ERROR_PAGES.get((title, message))
+    _metrics_cache("error_page", html is not None)
+    if html is None:
+        with app.app_context():
+            html = render_template_string(_ERROR_TEMPLATE, title=title, message=message)
+        _ERROR_PAGES[(title, message)] = html
+    return html
+
+
+def _render_error_page(status_code: int, title: str, message: str):
+    resp = make_response(_error_page_html(title, message), status_code)
     resp.headers["Content-Type"] = "text/html; charset=utf-8"
     resp.headers["Cache-Control"] = "no-store"
+    resp.headers["Content-Security-Policy"] = (
+        "default-src 'none'; base-uri 'self'; frame-ancestors 'none'; "
+        "style-src 'unsafe-inline';"
+    )
     return resp
 
 
@@ -1679,14 +4116,14 @@ def _render_error_page(status_code: int, title: str, message: str):
 def not_found(_e):
     if (request.path or "").startswith("/api/"):
         return jsonify(ok=False, error="not_found"), 404
-    return _render_error_page(404, "Seite nicht gefunden", "Die angeforderte Seite existiert nicht.")
+    return _render_error_page(*_NOT_FOUND_PAGE)
 
 
 @app.errorhandler(500)
 def server_error(_e):
     if (request.path or "").startswith("/api/"):
         return jsonify(ok=False, error="server_error"), 500
-    return _render_error_page(500, "Serverfehler", "Ein unerwarteter Fehler ist aufgetreten.")
+    return _render_error_page(*_SERVER_ERROR_PAGE)
 
 
 @app.errorhandler(Exception)
@@ -1696,7 +4133,7 @@ def handle_exception(e):
     # Avoid leaking details
     if (request.path or "").startswith("/api/"):
         return jsonify(ok=False, error="server_error"), 500
-    return _render_error_page(500, "Serverfehler", "Ein unerwarteter Fehler ist aufgetreten.")
+    return _render_error_page(*_SERVER_ERROR_PAGE)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,14 @@
+"""Server-authoritative online matches.
+
+The service owns each match (``engine.Game``); clients only send aim/fire
+inputs and receive compact deltas. ``RoomRegistry`` holds the matches of one
+instance, ``LocalBroker`` fans messages out to the connected sockets and
+stands in for a shared broker when running more than one instance;
+``Outbox`` queues each socket's frames so a slow peer never blocks a room.
+"""
+
+from .broker import LocalBroker
+from .outbox import Outbox
+from .rooms import Room, RoomError, RoomRegistry
+
+__all__ = ["LocalBroker", "Outbox", "Room", "RoomError", "RoomRegistry"]
@@ -0,0 +1,126 @@
+"""Benchmarks for the online layer.
+
+Usage: ``python -m online.bench wire [--matches 20]``
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+from . import wire
+from .broker import LocalBroker
+from .rooms import PATH_STRIDE, RoomRegistry, encode
+
+TIME_SAMPLE = 1000    # messages per row that are timed; sizes cover all of them
+
+
+def _play(seed: int, max_turns: int = 16):
+    """Play one match; returns (hello, deltas, full_states).
+
+    The hello is the snapshot a spectator joining at the end would get.
+    """
+    registry = RoomRegistry(LocalBroker())
+    room = registry.create(seed=seed)
+    deltas = []
+    registry.connect(room, deltas.append)
+
+    # What naive state sync would send: the whole state at 60 Hz during shots.
+    full_states = []
+    rng = random.Random(seed)
+    g = room.game
+    for _ in range(max_turns):
+        if g.phase == "gameover":
+            break
+        msg = {"t": "fire", "a": rng.uniform(20, 75), "p": rng.uniform(35, 95), "w": rng.randint(1, 3)}
+        registry.handle(room, g.active, json.dumps(msg))
+        shot = deltas[-1]
+        path = shot["path"]
+        terrain = g.terrain.runs.columns()  # unchanged during the flight; one list per shot
+        for k in range(0, len(path), 2):
+            full_states.append({
+                "terrain": terrain,
+                "players": [
+                    {"id": pl.id, "x": pl.x, "y": pl.y, "hp": pl.hp, "alive": pl.alive}
+                    for pl in g.players
+                ],
+                "projectile": {"x": path[k], "y": path[k + 1], "r": g.weapon.proj_r},
+                "wind": g.wind, "active": g.active, "turn": g.turn, "phase": "projectile",
+            })
+    return room.snapshot(-1), [d for d in deltas if d["t"] == "shot"], full_states
+
+
+def _time(fn, items, repeat: int):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            fn(item)
+    return (time.perf_counter() - t0) / (repeat * len(items))
+
+
+def bench_wire(matches: int, repeat: int, seed: int = 7):
+    hellos, shots, states = [], [], []
+    for i in range(matches):
+        hello, ds, fs = _play(seed + i)
+        hellos.append(hello)
+        shots.extend(ds)
+        states.extend(fs)
+
+    rows = [
+        ("full state json @60Hz", states, encode, json.loads, states),
+        ("hello json (craters)", hellos, encode, json.loads, hellos),
+        ("hello bin (craters)", hellos, wire.encode, wire.decode, hellos),
+        ("shot json", shots, encode, json.loads, shots),
+        ("shot bin", shots, wire.encode, wire.decode, shots),
+    ]
+    print(f"{matches} matches, {len(shots)} shots, {len(states)} full-state frames")
+    print(f"{'format':26s} {'msgs':>6s} {'bytes/msg':>10s} {'total KiB':>10s} {'enc us':>8s} {'dec us':>8s}")
+    sizes = {}
+    for label, msgs, enc, dec, _ in rows:
+        # the full-state frames carry every terrain column (~30 KiB, ~1 ms
+        # each): measure all of them but keep and time only a sample
+        size = sum(len(enc(m)) for m in msgs)
+        sizes[label] = size
+        sample = msgs[::max(1, len(msgs) // TIME_SAMPLE)]
+        frames = [enc(m) for m in sample]
+        t_enc = _time(enc, sample, repeat)
+        t_dec = _time(dec, frames, repeat)
+        print(f"{label:26s} {len(msgs):6d} {size / len(msgs):10.1f} {size / 1024:10.1f} "
+              f"{t_enc * 1e6:8.1f} {t_dec * 1e6:8.1f}")
+
+    shot_json, shot_bin = sizes["shot json"], sizes["shot bin"]
+    per_match_full = sizes["full state json @60Hz"] / matches
+    per_match_bin = (sizes["hello bin (craters)"] + shot_bin) / matches
+    print(f"shot deltas: binary is {shot_bin / shot_json:.1%} of JSON")
+    print(f"per match: full-state JSON {per_match_full / 1024:.1f} KiB vs "
+          f"binary hello+deltas {per_match_bin / 1024:.2f} KiB")
+
+    path_err = max(
+        (abs(a - b) for m in shots for a, b in zip(m["path"], wire.decode(wire.encode(m))["path"])),
+        default=0.0,
+    )
+    crater_err = max(
+        (abs(a - b) for h in hellos for c, back in zip(h["craters"], wire.decode(wire.encode(h))["craters"])
+         for a, b in zip(c, back)),
+        default=0.0,
+    )
+    print(f"quantization: path <= {path_err:.3f} px (stride {PATH_STRIDE}), craters <= {crater_err:.4f} px")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Mini Worms online benchmarks")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("wire", help="binary wire format vs. JSON: bytes and encode/decode time")
+    p.add_argument("--matches", type=int, default=20)
+    p.add_argument("--repeat", type=int, default=20)
+
+    args = parser.parse_args(argv)
+    if args.cmd == "wire":
+        bench_wire(args.matches, args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""In-process pub/sub broker.
+
+Stand-in for a shared broker (Redis pub/sub, NATS, ...) with the same
+publish/subscribe shape. Delivery is synchronous: ``publish`` calls every
+subscriber callback of the topic in the publishing thread. Callbacks must
+not block (sockets go through an ``online.Outbox``). A callback that raises
+is unsubscribed.
+
+Messages are passed through as-is (room message dicts); each subscriber
+encodes them in its connection's wire format. A networked broker would
+carry one serialized form (``online.wire``) instead.
+"""
+
+import itertools
+import threading
+
+
+class LocalBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._topics = {}  # topic -> {token: callback}
+        self._tokens = {}  # token -> topic
+        self._ids = itertools.count(1)
+        self.published = 0
+        self.delivered = 0
+
+    def subscribe(self, topic: str, callback) -> int:
+        token = next(self._ids)
+        with self._lock:
+            self._topics.setdefault(topic, {})[token] = callback
+            self._tokens[token] = topic
+        return token
+
+    def unsubscribe(self, token: int):
+        with self._lock:
+            topic = self._tokens.pop(token, None)
+            subs = self._topics.get(topic)
+            if subs is not None:
+                subs.pop(token, None)
+                if not subs:
+                    del self._topics[topic]
+
+    def subscribers(self, topic: str) -> int:
+        return len(self._topics.get(topic, ()))
+
+    def publish(self, topic: str, message) -> int:
+        with self._lock:
+            targets = list(self._topics.get(topic, {}).items())
+        self.published += 1
+        sent = 0
+        for token, callback in targets:
+            try:
+                callback(message)
+                sent += 1
+            except Exception:
+                self.unsubscribe(token)
+        self.delivered += sent
+        return sent
+
+    def drop_topic(self, topic: str):
+        with self._lock:
+            for token in self._topics.pop(topic, {}):
+                self._tokens.pop(token, None)
@@ -0,0 +1,191 @@
+"""Load test for online matches.
+
+Drives many simulated clients (two seats per room) through complete
+matches, either in-process against a ``RoomRegistry`` (default) or over real
+WebSockets against a running server (``--url``).
+
+Usage:
+    python -m online.loadtest --rooms 300
+    python -m online.loadtest --rooms 100 --url http://127.0.0.1:8080 --wire bin
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from . import wire
+from .broker import LocalBroker
+from .rooms import RoomRegistry, encode
+
+CODECS = {"json": (encode, json.loads), "bin": (wire.encode, wire.decode)}
+
+
+def _pct(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _report(label, rooms, clients, shots, elapsed, latencies, extra=""):
+    print(f"{label}: {rooms} rooms, {clients} clients, {shots} shots in {elapsed:.2f}s "
+          f"-> {shots / elapsed:.0f} shots/s")
+    if latencies:
+        ms = [v * 1000 for v in latencies]
+        print(f"  fire->shot latency ms: p50 {_pct(ms, .5):.2f}  p95 {_pct(ms, .95):.2f}  "
+              f"p99 {_pct(ms, .99):.2f}  mean {statistics.fmean(ms):.2f}")
+    if extra:
+        print("  " + extra)
+
+
+def _random_input(rng):
+    return {"t": "fire", "a": rng.uniform(20, 75), "p": rng.uniform(35, 95), "w": rng.randint(1, 3)}
+
+
+def run_inproc(n_rooms: int, workers: int, max_turns: int, seed: int, fmt: str = "json"):
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    registry = RoomRegistry(LocalBroker(), max_rooms=n_rooms)
+    rooms = [registry.create(seed=seed + i) for i in range(n_rooms)]
+    per_room = (tracemalloc.get_traced_memory()[0] - base) / n_rooms
+    tracemalloc.stop()
+
+    received = [0, 0]
+    lock = threading.Lock()
+    enc = CODECS[fmt][0]
+
+    def inbox(message):
+        size = len(enc(message))
+        with lock:
+            received[0] += 1
+            received[1] += size
+
+    seats = []
+    for room in rooms:
+        seats.append([registry.connect(room, inbox)[1], registry.connect(room, inbox)[1]])
+
+    latencies = []
+
+    def play(i):
+        rng = random.Random(seed + i)
+        room = rooms[i]
+        local = []
+        for _ in range(max_turns):
+            if room.game.phase == "gameover":
+                break
+            seat = room.game.active
+            registry.handle(room, seat, json.dumps({"t": "aim", "a": 45, "p": 60, "w": 1}))
+            t0 = time.perf_counter()
+            registry.handle(room, seat, json.dumps(_random_input(rng)))
+            local.append(time.perf_counter() - t0)
+        return local
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for local in pool.map(play, range(n_rooms)):
+            latencies.extend(local)
+    elapsed = time.perf_counter() - t0
+
+    stats = registry.stats()
+    _report(
+        "inproc", n_rooms, 2 * n_rooms, stats["shots"], elapsed, latencies,
+        f"{fmt} messages delivered {received[0]} ({received[1] / 1024:.0f} KiB), "
+        f"~{per_room / 1024:.1f} KiB per room, "
+        f"finished {sum(r.game.phase == 'gameover' for r in rooms)}/{n_rooms}",
+    )
+
+
+def run_ws(url: str, n_rooms: int, max_turns: int, seed: int, fmt: str = "json"):
+    import urllib.request
+
+    import simple_websocket
+
+    base = url.rstrip("/")
+    ws_base = "ws" + base[4:] if base.startswith("http") else base
+
+    latencies = []
+    shots = [0]
+    lock = threading.Lock()
+    enc, dec = CODECS[fmt]
+    query = "?fmt=bin" if fmt == "bin" else ""
+
+    def client(room_id, idx):
+        rng = random.Random(seed * 7919 + idx)
+        ws = simple_websocket.Client.connect(f"{ws_base}/ws/rooms/{room_id}{query}")
+        try:
+            raw = ws.receive(timeout=2)
+            if raw is None:
+                # the hello can race the client's handshake; ask again
+                ws.send(enc({"t": "sync"}))
+                raw = ws.receive(timeout=10)
+            hello = dec(raw)
+            seat = hello["seat"]
+            active, turns, fired_at = hello["active"], 0, None
+            while turns < max_turns:
+                if active == seat and fired_at is None:
+                    fired_at = time.perf_counter()
+                    ws.send(enc(_random_input(rng)))
+                raw = ws.receive(timeout=30)
+                if raw is None:
+                    break
+                msg = dec(raw)
+                if msg["t"] == "error":
+                    fired_at = None
+                    continue
+                if msg["t"] != "shot":
+                    continue
+                turns += 1
+                if fired_at is not None and msg["seat"] == seat:
+                    with lock:
+                        latencies.append(time.perf_counter() - fired_at)
+                        shots[0] += 1
+                    fired_at = None
+                if msg["winner"] is not None:
+                    break
+                active = msg["next"]["active"]
+        finally:
+            ws.close()
+
+    room_ids = []
+    for _ in range(n_rooms):
+        req = urllib.request.Request(base + "/api/rooms", method="POST")
+        room_ids.append(json.load(urllib.request.urlopen(req))["room"])
+
+    threads = [
+        threading.Thread(target=client, args=(rid, 2 * i + k), daemon=True)
+        for i, rid in enumerate(room_ids) for k in range(2)
+    ]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    _report(f"websocket/{fmt}", n_rooms, len(threads), shots[0], elapsed, latencies)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Online match load test")
+    parser.add_argument("--rooms", type=int, default=300)
+    parser.add_argument("--turns", type=int, default=12, help="max turns per match")
+    parser.add_argument("--workers", type=int, default=8, help="in-process driver threads")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--url", help="base URL of a running server, e.g. http://127.0.0.1:8080")
+    parser.add_argument("--wire", choices=sorted(CODECS), default="json", help="message encoding")
+    args = parser.parse_args(argv)
+
+    if args.url:
+        run_ws(args.url, args.rooms, args.turns, args.seed, args.wire)
+    else:
+        run_inproc(args.rooms, args.workers, args.turns, args.seed, args.wire)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
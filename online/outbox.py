@@ -0,0 +1,71 @@
+"""Per-connection outbound queue.
+
+Room deltas are published under the room lock (``RoomRegistry.handle``), so
+a subscriber callback must not block. ``Outbox.put`` only appends to a
+bounded queue; a writer thread per connection does the blocking socket
+sends. A peer that falls ``limit`` frames behind is cut off instead of
+buffered without bound: ``put`` raises ``RoomError("slow_consumer")``, the
+broker unsubscribes the callback and the writer closes the socket.
+"""
+
+import threading
+from collections import deque
+
+from .rooms import RoomError
+
+
+class Outbox:
+    def __init__(self, send, close=None, limit: int = 256, name: str = "outbox"):
+        """``send(data)`` writes one frame (blocking); ``close()`` is called
+        once when the outbox gives up on a slow or broken peer."""
+        self._send = send
+        self._close = close
+        self.limit = limit
+        self._frames = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._dropped = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def put(self, data):
+        with self._cond:
+            if self._closed:
+                raise RoomError("closed")
+            if len(self._frames) >= self.limit:
+                self._closed = self._dropped = True
+                self._frames.clear()
+                self._cond.notify()
+                raise RoomError("slow_consumer")
+            self._frames.append(data)
+            self._cond.notify()
+
+    def close(self):
+        """Stop after the frames already queued."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    def pending(self) -> int:
+        return len(self._frames)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._frames and not self._closed:
+                    self._cond.wait()
+                if not self._frames:
+                    break
+                data = self._frames.popleft()
+            try:
+                self._send(data)
+            except Exception:  # peer gone; the reader side notices on its own
+                with self._cond:
+                    self._closed = True
+                    self._frames.clear()
+                return
+        if self._dropped and self._close is not None:
+            try:
+                self._close()
+            except Exception:  # already closed
+                pass
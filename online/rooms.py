@@ -0,0 +1,291 @@
+"""Match rooms and the per-instance room registry.
+
+A ``Room`` owns one ``engine.Game``. Only the seated, active player may aim
+or fire; on ``fire`` the server simulates the whole shot with the fixed
+browser timestep and publishes a single ``shot`` delta (sampled path,
+crater, hit points, next turn). Clients replay the path and apply the
+crater locally, which yields the same terrain because both engines are
+bit-compatible.
+"""
+
+import json
+import math
+import secrets
+import threading
+import time
+
+from engine import Game
+from engine.weapons import PHYSICS_DT
+
+from . import wire
+
+MAX_INPUT_BYTES = 512
+PATH_STRIDE = 4            # path sample every 4 physics steps (60 Hz)
+MAX_SHOT_STEPS = 24000     # 100 s of simulated flight/settling
+
+
+class RoomError(Exception):
+    """Rejected room operation; ``code`` is sent to the client."""
+
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.code = code
+
+
+def encode(message) -> str:
+    return json.dumps(message, separators=(",", ":"))
+
+
+class Room:
+    __slots__ = ("id", "topic", "game", "lock", "seats", "craters", "created", "touched")
+
+    def __init__(self, room_id: str, seed: int, now: float):
+        self.id = room_id
+        self.topic = "room:" + room_id
+        self.game = Game(seed=seed)
+        self.lock = threading.Lock()
+        self.seats = [None, None]   # connection token per seat
+        self.craters = []           # (x, y, r) in order, to rebuild terrain on join
+        self.created = now
+        self.touched = now
+
+    # --- seats -------------------------------------------------------------
+
+    # Callers hold ``lock`` for join/leave/snapshot/apply_input.
+
+    def join(self, token: int) -> int:
+        """Seat ``token`` in the first free seat; -1 means spectator."""
+        for seat, holder in enumerate(self.seats):
+            if holder is None:
+                self.seats[seat] = token
+                return seat
+        return -1
+
+    def leave(self, token: int):
+        for seat, holder in enumerate(self.seats):
+            if holder == token:
+                self.seats[seat] = None
+
+    # --- state -------------------------------------------------------------
+
+    def snapshot(self, seat: int) -> dict:
+        """Hello message for ``seat``.
+
+        The terrain is described by seed plus crater history: with caves
+        there is no compact heightfield to send instead, and replaying a few
+        dozen craters is cheap.
+        """
+        g = self.game
+        msg = {
+            "t": "hello",
+            "room": self.id,
+            "seat": seat,
+            "seed": g.seed,
+            "w": g.width,
+            "h": g.height,
+            "turn": g.turn,
+            "active": g.active,
+            "wind": g.wind,
+            "slot": g.weapon_slot,
+            "a": g.angle_deg,
+            "p": g.power,
+            "hp": [pl.hp for pl in g.players],
+            "ys": [pl.y for pl in g.players],
+            "craters": [list(c) for c in self.craters],
+            "winner": g.winner if g.phase == "gameover" else None,
+        }
+        return msg
+
+    def apply_input(self, seat: int, msg: dict) -> list:
+        """Validate and apply one client input; returns the deltas to publish."""
+        g = self.game
+        kind = msg.get("t")
+        if kind not in ("aim", "fire"):
+            raise RoomError("bad_input")
+        if seat < 0 or seat != g.active:
+            raise RoomError("not_your_turn")
+        if g.phase != "aim":
+            raise RoomError("not_aiming")
+
+        try:
+            angle = float(msg.get("a", g.angle_deg))
+            power = float(msg.get("p", g.power))
+            slot = int(msg.get("w", g.weapon_slot))
+        except (TypeError, ValueError, OverflowError):  # int(inf) overflows
+            raise RoomError("bad_input") from None
+        if not (math.isfinite(angle) and math.isfinite(power)):
+            raise RoomError("bad_input")
+
+        g.aim(angle, power)
+        g.set_weapon(slot)
+        if kind == "aim":
+            return [{"t": "aim", "seat": seat, "a": g.angle_deg, "p": g.power, "w": g.weapon_slot}]
+        return [self._play_shot(seat)]
+
+    def _play_shot(self, seat: int) -> dict:
+        g = self.game
+        turn, slot, angle, power = g.turn, g.weapon_slot, g.angle_deg, g.power
+        g.events.clear()
+        g.fire()
+
+        path = []
+        step = 0
+        while g.phase != "gameover" and g.turn == turn and step < MAX_SHOT_STEPS:
+            g.update(PHYSICS_DT)
+            p = g.projectile
+            if p is not None and step % PATH_STRIDE == 0:
+                path.append(round(p.x, 1))
+                path.append(round(p.y, 1))
+            step += 1
+
+        boom, hits = None, []
+        for ev in g.events:
+            if ev[0] == "explosion":
+                boom = [ev[1], ev[2], g.weapon.radius]
+                hits = [list(h) for h in ev[3]]
+                self.craters.append(tuple(boom))
+
+        return {
+            "t": "shot",
+            "turn": turn,
+            "seat": seat,
+            "w": slot,
+            "a": angle,
+            "p": power,
+            "stride": PATH_STRIDE,
+            "path": path,
+            "boom": boom,
+            "hits": hits,
+            "hp": [pl.hp for pl in g.players],
+            "ys": [pl.y for pl in g.players],
+            "next": {"turn": g.turn, "active": g.active, "wind": g.wind},
+            "winner": g.winner if g.phase == "gameover" else None,
+        }
+
+
+class RoomRegistry:
+    """All rooms of this instance.
+
+    Rooms are small (one Game plus a crater list, a few tens of KB), so an
+    instance holds thousands. Rooms without connections are dropped after
+    ``idle_ttl`` seconds; ``sweep`` runs opportunistically on ``create``.
+    """
+
+    def __init__(self, broker, max_rooms: int = 5000, idle_ttl: float = 900.0, clock=time.monotonic):
+        self.broker = broker
+        self.max_rooms = max_rooms
+        self.idle_ttl = idle_ttl
+        self.clock = clock
+        self._rooms = {}
+        self._lock = threading.Lock()
+        self._last_sweep = clock()
+        self.shots = 0
+        self.rejected = 0
+
+    def __len__(self):
+        return len(self._rooms)
+
+    def create(self, seed: int = None) -> Room:
+        now = self.clock()
+        if now - self._last_sweep > 30:
+            self.sweep()
+        if seed is None:
+            seed = secrets.randbits(32)
+        with self._lock:
+            if len(self._rooms) >= self.max_rooms:
+                raise RoomError("too_many_rooms")
+            room_id = secrets.token_urlsafe(6)
+            while room_id in self._rooms:
+                room_id = secrets.token_urlsafe(6)
+            room = self._rooms[room_id] = Room(room_id, int(seed) & 0xFFFFFFFF, now)
+        return room
+
+    def get(self, room_id: str):
+        room = self._rooms.get(room_id)
+        if room is not None:
+            room.touched = self.clock()
+        return room
+
+    def remove(self, room_id: str):
+        with self._lock:
+            room = self._rooms.pop(room_id, None)
+        if room is not None:
+            self.broker.drop_topic(room.topic)
+
+    def sweep(self) -> int:
+        now = self.clock()
+        self._last_sweep = now
+        stale = [
+            rid for rid, room in list(self._rooms.items())
+            if now - room.touched > self.idle_ttl and not self.broker.subscribers(room.topic)
+        ]
+        for rid in stale:
+            self.remove(rid)
+        return len(stale)
+
+    # --- connections -------------------------------------------------------
+
+    def connect(self, room: Room, send):
+        """Subscribe ``send`` to the room and seat it; returns (token, seat).
+
+        ``send`` receives message dicts and encodes them in the connection's
+        wire format; it must only queue them (``online.Outbox``), never wait
+        on the socket. Deltas are published under the room lock, so holding
+        it here guarantees the hello snapshot is the first message and no
+        delta is missed or duplicated.
+        """
+        with room.lock:
+            token = self.broker.subscribe(room.topic, send)
+            seat = room.join(token)
+            send(room.snapshot(seat))
+        return token, seat
+
+    def disconnect(self, room: Room, token: int):
+        self.broker.unsubscribe(token)
+        with room.lock:
+            room.leave(token)
+        room.touched = self.clock()
+
+    def handle(self, room: Room, seat: int, raw) -> dict:
+        """Apply one raw client message; returns a direct reply (error, sync) or None.
+
+        Text frames are JSON, binary frames use ``online.wire``.
+        """
+        if not isinstance(raw, (str, bytes)) or len(raw) > MAX_INPUT_BYTES:
+            self.rejected += 1
+            return {"t": "error", "error": "bad_input"}
+        try:
+            msg = wire.decode(raw) if isinstance(raw, bytes) else json.loads(raw)
+            if not isinstance(msg, dict):
+                raise ValueError
+        except ValueError:
+            self.rejected += 1
+            return {"t": "error", "error": "bad_input"}
+
+        with room.lock:
+            room.touched = self.clock()
+            if msg.get("t") == "sync":
+                # client asks for a fresh snapshot (lost hello, resync)
+                return room.snapshot(seat)
+            try:
+                deltas = room.apply_input(seat, msg)
+            except RoomError as e:
+                self.rejected += 1
+                return {"t": "error", "error": e.code}
+            for delta in deltas:
+                if delta["t"] == "shot":
+                    self.shots += 1
+                self.broker.publish(room.topic, delta)
+        return None
+
+    def stats(self) -> dict:
+        rooms = list(self._rooms.values())
+        return {
+            "rooms": len(rooms),
+            "max_rooms": self.max_rooms,
+            "seated": sum(1 for r in rooms for s in r.seats if s is not None),
+            "shots": self.shots,
+            "rejected": self.rejected,
+            "published": self.broker.published,
+            "delivered": self.broker.delivered,
+        }
@@ -0,0 +1,203 @@
+"""Compact binary wire format for room messages.
+
+Every frame starts with ``<version:u8><type:u8>``, then a fixed layout per
+type (little-endian, mirrored by ``wireEncode``/``wireDecode`` in the
+browser script). Decoding yields the same dicts as the JSON messages, so
+clients handle both formats with one code path.
+
+Quantization:
+
+- the terrain is never sent: ``hello`` carries the seed and the crater
+  history (``BOOM`` records), afterwards only crater events (``shot.boom``)
+  change it. Crater centres stay float64 and radii are whole pixels, so a
+  client carves exactly the craters the server carved,
+- projectile path points are int16 quarter pixels,
+- angles, power, wind and worm Y are float32.
+
+Player records are fixed-size (``PLAYER``); a frame carries one per worm.
+"""
+
+import struct
+
+VERSION = 3             # 2: craters instead of a heightfield in hello, 3: float64 crater centres
+
+HELLO = 1
+AIM = 2
+FIRE = 3
+SHOT = 4
+ERROR = 5
+SYNC = 6
+
+TYPES = {"hello": HELLO, "aim": AIM, "fire": FIRE, "shot": SHOT, "error": ERROR, "sync": SYNC}
+NAMES = {code: name for name, code in TYPES.items()}
+
+HEADER = struct.Struct("<BB")
+# seat, seed, w, h, turn, active, wind, slot, angle, power, winner
+HELLO_HEAD = struct.Struct("<bIHHIBfBffb")
+# seat (-1 from clients), angle, power, slot
+AIM_BODY = struct.Struct("<bffB")
+# turn, seat, slot, angle, power, stride, winner, next turn, next active, next wind, boom flag
+SHOT_HEAD = struct.Struct("<IBBffBbIBfB")
+BOOM = struct.Struct("<ddH")
+HIT = struct.Struct("<BH")
+# hp, y
+PLAYER = struct.Struct("<Hf")
+COUNT8 = struct.Struct("<B")
+COUNT16 = struct.Struct("<H")
+
+PATH_SCALE = 4        # path points in 1/4 px
+
+
+class WireError(ValueError):
+    """Malformed or unsupported frame."""
+
+
+def _winner_out(winner):
+    return -1 if winner is None else int(winner)
+
+
+def _winner_in(code):
+    return None if code < 0 else code
+
+
+def _clamp16(v):
+    v = round(v * PATH_SCALE)
+    return -32768 if v < -32768 else 32767 if v > 32767 else v
+
+
+def _players(hp, ys) -> bytes:
+    out = [COUNT8.pack(len(hp))]
+    for h, y in zip(hp, ys):
+        out.append(PLAYER.pack(max(0, round(h)), y))
+    return b"".join(out)
+
+
+def _read_players(buf, off):
+    (n,) = COUNT8.unpack_from(buf, off)
+    off += COUNT8.size
+    hp, ys = [], []
+    for _ in range(n):
+        h, y = PLAYER.unpack_from(buf, off)
+        off += PLAYER.size
+        hp.append(h)
+        ys.append(y)
+    return hp, ys, off
+
+
+def encode(msg: dict) -> bytes:
+    """Encode one message dict (as produced by ``Room``) to a binary frame."""
+    kind = msg["t"]
+    code = TYPES.get(kind)
+    if code is None:
+        raise WireError("unknown message type: %r" % (kind,))
+    head = HEADER.pack(VERSION, code)
+
+    if code == SHOT:
+        nxt, boom = msg["next"], msg["boom"]
+        parts = [head, SHOT_HEAD.pack(
+            msg["turn"], msg["seat"], msg["w"], msg["a"], msg["p"], msg["stride"],
+            _winner_out(msg["winner"]), nxt["turn"], nxt["active"], nxt["wind"],
+            boom is not None,
+        )]
+        if boom is not None:
+            parts.append(BOOM.pack(boom[0], boom[1], round(boom[2])))
+            parts.append(COUNT8.pack(len(msg["hits"])))
+            parts.extend(HIT.pack(pid, round(dmg)) for pid, dmg in msg["hits"])
+        parts.append(_players(msg["hp"], msg["ys"]))
+        path = msg["path"]
+        parts.append(COUNT16.pack(len(path) // 2))
+        parts.append(struct.pack("<%dh" % len(path), *map(_clamp16, path)))
+        return b"".join(parts)
+
+    if code in (AIM, FIRE):
+        return head + AIM_BODY.pack(msg.get("seat", -1), msg["a"], msg["p"], msg["w"])
+
+    if code == HELLO:
+        craters = msg["craters"]
+        return b"".join((
+            head,
+            HELLO_HEAD.pack(
+                msg["seat"], msg["seed"], round(msg["w"]), round(msg["h"]), msg["turn"],
+                msg["active"], msg["wind"], msg["slot"], msg["a"], msg["p"],
+                _winner_out(msg["winner"]),
+            ),
+            _players(msg["hp"], msg["ys"]),
+            COUNT16.pack(len(craters)),
+            b"".join(BOOM.pack(x, y, round(r)) for x, y, r in craters),
+        ))
+
+    if code == ERROR:
+        text = msg["error"].encode("utf-8")[:255]
+        return head + COUNT8.pack(len(text)) + text
+
+    return head  # SYNC
+
+
+def decode(buf) -> dict:
+    """Decode one binary frame into the equivalent JSON message dict."""
+    buf = memoryview(buf)
+    try:
+        version, code = HEADER.unpack_from(buf, 0)
+        if version != VERSION:
+            raise WireError("unsupported wire version %d" % version)
+        off = HEADER.size
+        kind = NAMES.get(code)
+        if kind is None:
+            raise WireError("unknown message type %d" % code)
+
+        if code == SHOT:
+            (turn, seat, slot, a, p, stride, winner,
+             nturn, nactive, nwind, has_boom) = SHOT_HEAD.unpack_from(buf, off)
+            off += SHOT_HEAD.size
+            boom, hits = None, []
+            if has_boom:
+                bx, by, br = BOOM.unpack_from(buf, off)
+                off += BOOM.size
+                boom = [bx, by, br]
+                (nh,) = COUNT8.unpack_from(buf, off)
+                off += COUNT8.size
+                for _ in range(nh):
+                    hits.append(list(HIT.unpack_from(buf, off)))
+                    off += HIT.size
+            hp, ys, off = _read_players(buf, off)
+            (npts,) = COUNT16.unpack_from(buf, off)
+            off += COUNT16.size
+            raw = struct.unpack_from("<%dh" % (2 * npts), buf, off)
+            return {
+                "t": kind, "turn": turn, "seat": seat, "w": slot, "a": a, "p": p,
+                "stride": stride, "path": [v / PATH_SCALE for v in raw],
+                "boom": boom, "hits": hits, "hp": hp, "ys": ys,
+                "next": {"turn": nturn, "active": nactive, "wind": nwind},
+                "winner": _winner_in(winner),
+            }
+
+        if code in (AIM, FIRE):
+            seat, a, p, slot = AIM_BODY.unpack_from(buf, off)
+            return {"t": kind, "seat": seat, "a": a, "p": p, "w": slot}
+
+        if code == HELLO:
+            (seat, seed, w, h, turn, active, wind, slot, a, p,
+             winner) = HELLO_HEAD.unpack_from(buf, off)
+            off += HELLO_HEAD.size
+            hp, ys, off = _read_players(buf, off)
+            (n,) = COUNT16.unpack_from(buf, off)
+            off += COUNT16.size
+            craters = []
+            for _ in range(n):
+                craters.append(list(BOOM.unpack_from(buf, off)))
+                off += BOOM.size
+            return {
+                "t": kind, "seat": seat, "seed": seed, "w": w, "h": h, "turn": turn,
+                "active": active, "wind": wind, "slot": slot, "a": a, "p": p,
+                "hp": hp, "ys": ys, "craters": craters,
+                "winner": _winner_in(winner),
+            }
+
+        if code == ERROR:
+            (n,) = COUNT8.unpack_from(buf, off)
+            off += COUNT8.size
+            return {"t": kind, "error": bytes(buf[off:off + n]).decode("utf-8", "replace")}
+
+        return {"t": kind}
+    except struct.error as e:
+        raise WireError(str(e)) from None
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""Serving benchmarks.
+
+``workers``: per-worker memory and requests/s of the gunicorn setup, lazy
+vs. preloaded. Starts gunicorn twice with the same number of workers and threads:
+
+- ``lazy``: without ``gunicorn.conf.py``; every worker imports the app and
+  renders the page bundle on its first request (the old setup),
+- ``preload``: with ``gunicorn.conf.py``; the master preloads the app and
+  calls ``main.warm_up`` before forking.
+
+Client processes then request ``/``, the hashed script and ``/api/health``
+over keep-alive connections (gzip accepted) for ``--seconds``. Memory is
+read from ``/proc/<pid>/smaps_rollup`` after the load, when every worker
+has served the page: ``rss`` counts shared pages in full, ``pss`` splits
+them between the processes sharing them, ``uss`` is what a worker owns
+alone. Linux only.
+
+``metrics``: cost of the request metrics hooks (``metrics_start``,
+``metrics_observe``, ``metrics_finish``) per request, timed directly inside
+one request context and end to end through the test client with
+``METRICS`` off and on in turn, plus a check that concurrent threads lose no counts.
+
+Usage:
+    python serve_bench.py workers --workers 4 --seconds 10
+    python serve_bench.py metrics
+"""
+
+import argparse
+import gzip
+import http.client
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _get(conn, path):
+    conn.request("GET", path, headers={"Accept-Encoding": "gzip"})
+    resp = conn.getresponse()
+    body = resp.read()
+    return resp.status, body
+
+
+def _wait_ready(port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            if _get(conn, "/api/health")[0] == 200:
+                conn.close()
+                return
+        except OSError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError("gunicorn did not come up on port %d" % port)
+
+
+def _client(port: int, paths, seconds: float) -> int:
+    """Loop over ``paths`` on one keep-alive connection; returns the request count."""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    done, end = 0, time.monotonic() + seconds
+    while time.monotonic() < end:
+        for path in paths:
+            status, _ = _get(conn, path)
+            if status != 200:
+                raise RuntimeError("GET %s -> %d" % (path, status))
+            done += 1
+    conn.close()
+    return done
+
+
+def _memory(pid: int) -> dict:
+    """rss/pss/uss of ``pid`` in KiB."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup", encoding="ascii") as fh:
+        for line in fh:
+            m = re.match(r"(\w+):\s+(\d+) kB", line)
+            if m:
+                fields[m.group(1)] = int(m.group(2))
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "uss": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
+
+
+def _children(pid: int):
+    out = []
+    for tid in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{tid}/children", encoding="ascii") as fh:
+            out.extend(int(c) for c in fh.read().split())
+    return out
+
+
+def run(variant: str, args, port: int) -> dict:
+    cmd = [
+        sys.executable, "-m", "gunicorn", "main:app",
+        "--bind", f"127.0.0.1:{port}",
+        "--workers", str(args.workers), "--threads", str(args.threads),
+        "--worker-class", "gthread", "--log-level", "warning",
+    ]
+    with tempfile.NamedTemporaryFile("w", suffix=".py") as empty:
+        cmd += ["--config", os.path.join(HERE, "gunicorn.conf.py") if variant == "preload" else empty.name]
+        proc = subprocess.Popen(cmd, cwd=HERE)
+        try:
+            _wait_ready(port)
+            conn = http.client.HTTPConnection("127.0.0.1", port)
+            _, page = _get(conn, "/")
+            conn.close()
+            # the script name is the content hash; read it from the page shell
+            script = re.search(rb'<script src="(/static/[^"]+)"', gzip.decompress(page)).group(1).decode()
+            paths = ["/", script, "/api/health"]
+
+            t0 = time.perf_counter()
+            with ProcessPoolExecutor(args.clients) as pool:
+                counts = list(pool.map(_client, [port] * args.clients, [paths] * args.clients,
+                                       [args.seconds] * args.clients))
+            elapsed = time.perf_counter() - t0
+
+            workers = [_memory(pid) for pid in _children(proc.pid)]
+            master = _memory(proc.pid)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+    return {"rps": sum(counts) / elapsed, "workers": workers, "master": master}
+
+
+def _avg(workers, key):
+    return sum(w[key] for w in workers) / len(workers) / 1024
+
+
+def bench_workers(args):
+    print(f"{args.workers} workers x {args.threads} threads, {args.clients} clients, "
+          f"{args.seconds:g}s, {os.cpu_count()} CPU(s)")
+    print(f"{'variant':8s} {'req/s':>8s} {'worker rss MiB':>14s} {'pss':>6s} {'uss':>6s} "
+          f"{'master rss':>10s} {'total pss':>9s}")
+    for variant in ("lazy", "preload"):
+        r = run(variant, args, args.port)
+        w = r["workers"]
+        total = (sum(x["pss"] for x in w) + r["master"]["pss"]) / 1024
+        print(f"{variant:8s} {r['rps']:8.0f} {_avg(w, 'rss'):14.1f} {_avg(w, 'pss'):6.1f} "
+              f"{_avg(w, 'uss'):6.1f} {r['master']['rss'] / 1024:10.1f} {total:9.1f}")
+
+
+def _client_rate(client, n: int) -> float:
+    """Seconds per GET /api/health through the Flask test client."""
+    t0 = time.perf_counter()
+    for _ in range(n):
+        client.get("/api/health")
+    return (time.perf_counter() - t0) / n
+
+
+def bench_metrics(args):
+    import main
+
+    app = main.app
+    n = args.requests
+    with app.test_request_context("/api/health"):
+        resp = main.health()
+        t0 = time.perf_counter()
+        for _ in range(n):
+            main.metrics_start()
+            main.metrics_observe(resp)
+            main.metrics_finish(None)
+        hooks = (time.perf_counter() - t0) / n
+    print(f"hooks alone: {hooks * 1e6:.2f} us/request")
+
+    # short blocks with METRICS off and on in turn, so both see the same
+    # machine noise; the median of the pairwise differences
+    client = app.test_client()
+    block = max(1, n // 10 // args.rounds)
+    off, diffs = [], []
+    for _ in range(args.rounds):
+        app.config["METRICS"] = False
+        a = _client_rate(client, block)
+        app.config["METRICS"] = True
+        diffs.append(_client_rate(client, block) - a)
+        off.append(a)
+    print(f"test client: {statistics.median(off) * 1e6:.1f} us/request with METRICS=0, "
+          f"{statistics.median(diffs) * 1e6:+.1f} us with metrics (median of {args.rounds} pairs)")
+
+    # concurrent threads: every request must land in some shard
+    before = _health_count(main)
+    per_thread = n // 10 // args.threads
+
+    def hammer():
+        c = app.test_client()
+        for _ in range(per_thread):
+            c.get("/api/health")
+
+    threads = [threading.Thread(target=hammer) for _ in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    counted = _health_count(main) - before
+    print(f"{args.threads} threads x {per_thread} requests: {counted} counted "
+          f"({'ok' if counted == args.threads * per_thread else 'LOST COUNTS'})")
+
+
+def _health_count(main) -> int:
+    m = re.search(r'worms_http_request_duration_seconds_count\{method="GET",route="/api/health",'
+                  r'status="200"\} (\d+)', main._metrics_text())
+    return int(m.group(1)) if m else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Mini Worms serving benchmarks")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("workers", help="gunicorn worker memory and throughput, lazy vs. preloaded")
+    p.add_argument("--workers", type=int, default=4)
+    p.add_argument("--threads", type=int, default=8)
+    p.add_argument("--clients", type=int, default=8, help="client processes (one connection each)")
+    p.add_argument("--seconds", type=float, default=10.0)
+    p.add_argument("--port", type=int, default=8099)
+
+    p = sub.add_parser("metrics", help="per-request cost of the /api/metrics hooks")
+    p.add_argument("--requests", type=int, default=200000, help="hook iterations (test client: 1/10)")
+    p.add_argument("--rounds", type=int, default=40, help="off/on pairs for the test client")
+    p.add_argument("--threads", type=int, default=8)
+
+    args = parser.parse_args(argv)
+    if args.cmd == "workers":
+        bench_workers(args)
+    elif args.cmd == "metrics":
+        bench_metrics(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())